@@ -350,7 +350,11 @@ class DesktopCover(Gtk.Window):
         """
             Hides the window after cover removal
         """
-        self.hide()
+        if track is None and player.PLAYER.current is not None:
+            # the covers of some albums were collected from the cache
+            self.set_cover_from_track(player.PLAYER.current)
+        else:
+            self.hide()
 
     def on_option_set(self, type, settings, option):
         """
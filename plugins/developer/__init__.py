@@ -47,11 +47,19 @@ class DeveloperPlugin(object):
         # subscribe for all events
         event.add_callback(self.on_events)
 
+        # time the callbacks of each event type, keeping the statistics
+        # if something else already does
+        self.was_profiling = event.EVENT_MANAGER.profile is not None
+        if not self.was_profiling:
+            event.EVENT_MANAGER.set_profiling(True)
+
     def disable(self, exaile):
         self.teardown(exaile)
 
     def teardown(self, exaile):
         event.remove_callback(self.on_events)
+        if not self.was_profiling:
+            event.EVENT_MANAGER.set_profiling(False)
         if self.window:
             self.window.destroy()
         if self.menu:
@@ -86,6 +94,7 @@ class DeveloperPlugin(object):
         with self.lock:
             self.events.clear()
             self.events['__all'] = 0
+            event.EVENT_MANAGER.set_profiling(True)
 
     def pause_events(self, pause):
         with self.lock:
@@ -107,6 +116,15 @@ class DeveloperPlugin(object):
             if all_count != last_count:
                 return self.events.copy(), all_count
 
+    def get_event_times(self):
+        '''Returns the time spent in the callbacks of each event type, in ms'''
+        profile = event.EVENT_MANAGER.get_profile()
+        if profile is None:
+            return {}
+        return {
+            name: total * 1000 for name, (count, total) in profile['events'].iteritems()
+        }
+
 
 plugin_class = DeveloperPlugin
 
@@ -176,12 +194,14 @@ class DeveloperWindow(Gtk.Window):
         data = self.plugin.get_event_data(self.events_count)
         if data:
             events, self.events_count = data
+            times = self.plugin.get_event_times()
             for name, count in events.iteritems():
                 titer = self.event_model_idx.get(name)
                 if titer:
                     self.event_store[titer][1] = count
+                    self.event_store[titer][2] = times.get(name, 0)
                 else:
-                    titer = self.event_store.append([name, count])
+                    titer = self.event_store.append([name, count, times.get(name, 0)])
                     self.event_model_idx[name] = titer
 
         return True
@@ -288,12 +288,13 @@ class GroupTaggerPlugin(object):
         dialog.destroy()
 
         if len(groups) > 0:
-            for track in tracks:
-                existing = get_track_groups(track)
-                if add:
-                    set_track_groups(track, existing | groups)
-                else:
-                    set_track_groups(track, existing - groups)
+            with event.batch():
+                for track in tracks:
+                    existing = get_track_groups(track)
+                    if add:
+                        set_track_groups(track, existing | groups)
+                    else:
+                        set_track_groups(track, existing - groups)
 
     def on_add_tags(self, widget, name, parent, context, exaile):
         self._add_rm_multi_tags(True, context, exaile)
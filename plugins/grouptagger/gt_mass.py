@@ -26,6 +26,7 @@
 
 from gi.repository import Gtk
 
+from xl import event
 from xl.nls import gettext as _
 
 from xlgui.guiutil import GtkTemplate
@@ -138,18 +139,19 @@ class GtMassRename(Gtk.Window):
         if dialogs.yesno(self, query) != Gtk.ResponseType.YES:
             return
 
-        for track in tracks:
+        with event.batch():
+            for track in tracks:
 
-            groups = gt_common._get_track_groups(track, self.tagname)
+                groups = gt_common._get_track_groups(track, self.tagname)
 
-            if self.search_str != '':
-                groups.discard(self.search_str)
+                if self.search_str != '':
+                    groups.discard(self.search_str)
 
-            if replace_str != '':
-                groups.add(replace_str)
+                if replace_str != '':
+                    groups.add(replace_str)
 
-            if not gt_common.set_track_groups(track, groups):
-                return
+                if not gt_common.set_track_groups(track, groups):
+                    return
 
         dialogs.info(self, "Tags successfully renamed!")
         self.reset()
@@ -19,8 +19,13 @@ except ImportError:
     lxml = None
 
 import re
+import urllib2
 
-from xl.lyrics import LyricSearchMethod, LyricsNotFoundException
+from xl.lyrics import (
+    LyricSearchMethod,
+    LyricsNotAvailableException,
+    LyricsNotFoundException,
+)
 from xl import common, providers
 
 
@@ -55,10 +60,10 @@ class LyricsMania(LyricSearchMethod):
                 track.get_tag_raw('title')[0].encode("utf-8"),
             )
         except TypeError:
-            raise LyricsNotFoundException
+            raise LyricsNotAvailableException
 
         if not artist or not title:
-            raise LyricsNotFoundException
+            raise LyricsNotAvailableException
 
         artist = artist.replace(' ', '_').replace('\'', '').lower()
         title = title.replace(' ', '_').replace('\'', '').lower()
@@ -67,6 +72,10 @@ class LyricsMania(LyricSearchMethod):
 
         try:
             html = common.get_url_contents(url, self.user_agent)
+        except urllib2.HTTPError as e:
+            if e.code == 404:
+                raise LyricsNotAvailableException
+            raise LyricsNotFoundException
         except Exception:
             raise LyricsNotFoundException
 
@@ -5,8 +5,13 @@ except ImportError:
 import HTMLParser
 import re
 import urllib
+import urllib2
 
-from xl.lyrics import LyricSearchMethod, LyricsNotFoundException
+from xl.lyrics import (
+    LyricSearchMethod,
+    LyricsNotAvailableException,
+    LyricsNotFoundException,
+)
 from xl import common, providers
 
 
@@ -41,10 +46,10 @@ class LyricWiki(LyricSearchMethod):
                 track.get_tag_raw('title')[0].encode("utf-8"),
             )
         except TypeError:
-            raise LyricsNotFoundException
+            raise LyricsNotAvailableException
 
         if not artist or not title:
-            raise LyricsNotFoundException
+            raise LyricsNotAvailableException
 
         artist = urllib.quote(artist.replace(' ', '_'))
         title = urllib.quote(title.replace(' ', '_'))
@@ -53,6 +58,10 @@ class LyricWiki(LyricSearchMethod):
 
         try:
             html = common.get_url_contents(url, self.user_agent)
+        except urllib2.HTTPError as e:
+            if e.code == 404:
+                raise LyricsNotAvailableException
+            raise LyricsNotFoundException
         except Exception:
             raise LyricsNotFoundException
 
@@ -68,7 +77,7 @@ class LyricWiki(LyricSearchMethod):
             )
             lyrics = re.sub(r' Send.*?Ringtone to your Cell ', '', string)
         else:
-            raise LyricsNotFoundException
+            raise LyricsNotAvailableException
 
         lyrics = self.remove_script(lyrics)
         lyrics = self.remove_html_tags(unicode(BeautifulSoup(lyrics, "lxml")))
@@ -791,7 +791,7 @@ class PlaylistButtonControl(Gtk.ToggleButton, BaseControl, QueueAdapter):
         self.connect('drag-data-received', self.on_drag_data_received)
         self.view.connect('drag-motion', self.on_drag_motion)
         self.view.connect('drag-leave', self.on_drag_leave)
-        event.add_ui_callback(self.on_track_tags_changed, 'track_tags_changed')
+        event.add_ui_callback(self.on_track_tags_changed, 'track_tags_changed_batch')
         event.add_ui_callback(self.on_option_set, 'plugin_minimode_option_set')
         self.on_option_set(
             'plugin_minimode_option_set', settings, 'plugin/minimode/track_title_format'
@@ -947,17 +947,18 @@ class PlaylistButtonControl(Gtk.ToggleButton, BaseControl, QueueAdapter):
 
         GLib.idle_add(self.label.set_text, text)
 
-    def on_track_tags_changed(self, event, track, tags):
+    def on_track_tags_changed(self, event, obj, changes):
         """
             Updates the button on tag changes
         """
         playlist = self.view.playlist
+        position = playlist.current_position
 
-        if track not in playlist:
+        if not 0 <= position < len(playlist):
             return
 
-        track_position = playlist.index(track)
-        if track_position == playlist.current_position:
+        track = playlist[position]
+        if track in changes:
             self.label.set_text(self.formatter.format(track))
 
     def on_option_set(self, event, settings, option):
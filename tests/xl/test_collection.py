@@ -0,0 +1,47 @@
+import os
+import shutil
+
+from gi.repository import Gio
+
+from xl import collection
+from xl.trax import track
+
+DATA = os.path.join(
+    os.path.dirname(__file__), '..', 'data', 'music', 'testartist', 'first'
+)
+
+
+def _uri(path):
+    return Gio.File.new_for_path(str(path)).get_uri()
+
+
+def test_rescan_removed(tmpdir):
+    music = tmpdir.mkdir('music')
+    for name in ('1-black.ogg', '2-white.ogg'):
+        shutil.copy(os.path.join(DATA, name), str(music.join(name)))
+    # skipped by the walk, as it links to a file of the library
+    music.join('link.ogg').mksymlinkto(music.join('1-black.ogg'), absolute=0)
+
+    coll = collection.Collection('Test')
+    library = collection.Library(_uri(music))
+    coll.add_library(library)
+    library.rescan()
+    assert sorted(coll.tracks) == [
+        _uri(music.join('1-black.ogg')),
+        _uri(music.join('2-white.ogg')),
+    ]
+
+    # a track of another directory whose path starts like the library's
+    other = track.Track(_uri(tmpdir.join('music2', 'gone.ogg')), scan=False)
+    link = track.Track(_uri(music.join('link.ogg')))
+    coll.add_tracks([other, link])
+
+    music.join('2-white.ogg').remove()
+    library.rescan()
+    assert sorted(coll.tracks) == [
+        _uri(music.join('1-black.ogg')),
+        _uri(music.join('link.ogg')),
+        _uri(tmpdir.join('music2', 'gone.ogg')),
+    ]
+
+    coll.close()
@@ -0,0 +1,208 @@
+import os
+import threading
+import time
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from xl import common, covers
+from xl.migrations.database import covers_to_journal
+
+
+class StubMethod(covers.CoverSearchMethod):
+    def __init__(self, name, found, delay=0):
+        self.name = name
+        self.found = found
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def find_covers(self, track, limit=-1):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return self.found.get(track, [])[:limit]
+
+    def get_cover_data(self, db_string):
+        return 'data-' + db_string
+
+
+def test_fetch():
+    first = StubMethod('first', {'a': ['a1'], 'b': ['b1']}, delay=0.01)
+    second = StubMethod('second', {'a': ['a2'], 'c': ['c2']})
+    fetcher = covers.CoverFetcher([first, second], workers=4)
+
+    items = [(track.upper(), track) for track in 'abcd']
+    results = {r[0]: r[1:] for r in fetcher.fetch(items)}
+    assert results == {
+        'A': ('a', 'first:a1', 'data-a1'),
+        'B': ('b', 'first:b1', 'data-b1'),
+        'C': ('c', 'second:c2', 'data-c2'),
+        'D': ('d', None, None),
+    }
+
+
+def test_fetch_method_workers():
+    method = StubMethod('slow', {}, delay=0.02)
+    fetcher = covers.CoverFetcher([method], workers=8, method_workers=2)
+
+    items = [(i, i) for i in range(16)]
+    assert len(list(fetcher.fetch(items))) == 16
+    assert method.max_active == 2
+
+
+def test_fetch_timeout():
+    hanging = StubMethod('hanging', {'a': ['a1']}, delay=2)
+    other = StubMethod('other', {'a': ['a2']})
+    fetcher = covers.CoverFetcher([hanging, other], timeout=0.1)
+
+    start = time.time()
+    assert list(fetcher.fetch([('A', 'a')])) == [('A', 'a', 'other:a2', 'data-a2')]
+    assert time.time() - start < 1
+
+
+def test_fetch_stop():
+    method = StubMethod('slow', {}, delay=0.05)
+    fetcher = covers.CoverFetcher([method], workers=1)
+    stopper = threading.Event()
+
+    results = []
+    for result in fetcher.fetch([(i, i) for i in range(10)], stopper):
+        results.append(result)
+        stopper.set()
+    assert len(results) == 1
+
+
+def test_migrate_pickle(tmpdir):
+    path = str(tmpdir.join('covers.db'))
+    db = {'version': 2, u'album\0a': 'cache:a', u'album\0b': 'localfile:b'}
+    with open(path, 'wb') as f:
+        pickle.dump(db, f)
+
+    assert covers_to_journal.needs_migration(path)
+    covers_to_journal.migrate(path)
+    assert not covers_to_journal.needs_migration(path)
+    assert os.path.exists(path + '-pickle.bak')
+
+    journal = common.Journal(path)
+    assert dict(journal) == db
+    journal.close()
+
+
+def test_save_version1(tmpdir):
+    path = str(tmpdir.join('covers.db'))
+    with open(path, 'wb') as f:
+        pickle.dump({('album', (u'a',)): 'localfile:a'}, f)
+
+    # the db is only saved once it has been converted to version 2
+    man = covers.CoverManager(str(tmpdir))
+    man.save()
+    assert covers_to_journal.needs_migration(path)
+
+    man.db = {'version': 2, u'album\0a': 'localfile:a'}
+    man.save()
+    assert not covers_to_journal.needs_migration(path)
+    journal = common.Journal(path)
+    assert dict(journal) == man.db
+    journal.close()
+
+
+def test_collect_garbage(tmpdir, monkeypatch):
+    monkeypatch.setattr(covers.CoverManager, '_get_track_key', lambda s, t: t)
+    monkeypatch.setattr(covers.CoverManager, 'timeout_save', lambda s: None)
+    man = covers.CoverManager(str(tmpdir))
+    man.methods['stub'] = StubMethod('stub', {})
+
+    for i in range(4):
+        man.set_cover(u'album%d' % i, 'stub:%d' % i, str(i) * 100)
+    tmpdir.join('cache', 'orphan').write('x' * 50)
+
+    # the least recently used covers are removed first
+    now = time.time()
+    for i in range(4):
+        cache_key = man.db[u'album%d' % i][6:]
+        path = str(tmpdir.join('cache', cache_key))
+        os.utime(path, (now - 100 + i, now - 100 + i))
+
+    # covers cached before the sources of covers were kept
+    sources = man._CoverManager__sources
+    del sources[man.db[u'album1'][6:]]
+    del sources[man.db[u'album2'][6:]]
+    removed = []
+    monkeypatch.setattr(
+        covers.event, 'log_event', lambda *args: removed.append(args[0])
+    )
+
+    assert man.collect_garbage(0) == 50
+    assert man.collect_garbage(150) == 300
+    assert man.db[u'album0'] == 'stub:0'
+    assert u'album1' not in man.db
+    assert u'album2' not in man.db
+    assert removed == ['cover_removed']
+    assert len(tmpdir.join('cache').listdir()) == 1
+
+    # the collected cover is fetched from its source and cached again,
+    # in the background for set_only lookups
+    assert man.get_cover(u'album0', set_only=True) is None
+    for i in range(50):
+        if man.db[u'album0'].startswith('cache:'):
+            break
+        time.sleep(0.1)
+    assert sources[man.db[u'album0'][6:]] == 'stub:0'
+    assert man.get_cover(u'album0', set_only=True) == 'data-0'
+
+
+def test_thumbnail_versions(tmpdir):
+    cacher = covers.ThumbnailCacher(str(tmpdir))
+
+    cacher.add('localfile:a', 64, 'old', version='1.000000')
+    cacher.add('localfile:a', 32, 'small', version='1.000000')
+    assert cacher.get('localfile:a', 64, '1.000000') == 'old'
+    assert cacher.get('localfile:a', 64, '2.000000') is None
+
+    # a new version of the cover replaces the thumbnails of the old one
+    cacher.add('localfile:a', 64, 'new', version='2.000000')
+    assert cacher.get('localfile:a', 64, '2.000000') == 'new'
+    assert len(cacher.usage()) == 2
+    assert cacher.get('localfile:a', 32, '1.000000') == 'small'
+
+
+def test_localfile_images(tmpdir, monkeypatch):
+    from gi.repository import Gio
+    from xl import trax
+
+    tmpdir.join('cover.jpg').write('')
+    tmpdir.join('other.png').write('')
+    track = trax.Track(str(tmpdir.join('track.ogg')))
+    fetcher = covers.LocalFileCoverFetcher()
+    cover = Gio.File.new_for_path(str(tmpdir.join('cover.jpg'))).get_uri()
+    other = Gio.File.new_for_path(str(tmpdir.join('other.png'))).get_uri()
+
+    assert fetcher.find_covers(track) == [cover, other]
+
+    # the listing is reused until the directory is checked again
+    tmpdir.join('other.png').remove()
+    assert fetcher.find_covers(track) == [cover, other]
+    monkeypatch.setattr(covers, '_LOCALFILE_CHECK_INTERVAL', 0)
+    os.utime(str(tmpdir), (0, 0))
+    assert fetcher.find_covers(track) == [cover]
+
+
+def test_walk_incomplete(tmpdir):
+    from gi.repository import Gio
+
+    tmpdir.mkdir('a').join('track.ogg').write('')
+    link = tmpdir.mkdir('b').join('link.ogg')
+    link.mksymlinkto(tmpdir.join('a', 'track.ogg'), absolute=0)
+    root = Gio.File.new_for_path(str(tmpdir))
+
+    incomplete = set()
+    files = [f.get_basename() for f, info in common.walk_with_info(root, incomplete)]
+    assert 'link.ogg' not in files
+    assert incomplete == set([root.get_child('b').get_uri()])
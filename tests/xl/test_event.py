@@ -98,3 +98,150 @@ def test_thread_events():
     ncb.destroy()
 
     _finish_events()
+
+
+class Recorder(object):
+    def __init__(self):
+        self.calls = []
+
+    def on_cb(self, type, obj, data):
+        self.calls.append((type, obj))
+
+
+def test_dispatch():
+    _init_events()
+    any_event = Recorder()
+    from_source = Recorder()
+    source = Recorder()
+    other = Recorder()
+
+    event.add_callback(any_event.on_cb)
+    event.add_callback(from_source.on_cb, 'test', source)
+    on_ui_thread[0] = True
+    event.log_event('test', source, None)
+    event.log_event('test', other, None)
+    event.log_event('other', None, None)
+
+    assert any_event.calls == [('test', source), ('test', other), ('other', None)]
+    assert from_source.calls == [('test', source)]
+
+    event.remove_callback(any_event.on_cb)
+    event.remove_callback(from_source.on_cb, 'test', source)
+    event.log_event('test', source, None)
+    assert len(any_event.calls) == 3
+    assert len(from_source.calls) == 1
+
+    _finish_events()
+
+
+def test_profiling():
+    _init_events()
+    ncb = NormalCallback()
+    assert event.EVENT_MANAGER.get_profile() is None
+
+    event.EVENT_MANAGER.set_profiling(True)
+    on_ui_thread[0] = True
+    event.log_event('test', ncb, None)
+    event.log_event('test', ncb, None)
+    profile = event.EVENT_MANAGER.get_profile()
+
+    assert profile['events']['test'][0] == 2
+    [(key, stats)] = profile['callbacks'].items()
+    assert key[0] == 'test'
+    assert key[1].endswith('.NormalCallback.on_cb')
+    assert stats[0] == 2
+
+    event.EVENT_MANAGER.set_profiling(False)
+    ncb.destroy()
+    _finish_events()
+
+
+def test_batch():
+    _init_events()
+    single = Recorder()
+    batched = []
+    source = Recorder()
+    other = Recorder()
+
+    def on_batch(type, obj, data):
+        batched.append(data)
+
+    event.add_callback(single.on_cb, 'test')
+    event.add_callback(on_batch, 'test_batch')
+    on_ui_thread[0] = True
+
+    event.log_batched_event('test', source, {'a'})
+    assert batched == [{source: {'a'}}]
+
+    with event.batch():
+        event.log_batched_event('test', source, {'a'})
+        with event.batch():
+            event.log_batched_event('test', other, {'b'})
+        event.log_batched_event('test', source, {'c'})
+        assert len(batched) == 1
+
+    assert batched[1] == {source: {'a', 'c'}, other: {'b'}}
+    assert len(single.calls) == 4
+
+    event.remove_callback(single.on_cb, 'test')
+    event.remove_callback(on_batch, 'test_batch')
+    _finish_events()
+
+
+def test_batch_pending_ui(monkeypatch):
+    _init_events()
+    single = Recorder()
+    batched = Recorder()
+    idle = []
+    monkeypatch.setattr(GLib, 'idle_add', lambda fn, *args: idle.append(fn))
+
+    event.add_callback(single.on_cb, 'test')
+    event.add_ui_callback(batched.on_cb, 'test_batch')
+
+    def _run():
+        with event.batch():
+            for i in range(10):
+                event.log_batched_event('test', Recorder(), {'a'})
+
+    t = threading.Thread(target=_run)
+    t.start()
+    t.join()
+
+    # only the batched variant has UI callbacks
+    assert len(single.calls) == 10
+    assert len(event.EVENT_MANAGER.pending_ui) == 1
+    assert len(idle) == 1
+
+    idle[0]()
+    assert batched.calls == [('test_batch', None)]
+
+    event.remove_callback(single.on_cb, 'test')
+    event.remove_callback(batched.on_cb, 'test_batch')
+    _finish_events()
+
+
+def test_profiling_thread():
+    _init_events()
+    ucb = UiCallback()
+    ncb = NormalCallback()
+    event.EVENT_MANAGER.set_profiling(True)
+
+    def _run():
+        on_ui_thread[0] = False
+        event.log_event('test', ucb, None)
+
+    t = threading.Thread(target=_run)
+    t.start()
+    t.join()
+
+    # the event is handled for other threads and for the UI thread, but
+    # only counted once
+    assert ucb.called is True
+    profile = event.EVENT_MANAGER.get_profile()
+    assert profile['events']['test'][0] == 1
+    assert len(profile['callbacks']) == 2
+
+    event.EVENT_MANAGER.set_profiling(False)
+    ucb.destroy()
+    ncb.destroy()
+    _finish_events()
@@ -0,0 +1,50 @@
+from xl import formatter, providers
+from xl.trax import Track
+
+
+class StubTagFormatter(formatter.TagFormatter):
+    def format(self, track, parameters):
+        return u'stub-%s' % parameters.get('value', '')
+
+
+def get_track():
+    track = Track('/foo/bar.ogg', scan=False)
+    track.set_tag_raw('title', u'Title')
+    track.set_tag_raw('tracknumber', u'3/12')
+    return track
+
+
+def test_format():
+    track = get_track()
+    tf = formatter.TrackFormatter(
+        u'$$ ${tracknumber:pad=3, padstring=0} - ${title:prefix=<, suffix=>}'
+        u'${artist:prefix=<} $title'
+    )
+    assert tf.format(track) == u'$ 003 - <Title> Title'
+    assert tf.extract() == {
+        u'tracknumber:pad=3, padstring=0': (
+            u'tracknumber',
+            {u'pad': u'3', u'padstring': u'0'},
+        ),
+        u'title:prefix=<, suffix=>': (u'title', {u'prefix': u'<', u'suffix': u'>'}),
+        u'artist:prefix=<': (u'artist', {u'prefix': u'<'}),
+        u'title': (u'title', {}),
+    }
+
+    track.set_tag_raw('title', u'A & B')
+    tf.props.format = u'<b>$title</b>'
+    assert tf.format(track, markup_escape=True) == u'<b>A &amp; B</b>'
+
+
+def test_format_providers():
+    track = get_track()
+    tf = formatter.TrackFormatter(u'${stubtag:value=1}')
+    assert tf.format(track) == u''
+
+    stub = StubTagFormatter('stubtag')
+    providers.register('tag-formatting', stub)
+    try:
+        assert tf.format(track) == u'stub-1'
+    finally:
+        providers.unregister('tag-formatting', stub)
+    assert tf.format(track) == u''
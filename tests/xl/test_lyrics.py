@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+from xl import lyrics, xdg
+from xl.trax import Track
+
+
+class StubMethod(lyrics.LyricSearchMethod):
+    name = 'stub'
+    display_name = 'Stub'
+
+    def __init__(self, found, error=lyrics.LyricsNotAvailableException):
+        self.found = found
+        self.error = error
+        self.calls = 0
+
+    def find_lyrics(self, track):
+        self.calls += 1
+        if not self.found:
+            raise self.error()
+        return (self.found, self.name, '')
+
+
+def test_cache_flush(tmpdir):
+    cache = lyrics.LyricsCache(str(tmpdir.join('lyrics.cache')))
+    value = ('lyrics', 'source', 'url', datetime.now())
+
+    cache['a'] = value
+    assert cache['a'] == value
+    assert 'a' in cache
+    assert cache.keys() == ['a']
+    assert 'a' not in cache.db
+
+    cache.flush()
+    assert cache.db['a'] == value
+    assert cache['a'] == value
+
+    del cache['a']
+    assert 'a' not in cache
+    assert cache['a'] is None
+    assert 'a' in cache.db
+
+    cache.flush()
+    assert 'a' not in cache.db
+    assert len(cache) == 0
+
+
+def test_cache_expire(tmpdir):
+    cache = lyrics.LyricsCache(str(tmpdir.join('lyrics.cache')))
+    now = datetime.now()
+    for hours in range(5):
+        cache[str(hours)] = ('lyrics', 'source', 'url', now - timedelta(hours=hours))
+
+    assert cache.expire(timedelta(hours=3.5)) == 1
+    assert sorted(cache.keys()) == ['0', '1', '2', '3']
+
+    # the oldest entries are removed first
+    assert cache.expire(timedelta(hours=3.5), 2) == 2
+    assert sorted(cache.keys()) == ['0', '1']
+
+
+def test_negative_cache(tmpdir, monkeypatch):
+    monkeypatch.setattr(xdg, 'get_cache_dir', lambda: str(tmpdir))
+    manager = lyrics.LyricsManager()
+    method = StubMethod(None)
+    track = Track('/foo')
+    track.set_tags(artist=u'artist', title=u'title')
+
+    for i in range(2):
+        try:
+            manager._find_cached_lyrics(method, track)
+        except lyrics.LyricsNotFoundException:
+            pass
+    assert method.calls == 1
+
+    method.found = u'lyrics'
+    assert manager._find_cached_lyrics(method, track, refresh=True)[0] == u'lyrics'
+    assert manager._find_cached_lyrics(method, track)[0] == u'lyrics'
+    assert method.calls == 2
+
+
+def test_negative_cache_errors(tmpdir, monkeypatch):
+    monkeypatch.setattr(xdg, 'get_cache_dir', lambda: str(tmpdir))
+    manager = lyrics.LyricsManager()
+    # such as when offline
+    method = StubMethod(None, lyrics.LyricsNotFoundException)
+    track = Track('/foo')
+    track.set_tags(artist=u'artist', title=u'title')
+
+    for i in range(2):
+        try:
+            manager._find_cached_lyrics(method, track)
+        except lyrics.LyricsNotFoundException:
+            pass
+    assert method.calls == 2
@@ -0,0 +1,11 @@
+from xl import metadata
+
+
+def test_header_only(test_track):
+    full = metadata.get_format(test_track.uri)
+    header = metadata.get_format(test_track.uri, header_only=True)
+    assert header.read_all() == full.read_all()
+
+    # large tags are loaded when they are read
+    tags = ['cover', 'lyrics', 'title']
+    assert header.read_tags(tags) == full.read_tags(tags)
@@ -0,0 +1,30 @@
+from xl import settings
+
+
+def test_option_cache():
+    manager = settings.SettingsManager(None)
+    assert manager.get_option('test/list', None) is None
+
+    manager.set_option('test/list', [1, 2], save=False)
+    value = manager.get_option('test/list')
+    assert value == [1, 2]
+    value.append(3)
+    assert manager.get_option('test/list') == [1, 2]
+
+    manager._set_direct('test/list', 'I: 4')
+    assert manager.get_option('test/list') == 4
+
+    manager.remove_option('test/list')
+    assert manager.get_option('test/list', 'default') == 'default'
+
+
+def test_subscribe_option():
+    manager = settings.SettingsManager(None)
+    subscription = manager.subscribe_option('test/flag', True)
+    assert subscription.value is True
+
+    manager.set_option('test/flag', False, save=False)
+    assert subscription.value is False
+
+    manager.remove_option('test/flag')
+    assert subscription.value is True
@@ -0,0 +1,137 @@
+# -*- coding: utf-8
+
+from xl.trax import index
+from xl.trax import search
+from xl.trax import track
+from xl.trax import trackdb
+
+import pytest
+
+
+def get_tracks():
+    tracks = [track.Track('file:///index/%d' % i) for i in range(5)]
+    tracks[0].set_tag_raw('artist', u'Foo')
+    tracks[1].set_tag_raw('artist', [u'foobar', u'Baz'])
+    tracks[2].set_tag_raw('artist', u'mötley crüe')
+    tracks[3].set_tag_raw('album', u'Foo')
+    tracks[3].set_tag_raw('__compilation', (u'/index', u'foo'))
+    return tracks
+
+
+class TestTagIndex(object):
+    def setup(self):
+        self.tracks = get_tracks()
+        self.index = index.TagIndex()
+        self.index.add_tracks(self.tracks)
+
+    def test_len(self):
+        assert len(self.index) == 5
+        assert self.tracks[0] in self.index
+
+    def test_lookup_exact(self):
+        assert self.index.lookup_exact('artist', u'foo') == {self.tracks[0]}
+        assert self.index.lookup_exact('artist', u'FOO') == {self.tracks[0]}
+        assert self.index.lookup_exact('artist', u'baz') == {self.tracks[1]}
+        assert self.index.lookup_exact('artist', u'nope') == set()
+
+    def test_lookup_exact_marks(self):
+        assert self.index.lookup_exact('artist', u'motley crue') == {self.tracks[2]}
+
+    def test_lookup_exact_alias(self):
+        assert self.index.lookup_exact('albumartist', u'foo') == {self.tracks[0]}
+
+    def test_lookup_substring(self):
+        assert self.index.lookup_substring('artist', u'foo') == {
+            self.tracks[0],
+            self.tracks[1],
+        }
+        assert self.index.lookup_substring('artist', u'') == set(self.tracks[:3])
+
+    def test_lookup_null(self):
+        assert self.index.lookup_null('artist') == {self.tracks[3], self.tracks[4]}
+        assert self.index.lookup_null('__compilation') == set(
+            self.tracks[:3] + self.tracks[4:]
+        )
+
+    def test_unindexed_tags(self):
+        assert self.index.lookup_exact('tracknumber', u'1') is None
+        assert self.index.lookup_substring('__loc', u'index') is None
+        assert self.index.lookup_null('__length') is None
+
+    def test_update(self):
+        self.tracks[0].set_tag_raw('artist', u'Quux', notify_changed=False)
+        self.index.update(self.tracks[0], ['artist'])
+        assert self.index.lookup_exact('artist', u'foo') == set()
+        assert self.index.lookup_exact('artist', u'quux') == {self.tracks[0]}
+
+    def test_remove(self):
+        self.index.remove(self.tracks[1])
+        assert self.index.lookup_substring('artist', u'foo') == {self.tracks[0]}
+        assert self.tracks[1] not in self.index.lookup_null('artist')
+
+
+class TestIndexedSearch(object):
+    def setup(self):
+        self.tracks = get_tracks()
+        self.db = trackdb.TrackDB()
+        self.db.add_tracks(self.tracks)
+
+    @pytest.mark.parametrize(
+        "query",
+        [
+            u'artist==foo',
+            u'artist=foo',
+            u'artist==__null__',
+            u'albumartist==foo',
+            u'foo',
+            u'foo | crue',
+            u'! foo',
+            u'foo album=foo',
+            u'__compilation==__null__ foo',
+            u'tracknumber==1',
+            u'motley',
+        ],
+    )
+    def test_same_results(self, query):
+        kwargs = dict(case_sensitive=False, keyword_tags=['artist', 'album'])
+        expected = {
+            r.track
+            for r in search.search_tracks_from_string(self.tracks, query, **kwargs)
+        }
+        result = {
+            r.track for r in search.search_tracks_from_string(self.db, query, **kwargs)
+        }
+        assert result == expected
+
+        result = {
+            r.track
+            for r in search.search_tracks_from_string(
+                self.tracks, query, index=self.db.tag_index, **kwargs
+            )
+        }
+        assert result == expected
+
+    def test_candidates(self):
+        matcher = search.TracksMatcher(u'artist==foo', case_sensitive=False)
+        assert matcher.candidates(self.db.tag_index) == {self.tracks[0]}
+        matcher = search.TracksMatcher(u'artist~foo')
+        assert matcher.candidates(self.db.tag_index) is None
+
+    def test_tags_changed(self):
+        self.tracks[4].set_tag_raw('artist', u'Foo')
+        result = search.search_tracks_from_string(
+            self.db, u'artist==foo', case_sensitive=False
+        )
+        assert {r.track for r in result} == {self.tracks[0], self.tracks[4]}
+
+    def test_removed(self):
+        self.db.remove(self.tracks[0])
+        result = list(search.search_tracks_from_string(self.db, u'artist=foo'))
+        assert [r.track for r in result] == [self.tracks[1]]
+
+    def test_in_list_outside_db(self):
+        other = track.Track('file:///index/other')
+        other.set_tag_raw('artist', u'foo')
+        matcher = search.TracksInList([other, self.tracks[0]])
+        result = [r.track for r in search.search_tracks(self.db, [matcher])]
+        assert result == [self.tracks[0]]
@@ -0,0 +1,131 @@
+try:
+    import dbm
+except ImportError:
+    dbm = None
+
+try:
+    import gdbm
+except ImportError:
+    gdbm = None
+
+try:
+    import dumbdbm
+except ImportError:
+    dumbdbm = None
+
+import glob
+import os
+from os.path import basename, dirname, join
+import pickle
+import shutil
+
+import pytest
+
+from xl.common import Journal, is_journal
+from xl.migrations.database import shelf_to_journal
+
+
+@pytest.fixture
+def path(tmpdir):
+    return str(tmpdir.join('music.db'))
+
+
+def test_roundtrip(path):
+    db = Journal(path)
+    db['name'] = 'Collection'
+    db[u'tracks-1'] = ({'title': [u'caf\xe9']}, 1, {})
+    db['tracks-2'] = ({'title': [u'two']}, 2, {})
+    db['tracks-2'] = ({'title': [u'deux']}, 2, {})
+    del db['tracks-1']
+    db.close()
+
+    assert is_journal(path)
+
+    db = Journal(path)
+    assert sorted(db.keys()) == ['name', 'tracks-2']
+    assert db['name'] == 'Collection'
+    assert db['tracks-2'][0] == {'title': [u'deux']}
+    assert 'tracks-1' not in db
+    with pytest.raises(KeyError):
+        del db['tracks-1']
+    db.close()
+
+
+def test_torn_record(path):
+    db = Journal(path)
+    db['name'] = 'Collection'
+    db.close()
+    size = os.path.getsize(path)
+
+    with open(path, 'ab') as fp:
+        fp.write('S\x00\x00\x00\x04\x00\x00')
+
+    db = Journal(path)
+    assert db.keys() == ['name']
+    assert os.path.getsize(path) == size
+    db.close()
+
+
+def test_compact(path):
+    db = Journal(path)
+    db.min_compact_size = 0
+    for i in range(10):
+        db['key'] = i
+    db['other'] = 'value'
+    size = os.path.getsize(path)
+    db.sync()
+
+    assert os.path.getsize(path) < size
+    assert db['key'] == 9
+    db['key'] = 10
+    db.close()
+
+    db = Journal(path)
+    assert db['key'] == 10
+    assert db['other'] == 'value'
+    db.close()
+
+
+@pytest.fixture(params=['dbm', 'gdbm', 'dumbdbm'])
+def data(request, tmpdir):
+    dbtype = request.param
+    base = join(dirname(__file__), '..', '..', 'data', 'db')
+    truth = {}
+
+    # uses pickle instead of JSON because of unicode issues...
+    with open(join(base, 'music.db.pickle')) as fp:
+        truth = pickle.load(fp)
+
+    if globals()[dbtype] is None:
+        pytest.skip('Module %s does not exist' % dbtype)
+    else:
+        # copy the test data to a tempdir
+        loc = str(tmpdir.mkdir(dbtype))
+
+        for f in glob.glob(join(base, dbtype, 'music.*')):
+            shutil.copyfile(f, join(loc, basename(f)))
+
+        return truth, loc, dbtype
+
+
+def test_migration(data):
+    truth, loc, dbtype = data
+    path = join(loc, 'music.db')
+
+    assert shelf_to_journal.needs_migration(path)
+    try:
+        shelf_to_journal.migrate(path)
+    except Exception as e:
+        if dbtype == 'dbm' and getattr(e, 'args', (None,))[0] == 2:
+            # see test_bsddb_migration
+            pytest.skip("Invalid dbm module")
+            return
+        raise
+
+    assert not shelf_to_journal.needs_migration(path)
+
+    db = Journal(path)
+    for k, v in truth.iteritems():
+        assert k in db
+        assert v == db[k]
+    db.close()
@@ -354,6 +354,45 @@ class TestTracksMatcher(object):
         self.str.track.set_tag_raw('artist', 'bar')
         assert not matcher.match(self.str)
 
+    def test_compiled_cache(self):
+        matcher_1 = search.TracksMatcher("foo artist=bar", keyword_tags=['artist'])
+        matcher_2 = search.TracksMatcher("foo artist=bar", keyword_tags=['artist'])
+        matcher_3 = search.TracksMatcher("foo artist=bar", keyword_tags=['album'])
+        assert matcher_1.matchers is not matcher_2.matchers
+        assert matcher_1.matchers[1] is matcher_2.matchers[1]
+        assert matcher_1.matchers[1] is not matcher_3.matchers[1]
+
+        # keyword matchers keep their own matched tags
+        assert matcher_1.matchers[0] is not matcher_2.matchers[0]
+        assert matcher_1.matchers[0].matchers is matcher_2.matchers[0].matchers
+
+    def test_match_tag_lookups(self, monkeypatch):
+        matcher = search.TracksMatcher("foo oo artist=o", keyword_tags=['artist'])
+        self.str.track.set_tag_raw('artist', 'foo')
+        lookups = []
+        get_tag_search = track.Track.get_tag_search
+
+        def counted(tr, tag, **kwargs):
+            lookups.append(tag)
+            return get_tag_search(tr, tag, **kwargs)
+
+        monkeypatch.setattr(track.Track, 'get_tag_search', counted)
+        assert matcher.match(self.str)
+        assert lookups == ['artist']
+
+        # the values are kept by the track until its tags change
+        assert matcher.match(self.str)
+        assert lookups == ['artist']
+        self.str.track.set_tag_raw('artist', 'bar')
+        assert not matcher.match(self.str)
+        assert lookups == ['artist', 'artist']
+
+    def test_match_case_insensitive_marks(self):
+        matcher = search.TracksMatcher(u"artist=motley", case_sensitive=False)
+        self.str.track.set_tag_raw('artist', u'M\xf6tley Cr\xfce')
+        assert matcher.match(self.str)
+        assert self.str.track._get_search_values('artist', True) == [u'motley crue']
+
 
 class TestSearchTracks(object):
     def test_search_tracks(self):
@@ -5,6 +5,7 @@ import unittest
 import logging
 import random
 import string
+import threading
 import types
 
 from gi.repository import GLib
@@ -74,6 +75,26 @@ class Test_MetadataCacher(object):
     def test_remove_not_exist(self):
         assert self.mc.remove('foo') is None
 
+    def test_changed_file(self, tmpdir):
+        path = tmpdir.join('foo')
+        path.write('foo')
+        formatobj = types.ModuleType('format')
+        formatobj.loc = str(path)
+
+        self.mc.add('foo', formatobj)
+        assert self.mc.get('foo') is formatobj
+        path.setmtime(path.mtime() - 10)
+        assert self.mc.get('foo') is None
+
+    def test_max_entries(self):
+        mc = track._MetadataCacher(self.TIMEOUT, 2)
+        mc.add('foo', 'foo')
+        mc.add('bar', 'bar')
+        assert mc.get('foo') == 'foo'
+        mc.add('baz', 'baz')
+        assert mc.get('bar') is None
+        assert mc.get('foo') == 'foo'
+
 
 def random_str(l=8):
     return ''.join(random.choice(string.ascii_letters) for _ in range(l))
@@ -137,6 +158,26 @@ class TestTrack(object):
         tr2 = track.Track(_unpickles={'artist': [u'my_artist'], '__loc': u'uri'})
         assert tr1 is tr2
 
+    def test_unpickles_compact(self):
+        tr1 = track.Track(
+            _unpickles={
+                'artist': [u'compact_artist'],
+                'genre': [u'a', u'b'],
+                '__length': '12.5',
+                '__loc': u'file:///compact/1',
+            }
+        )
+        tr2 = track.Track(
+            _unpickles={'artist': [u'compact_artist'], '__loc': u'file:///compact/2'}
+        )
+        assert tr1.get_tag_raw('artist') == [u'compact_artist']
+        assert tr1.get_tag_raw('genre') == [u'a', u'b']
+        assert tr1.get_tag_raw('__length') == 12.5
+        assert tr1._pickles()['artist'] == [u'compact_artist']
+
+        # values of shared tags are interned
+        assert tr1.get_tag_raw('artist')[0] is tr2.get_tag_raw('artist')[0]
+
     def test_takes_nonurl(self, test_track):
         tr = track.Track(test_track.filename)
 
@@ -195,6 +236,17 @@ class TestTrack(object):
         # second, ensure that we can no longer read them
         assert not tr.read_tags()
 
+    def test_read_tags_unchanged(self, test_track_fp, monkeypatch):
+
+        tr = track.Track(test_track_fp.name)
+        assert tr.get_tag_raw('__modified') is not None
+
+        def get_format(loc):
+            raise AssertionError("unchanged file should not be opened")
+
+        monkeypatch.setattr(track.metadata, 'get_format', get_format)
+        assert tr.read_tags(force=False) is True
+
     def test_write_tags_no_perms(self, test_track_fp):
 
         os.chmod(test_track_fp.name, 0o444)
@@ -203,6 +255,58 @@ class TestTrack(object):
         tr.set_tag_raw('artist', random_str())
         assert not tr.write_tags()
 
+    def test_use_format_obj(self, test_tracks):
+        tr = track.Track(test_tracks.get('.mp3').filename)
+
+        with tr._use_format_obj() as f:
+            # other threads wait until the object is no longer used
+            acquired = []
+            thread = threading.Thread(
+                target=lambda: acquired.append(f.lock.acquire(False))
+            )
+            thread.start()
+            thread.join()
+            assert acquired == [False]
+
+        with pytest.raises(ValueError):
+            with tr._use_format_obj() as cached:
+                assert cached is f
+                raise ValueError
+
+        # dropped from the cache, as it may not match the file anymore
+        with tr._use_format_obj() as cached:
+            assert cached is not f
+
+    def test_search_values_limit(self, monkeypatch):
+        monkeypatch.setattr(track, '_SEARCH_VALUES_LIMIT', 2)
+        monkeypatch.setattr(track.Track, '_Track__search_trackdb_size', 0)
+        track.Track._clear_search_values()
+        tracks = [track.Track('/foo%d' % i) for i in range(3)]
+        for tr in tracks:
+            tr.set_tag_raw('artist', u'Artist')
+            assert tr._get_search_values('artist', True) == [u'artist']
+
+        # all values are dropped once there are too many
+        assert tracks[0]._search_values is None
+        assert tracks[1]._search_values is None
+        assert tracks[2]._search_values is not None
+
+        track.Track._clear_search_values()
+        assert tracks[2]._search_values is None
+
+    def test_prune_interned_values(self, monkeypatch):
+        monkeypatch.setattr(track, '_interned_values', {})
+        kept = track.Track('/foo0')
+        kept.set_tag_raw('artist', u'Kept artist')
+        dropped = track.Track('/foo1')
+        # not a constant of this function, which would keep it used
+        dropped.set_tag_raw('artist', u'Dropped %s' % 'artist')
+        del dropped
+
+        track._prune_interned_values()
+        assert track._interned_values.keys() == [u'Kept artist']
+        assert kept.get_tag_raw('artist') == [u'Kept artist']
+
     def test_write_tag(self, writeable_track, writeable_track_name):
 
         artist = random_str()
@@ -0,0 +1,114 @@
+from xl.trax import search
+from xl.trax import track
+from xl.trax import trackdb
+
+
+def save_tracks(path):
+    db = trackdb.TrackDB(storage='journal')
+    tracks = [track.Track('file:///lazy/%d' % i) for i in range(3)]
+    for i, tr in enumerate(tracks):
+        tr.set_tags(artist=u'artist%d' % i, comment=u'comment%d' % i)
+    db.add_tracks(tracks)
+    db.save_to_location(path)
+
+    for key in track.Track._Track__tracksdict.keys():
+        del track.Track._Track__tracksdict[key]
+
+
+def test_lazy_load(tmpdir):
+    path = str(tmpdir.join('music.db'))
+    save_tracks(path)
+
+    db = trackdb.TrackDB(location=path, storage='journal')
+    tr = db.get_track_by_loc('file:///lazy/1')
+    assert tr._is_partial()
+    assert tr.get_tag_raw('artist') == [u'artist1']
+    assert tr._is_partial()
+
+    # the tracks are unique even before they are fully loaded
+    assert track.Track('file:///lazy/1') is tr
+
+    result = search.search_tracks_from_string(db, u'artist==artist1')
+    assert [r.track for r in result] == [tr]
+    assert tr._is_partial()
+
+    assert tr.get_tag_raw('comment') == [u'comment1']
+    assert not tr._is_partial()
+
+    result = search.search_tracks_from_string(db, u'comment==comment2')
+    assert [r.track.get_loc_for_io() for r in result] == ['file:///lazy/2']
+
+
+def test_lazy_load_existing(tmpdir):
+    path = str(tmpdir.join('music.db'))
+    db = trackdb.TrackDB(storage='journal')
+    tr = track.Track('file:///lazy/existing')
+    tr.set_tags(__last_played=1234.0, __startoffset=5)
+    db.add_tracks([tr])
+    db.save_to_location(path)
+    del db, tr
+    for key in track.Track._Track__tracksdict.keys():
+        del track.Track._Track__tracksdict[key]
+
+    # internal tags are merged into a track that already exists
+    tr = track.Track('file:///lazy/existing')
+    db = trackdb.TrackDB(location=path, storage='journal')
+    assert db.get_track_by_loc('file:///lazy/existing') is tr
+    assert tr.get_tag_raw('__last_played') == 1234.0
+    assert tr.get_tag_raw('__startoffset') == 5
+
+
+def test_save_partial(tmpdir):
+    path = str(tmpdir.join('music.db'))
+    save_tracks(path)
+
+    db = trackdb.TrackDB(location=path, storage='journal')
+    tr = db.get_track_by_loc('file:///lazy/0')
+    tr.set_tags(__rating=5)
+    assert tr._is_partial()
+    db.save_to_location()
+
+    assert db._storage.open()['tracks-0'][0]['comment'] == [u'comment0']
+    assert db._storage.open()['summary-0'][0]['__rating'] == 5
+
+
+def test_save_not_notified(tmpdir):
+    path = str(tmpdir.join('music.db'))
+    save_tracks(path)
+
+    db = trackdb.TrackDB(location=path, storage='journal')
+    tr = db.get_track_by_loc('file:///lazy/1')
+    tr.set_tags(notify_changed=False, comment=u'changed')
+    assert tr._dirty
+    db.save_to_location()
+
+    assert not tr._dirty
+    assert db._storage.open()['tracks-1'][0]['comment'] == [u'changed']
+
+
+def test_search_values_cached(monkeypatch):
+    monkeypatch.setattr(track, '_SEARCH_VALUES_LIMIT', 2)
+    monkeypatch.setattr(track.Track, '_Track__search_trackdb_size', 0)
+    db = trackdb.TrackDB()
+    tracks = [track.Track('file:///cached/%d' % i) for i in range(5)]
+    for i, tr in enumerate(tracks):
+        tr.set_tags(artist=u'artist%d' % i)
+    db.add_tracks(tracks)
+
+    lookups = []
+    get_tag_search = track.Track.get_tag_search
+
+    def counting_get_tag_search(self, *args, **kwargs):
+        lookups.append(self)
+        return get_tag_search(self, *args, **kwargs)
+
+    monkeypatch.setattr(track.Track, 'get_tag_search', counting_get_tag_search)
+
+    # the values of all tracks of the db are kept between searches
+    for i in range(2):
+        result = search.search_tracks_from_string(tracks, u'artist=artist3')
+        assert [r.track for r in result] == [tracks[3]]
+    assert len(lookups) == 5
+
+    search.clear_search_cache()
+    assert all(tr._search_values is None for tr in tracks)
@@ -8,6 +8,7 @@ from gi.repository import Gio
 import xl.collection
 import xl.trax.search
 import xl.trax.track
+import xl.trax.trackdb
 import xl.trax.util
 
 
@@ -142,3 +143,50 @@ class TestSortResultTracks(object):
         assert xl.trax.util.sort_result_tracks(self.fields, self.tracks, True) == list(
             reversed(self.result)
         )
+
+
+class TestSortKeyCache(object):
+    def setup(self):
+        self.tracks = [
+            xl.trax.track.Track(url) for url in ('/tmp/foo', '/tmp/bar', '/tmp/baz')
+        ]
+        for track, val in zip(self.tracks, 'aab'):
+            track.set_tag_raw('artist', val)
+        for track, val in zip(self.tracks, '212'):
+            track.set_tag_raw('discnumber', val)
+        self.db = xl.trax.trackdb.TrackDB()
+        self.db.add_tracks(self.tracks)
+        self.fields = ('artist', 'discnumber')
+        self.result = [self.tracks[1], self.tracks[0], self.tracks[2]]
+
+    def test_sorted(self):
+        assert (
+            xl.trax.util.sort_tracks(self.fields, self.tracks, cache=self.db.sort_keys)
+            == self.result
+        )
+
+    def test_keys(self):
+        keys = self.db.sort_keys.get_keys(self.tracks[0], self.fields)
+        assert keys == tuple(self.tracks[0].get_tag_sort(f) for f in self.fields)
+
+    def test_not_member(self):
+        track = xl.trax.track.Track('/tmp/quux')
+        assert self.db.sort_keys.lookup(track, self.fields) is None
+        assert self.db.sort_keys.get_keys(track, self.fields) is not None
+
+    def test_tags_changed(self):
+        self.db.sort_keys.get_keys(self.tracks[2], self.fields)
+        self.tracks[2].set_tag_raw('artist', '0')
+        assert xl.trax.util.sort_tracks(self.fields, self.tracks) == [
+            self.tracks[2],
+            self.tracks[1],
+            self.tracks[0],
+        ]
+
+    def test_strip_list_changed(self):
+        self.db.sort_keys.get_keys(self.tracks[0], self.fields)
+        self.db.sort_keys._on_option_set(
+            'collection_option_set', None, 'collection/strip_list'
+        )
+        assert self.db.sort_keys.lookup(self.tracks[0], ['artist']) is not None
+        assert self.db.sort_keys._columns.keys() == [('artist', False)]
@@ -0,0 +1,77 @@
+#!/usr/bin/env python2
+# Copyright (C) 2008-2010 Adam Olsen
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# The developers of the Exaile media player hereby grant permission
+# for non-GPL compatible GStreamer and Exaile plugins to be used and
+# distributed together with GStreamer and Exaile. This permission is
+# above and beyond the permissions granted by the GPL license by which
+# Exaile is covered. If you modify this code, you may extend this
+# exception to your version of the code, but you are not obligated to
+# do so. If you do not wish to do so, delete this exception statement
+# from your version.
+
+'''
+    Scans a directory into an empty collection under the profiler and
+    reports the time the committing thread spent getting options, that
+    thread checks each track for compilations. Run it on two
+    revisions to compare them, usage:
+
+        EXAILE_DIR=. python2 tools/benchmarks/collection_scan.py musicdir
+
+    The tags are read by other threads, which are not profiled.
+'''
+
+import cProfile
+import os
+import pstats
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+
+    from gi.repository import Gio
+    from xl import collection
+
+    uri = Gio.File.new_for_commandline_arg(sys.argv[1]).get_uri()
+    coll = collection.Collection('benchmark')
+    coll.add_library(collection.Library(uri))
+
+    profile = cProfile.Profile()
+    start = time.time()
+    profile.runcall(coll.rescan_libraries, force_update=True)
+    elapsed = time.time() - start
+
+    calls = 0
+    spent = 0.0
+    settings_file = os.path.join('xl', 'settings.py')
+    for (filename, line, name), values in pstats.Stats(profile).stats.iteritems():
+        if name == 'get_option' and filename.endswith(settings_file):
+            calls += values[1]
+            spent += values[3]
+
+    print("scanned  %8d tracks in %.3f s" % (len(coll), elapsed))
+    print("settings %8d get_option calls, %.3f s" % (calls, spent))
+
+
+if __name__ == '__main__':
+    main()
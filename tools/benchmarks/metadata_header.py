@@ -0,0 +1,141 @@
+#!/usr/bin/env python2
+# Copyright (C) 2008-2010 Adam Olsen
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# The developers of the Exaile media player hereby grant permission
+# for non-GPL compatible GStreamer and Exaile plugins to be used and
+# distributed together with GStreamer and Exaile. This permission is
+# above and beyond the permissions granted by the GPL license by which
+# Exaile is covered. If you modify this code, you may extend this
+# exception to your version of the code, but you are not obligated to
+# do so. If you do not wish to do so, delete this exception statement
+# from your version.
+
+'''
+    Compares the time and memory it takes to read the tags of files with
+    large embedded covers, with the whole file loaded and with only the
+    header loaded, as done when scanning the collection.
+
+    The audio files found in a directory are copied, and a random cover
+    of mib MiB (8 by default) is embedded into each copy. Only formats
+    which can skip covers are used. Each mode is measured in a separate
+    process, usage:
+
+        EXAILE_DIR=. python2 tools/benchmarks/metadata_header.py musicdir [nfiles [mib]]
+'''
+
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+
+def build_corpus(directory, limit, cover_size, corpus):
+    '''Copies up to limit files and embeds a cover in them'''
+    from xl import metadata
+    from xl.metadata import BaseFormat
+
+    cover = metadata.CoverImage(
+        type=3, desc=u'', mime='image/jpeg', data=os.urandom(cover_size)
+    )
+    count = 0
+    for root, dirs, files in os.walk(directory):
+        for name in sorted(files):
+            formatclass = metadata.formats.get(os.path.splitext(name)[1][1:].lower())
+            if (
+                formatclass is None
+                or formatclass._load_header == BaseFormat._load_header
+            ):
+                continue
+            path = os.path.join(corpus, '%d-%s' % (count, name))
+            shutil.copy(os.path.join(root, name), path)
+            formatclass(path).write_tags({'cover': [cover]})
+            count += 1
+            if count >= limit:
+                return count
+    return count
+
+
+def measure(mode, corpus):
+    # imported before measuring, so that only the reading is counted
+    from xl import metadata
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    for name in os.listdir(corpus):
+        formatclass = metadata.formats[os.path.splitext(name)[1][1:].lower()]
+        formatclass(os.path.join(corpus, name), mode == 'header').read_all()
+    used = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    print("%s %f %d" % (mode, time.time() - start, used))
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    nfiles = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    cover_size = int(float(sys.argv[3]) * 1024 * 1024) if len(sys.argv) > 3 else 8 << 20
+
+    corpus = tempfile.mkdtemp()
+    try:
+        # built by another process, which would otherwise raise the peak
+        # memory use inherited by the measuring processes
+        output = subprocess.check_output(
+            [
+                sys.executable,
+                __file__,
+                '--build',
+                sys.argv[1],
+                str(nfiles),
+                str(cover_size),
+                corpus,
+            ]
+        )
+        count = int(output.split()[-1])
+        if not count:
+            sys.exit("No writable audio files found in %s" % sys.argv[1])
+
+        results = {}
+        for mode in ('full', 'header'):
+            output = subprocess.check_output(
+                [sys.executable, __file__, '--measure', mode, corpus]
+            )
+            name, seconds, used = output.split()[-3:]
+            results[name] = float(seconds)
+            print(
+                "%-6s %8.3f s, peak memory +%d KiB for %d files"
+                % (name, results[name], int(used), count)
+            )
+    finally:
+        shutil.rmtree(corpus)
+
+    print("speedup %7.1fx" % (results['full'] / max(results['header'], 1e-6)))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--measure':
+        measure(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) > 1 and sys.argv[1] == '--build':
+        print(
+            build_corpus(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), sys.argv[5])
+        )
+    else:
+        main()
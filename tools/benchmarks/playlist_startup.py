@@ -0,0 +1,116 @@
+#!/usr/bin/env python2
+# Copyright (C) 2008-2010 Adam Olsen
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# The developers of the Exaile media player hereby grant permission
+# for non-GPL compatible GStreamer and Exaile plugins to be used and
+# distributed together with GStreamer and Exaile. This permission is
+# above and beyond the permissions granted by the GPL license by which
+# Exaile is covered. If you modify this code, you may extend this
+# exception to your version of the code, but you are not obligated to
+# do so. If you do not wish to do so, delete this exception statement
+# from your version.
+
+'''
+    Compares the time it takes to load a saved playlist at startup when
+    the files of its tracks are read (playlist/lazy_load disabled) with
+    the time it takes when the tracks are created from the saved metadata.
+
+    The playlist is made of the audio files found in a directory. Each
+    mode is measured in a separate process, usage:
+
+        EXAILE_DIR=. python2 tools/benchmarks/playlist_startup.py musicdir [ntracks]
+
+    The files are read once while writing the playlist, so both modes
+    run with a warm disk cache. Expect a larger difference on a cold one.
+'''
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+
+def find_files(directory, limit):
+    '''Returns the paths of up to limit audio files below directory'''
+    from xl import metadata
+
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        for name in sorted(files):
+            if metadata.formats.get(os.path.splitext(name)[1][1:].lower()):
+                paths.append(os.path.join(root, name))
+                if len(paths) >= limit:
+                    return paths
+    return paths
+
+
+def write_playlist(paths, location):
+    from xl import playlist, trax
+
+    pl = playlist.Playlist('benchmark')
+    pl.extend(trax.Track(path) for path in paths)
+    pl.save_to_location(location)
+
+
+def measure(mode, location):
+    # imported before measuring, so that only the loading is counted
+    from xl import playlist, settings
+
+    settings.set_option('playlist/lazy_load', mode == 'lazy', save=False)
+    pl = playlist.Playlist('benchmark')
+    start = time.time()
+    pl.load_from_location(location)
+    print("%s %f %d" % (mode, time.time() - start, len(pl)))
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    ntracks = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    paths = find_files(sys.argv[1], ntracks)
+    if not paths:
+        sys.exit("No audio files found in %s" % sys.argv[1])
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        location = os.path.join(tmpdir, 'benchmark')
+        write_playlist(paths, location)
+
+        results = {}
+        for mode in ('eager', 'lazy'):
+            output = subprocess.check_output(
+                [sys.executable, __file__, '--measure', mode, location]
+            )
+            name, seconds, count = output.split()[-3:]
+            results[name] = float(seconds)
+            print("%-6s %8.3f s for %s tracks" % (name, results[name], count))
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print("speedup %7.1fx" % (results['eager'] / max(results['lazy'], 1e-6)))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--measure':
+        measure(sys.argv[2], sys.argv[3])
+    else:
+        main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python2
+# Copyright (C) 2008-2010 Adam Olsen
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# The developers of the Exaile media player hereby grant permission
+# for non-GPL compatible GStreamer and Exaile plugins to be used and
+# distributed together with GStreamer and Exaile. This permission is
+# above and beyond the permissions granted by the GPL license by which
+# Exaile is covered. If you modify this code, you may extend this
+# exception to your version of the code, but you are not obligated to
+# do so. If you do not wish to do so, delete this exception statement
+# from your version.
+
+'''
+    Measures the time TrackFormatter takes to format the playlist
+    columns of a synthetic collection, with the format strings compiled
+    once, and with them parsed again for every track as they were before.
+
+    Usage:
+
+        EXAILE_DIR=. python2 tools/benchmarks/track_formatter.py [ntracks]
+'''
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from track_memory import synthetic_tags
+
+#: the format strings of the default and some optional playlist columns
+TEMPLATES = [
+    '$tracknumber',
+    '$title',
+    '$album',
+    '$artist',
+    '$__length',
+    '$discnumber',
+    '$__rating',
+    '$year',
+    '$genre',
+    '$__date_added',
+]
+
+
+def measure(formatters, tracks, compiled):
+    start = time.time()
+    for track in tracks:
+        for formatter in formatters:
+            if not compiled:
+                formatter._compiled = None
+            formatter.format(track)
+    return time.time() - start
+
+
+def main():
+    from xl.formatter import TrackFormatter
+    from xl.trax.track import Track
+
+    ntracks = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    tracks = [Track(_unpickles=synthetic_tags(i)) for i in xrange(ntracks)]
+    formatters = [TrackFormatter(template) for template in TEMPLATES]
+
+    results = {}
+    for mode in ('parsed', 'compiled'):
+        results[mode] = measure(formatters, tracks, mode == 'compiled')
+        print(
+            "%-8s %8.3f s for %d tracks x %d formats"
+            % (mode, results[mode], ntracks, len(formatters))
+        )
+
+    print("speedup  %7.1fx" % (results['parsed'] / max(results['compiled'], 1e-6)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python2
+# Copyright (C) 2008-2010 Adam Olsen
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# The developers of the Exaile media player hereby grant permission
+# for non-GPL compatible GStreamer and Exaile plugins to be used and
+# distributed together with GStreamer and Exaile. This permission is
+# above and beyond the permissions granted by the GPL license by which
+# Exaile is covered. If you modify this code, you may extend this
+# exception to your version of the code, but you are not obligated to
+# do so. If you do not wish to do so, delete this exception statement
+# from your version.
+
+'''
+    Compares the memory used by the tags of a synthetic collection, as
+    stored by Track objects, with the previous layout where every tag
+    dict held a private list for each value.
+
+    Each layout is measured in a separate process, usage:
+
+        EXAILE_DIR=. python2 tools/benchmarks/track_memory.py [ntracks]
+'''
+
+import os
+import resource
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+
+def synthetic_tags(i):
+    '''Returns the stored tags of the i-th track of a synthetic collection'''
+    artist = i // 200
+    album = i // 12
+    return {
+        '__loc': 'file:///music/%d/%d/%d.ogg' % (artist, album, i),
+        '__basedir': '/music/%d/%d' % (artist, album),
+        '__date_added': 1500000000.0 + i,
+        '__length': 180.5 + i % 120,
+        '__modified': 1400000000.0 + i,
+        '__bitrate': 192000,
+        'artist': [u'Artist %d' % artist],
+        'albumartist': [u'Artist %d' % artist],
+        'album': [u'Album %d' % album],
+        'title': [u'Title %d' % i],
+        'tracknumber': [u'%d/12' % (i % 12 + 1)],
+        'discnumber': [u'1/1'],
+        'date': [u'%d' % (1960 + artist % 60)],
+        'genre': [u'Genre %d' % (artist % 25)],
+    }
+
+
+def max_rss():
+    '''Returns the peak resident set size of this process, in KiB'''
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(layout, ntracks):
+    # imported before measuring, so that only the tags are counted
+    from xl.trax.track import Track
+
+    before = max_rss()
+    tracks = []
+    for i in xrange(ntracks):
+        tags = synthetic_tags(i)
+        if layout == 'lists':
+            # created without its other tags, which would fill the table
+            # of interned values
+            tr = Track(_unpickles={'__loc': tags['__loc']})
+            tr._Track__tags = tags
+        else:
+            tr = Track(_unpickles=tags)
+        tracks.append(tr)
+    print("%s %d" % (layout, max_rss() - before))
+    return tracks
+
+
+def main():
+    ntracks = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    results = {}
+    for layout in ('lists', 'compact'):
+        output = subprocess.check_output(
+            [sys.executable, __file__, '--measure', layout, str(ntracks)]
+        )
+        name, used = output.split()[-2:]
+        results[name] = int(used)
+        print("%-8s %8d KiB for %d tracks" % (name, results[name], ntracks))
+
+    saved = results['lists'] - results['compact']
+    print("saved    %8d KiB (%.1f%%)" % (saved, 100.0 * saved / results['lists']))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--measure':
+        measure(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
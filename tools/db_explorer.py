@@ -29,6 +29,7 @@ import json
 import os.path
 import pprint
 import shelve
+import sys
 from whichdb import whichdb
 
 try:
@@ -38,6 +39,9 @@ except ImportError:
 
 import click
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from xl.common import Journal, is_journal
+
 
 exaile_db = os.path.join(os.path.expanduser('~'), '.local', 'share', 'exaile',
                          'music.db')
@@ -59,6 +63,10 @@ def cli(ctx, db):
         Tool that allows low-level exploration of an Exaile music database
     '''
     # simpler version of trackdb.py
+    if is_journal(db):
+        ctx.obj = Journal(db)
+        return
+
     try:
         d = bsddb.hashopen(db, 'r')
         contents = shelve.Shelf(d, protocol=exaile_pickle_protocol)
@@ -39,6 +39,7 @@ from gi.repository import GLib
 from gi.repository import GObject
 from gi.repository import Gio
 import logging
+import Queue
 import threading
 
 from xl import common, event, settings, trax
@@ -47,6 +48,13 @@ logger = logging.getLogger(__name__)
 
 COLLECTIONS = set()
 
+# Maximum number of files that have been found by a scan but not yet
+# committed to the collection
+_SCAN_QUEUE_SIZE = 500
+
+# Number of new tracks that are added to the collection at once by a scan
+_SCAN_BATCH_SIZE = 100
+
 
 def get_collection_by_loc(loc):
     """
@@ -139,7 +147,7 @@ class Collection(trax.TrackDB):
         self._running_total_count = 0
         self._frozen = False
         self._libraries_dirty = False
-        pickle_attrs += ['_serial_libraries']
+        pickle_attrs = pickle_attrs + ['_serial_libraries']
         trax.TrackDB.__init__(self, name, location=location, pickle_attrs=pickle_attrs)
         COLLECTIONS.add(self)
 
@@ -449,16 +457,17 @@ class LibraryMonitor(GObject.GObject):
             self.__library.collection.add_tracks(added_tracks)
             del self.__queue[gfile]
 
-    def on_location_changed(self, monitor, gfile, other_gfile, event):
+    def on_location_changed(self, monitor, gfile, other_gfile, event_type):
         """
             Updates the library on changes of the location
         """
+        event.log_event('library_location_changed', self.__library, gfile)
 
-        if event == Gio.FileMonitorEvent.CHANGES_DONE_HINT:
+        if event_type == Gio.FileMonitorEvent.CHANGES_DONE_HINT:
             self.__process_change_queue(gfile)
         elif (
-            event == Gio.FileMonitorEvent.CREATED
-            or event == Gio.FileMonitorEvent.CHANGED
+            event_type == Gio.FileMonitorEvent.CREATED
+            or event_type == Gio.FileMonitorEvent.CHANGED
         ):
 
             # Enqueue tracks retrieval
@@ -489,7 +498,7 @@ class LibraryMonitor(GObject.GObject):
 
                     self.emit('location-added', directory)
 
-        elif event == Gio.FileMonitorEvent.DELETED:
+        elif event_type == Gio.FileMonitorEvent.DELETED:
             removed_tracks = []
 
             track = trax.Track(gfile.get_uri())
@@ -519,6 +528,23 @@ class LibraryMonitor(GObject.GObject):
                 self.emit('location-removed', directory)
 
 
+class _ScanItem(object):
+    """
+        A file or directory found while scanning a library, and the
+        result of reading it
+    """
+
+    __slots__ = ['gfile', 'fileinfo', 'is_dir', 'track', 'add', 'done']
+
+    def __init__(self, gfile, fileinfo, is_dir):
+        self.gfile = gfile
+        self.fileinfo = fileinfo
+        self.is_dir = is_dir
+        self.track = None
+        self.add = False
+        self.done = threading.Event()
+
+
 class Library(object):
     """
         Scans and watches a folder for tracks, and adds them to
@@ -561,6 +587,9 @@ class Library(object):
 
         self.collection = None
         self.set_rescan_interval(scan_interval)
+        self._file_based_compilations = settings.subscribe_option(
+            'collection/file_based_compilations', True
+        )
 
     def set_location(self, location):
         """
@@ -665,7 +694,7 @@ class Library(object):
             :param tr: the track to check
         """
         # check for compilations
-        if not settings.get_option('collection/file_based_compilations', True):
+        if not self._file_based_compilations.value:
             return
 
         def joiner(value):
@@ -705,7 +734,7 @@ class Library(object):
 
         ccheck[basedir][album].append(artist)
 
-    def update_track(self, gloc, force_update=False):
+    def update_track(self, gloc, force_update=False, fileinfo=None):
         """
             Rescan the track at a given location
 
@@ -713,31 +742,50 @@ class Library(object):
             :type gloc: :class:`Gio.File`
             :param force_update: Force update of file (default only updates file
                                  when mtime has changed)
+            :param fileinfo: the file info of the location, as yielded by
+                             :func:`xl.common.walk_with_info`
+            :type fileinfo: :class:`Gio.FileInfo`
 
             returns: the Track object, None if it could not be updated
         """
+        tr, add = self._read_track(gloc, force_update, fileinfo)
+        if add:
+            self.collection.add(tr)
+        return tr
+
+    def _read_track(self, gloc, force_update=False, fileinfo=None):
+        """
+            Reads the tags of the track at a given location, without
+            adding it to the collection. Safe to call from several
+            threads at once.
+
+            returns: a tuple of the Track object (None if it could not be
+                read) and whether it should be added to the collection
+        """
         uri = gloc.get_uri()
         if not uri:  # we get segfaults if this check is removed
-            return None
+            return None, False
 
         tr = self.collection.get_track_by_loc(uri)
         if tr:
-            tr.read_tags(force=force_update)
-        else:
-            tr = trax.Track(uri)
-            if tr._scan_valid:
-                self.collection.add(tr)
-
-            # Track already existed. This fixes trax.get_tracks_from_uri
-            # on windows, unknown why fix isnt needed on linux.
-            elif not tr._init:
-                self.collection.add(tr)
-        return tr
+            tr.read_tags(force=force_update, fileinfo=fileinfo)
+            return tr, False
+
+        tr = trax.Track(uri)
+        # If the track already existed, add it anyway. This fixes
+        # trax.get_tracks_from_uri on windows, unknown why fix isnt
+        # needed on linux.
+        return tr, bool(tr._scan_valid or not tr._init)
 
     def rescan(self, notify_interval=None, force_update=False):
         """
             Rescan the associated folder and add the contained files
             to the Collection
+
+            The directory tree is walked by one thread, the tags of the
+            files found are read by a pool of threads (see the
+            ``collection/scan_workers`` option), and the results are
+            committed to the collection in order by the calling thread.
         """
         # TODO: use gio's cancellable support
 
@@ -751,93 +799,232 @@ class Library(object):
         self.scanning = True
         libloc = Gio.File.new_for_uri(self.location)
 
-        count = 0
-        dirtracks = deque()
-        compilations = deque()
-        ccheck = {}
-        for fil in common.walk(libloc):
-            count += 1
-            type = fil.query_info(
-                "standard::type", Gio.FileQueryInfoFlags.NONE, None
-            ).get_file_type()
-            if type == Gio.FileType.DIRECTORY:
-                if dirtracks:
-                    for tr in dirtracks:
-                        self._check_compilation(ccheck, compilations, tr)
-                    for (basedir, album) in compilations:
-                        base = basedir.replace('"', '\\"')
-                        alb = album.replace('"', '\\"')
-                        items = [
-                            tr
-                            for tr in dirtracks
-                            if tr.get_tag_raw('__basedir') == base and
-                            # FIXME: this is ugly
-                            alb in "".join(tr.get_tag_raw('album') or []).lower()
-                        ]
-                        for item in items:
-                            item.set_tag_raw('__compilation', (basedir, album))
-                dirtracks = deque()
-                compilations = deque()
-                ccheck = {}
-            elif type == Gio.FileType.REGULAR:
-                tr = self.update_track(fil, force_update=force_update)
-                if not tr:
-                    continue
+        workers = max(1, settings.get_option('collection/scan_workers', 4))
+        stopped = threading.Event()
+        pending = Queue.Queue(_SCAN_QUEUE_SIZE)
+        work = Queue.Queue()
 
-                if dirtracks is not None:
-                    dirtracks.append(tr)
-                    # do this so that if we have, say, a 4000-song folder
-                    # we dont get bogged down trying to keep track of them
-                    # for compilation detection. Most albums have far fewer
-                    # than 110 tracks anyway, so it is unlikely that this
-                    # restriction will affect the heuristic's accuracy.
-                    # 110 was chosen to accomodate "top 100"-style
-                    # compilations.
-                    if len(dirtracks) > 110:
-                        logger.debug(
-                            "Too many files, skipping "
-                            "compilation detection heuristic for %s",
-                            fil.get_uri(),
-                        )
-                        dirtracks = None
-
-            if self.collection and self.collection._scan_stopped:
-                self.scanning = False
-                logger.info("Scan canceled")
-                return
+        visited = set()
+        threads = [
+            threading.Thread(
+                target=self._scan_walk,
+                args=(libloc, pending, work, workers, stopped, visited),
+            )
+        ]
+        for i in range(workers):
+            threads.append(
+                threading.Thread(
+                    target=self._scan_read, args=(work, force_update, stopped)
+                )
+            )
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
 
-            # progress update
-            if notify_interval is not None and count % notify_interval == 0:
-                event.log_event('tracks_scanned', self, count)
+        completed = self._scan_commit(pending, notify_interval, stopped)
 
-        # final progress update
-        if notify_interval is not None:
-            event.log_event('tracks_scanned', self, count)
+        for thread in threads:
+            thread.join()
 
-        removals = deque()
-        for tr in self.collection.tracks.itervalues():
-            tr = tr._track
-            loc = tr.get_loc_for_io()
-            if not loc:
+        if not completed:
+            self.scanning = False
+            logger.info("Scan canceled")
+            return
+
+        # Tracks below the library that the walk didn't find have been
+        # removed. They are still checked for existence, so that files the
+        # walk skipped (unreadable directories, symlinks) aren't dropped.
+        prefix = libloc.get_uri()
+        if not prefix.endswith('/'):
+            prefix += '/'
+        removals = []
+        for loc, holder in self.collection.tracks.items():
+            if not loc or loc in visited:
                 continue
-            gloc = Gio.File.new_for_uri(loc)
             try:
-                if not gloc.has_prefix(libloc):
+                if not loc.startswith(prefix):
                     continue
             except UnicodeDecodeError:
                 logger.exception("Error decoding file location")
                 continue
 
-            if not gloc.query_exists(None):
-                removals.append(tr)
+            if not Gio.File.new_for_uri(loc).query_exists(None):
+                removals.append(holder._track)
 
-        for tr in removals:
-            logger.debug(u"Removing %s", unicode(tr))
-            self.collection.remove(tr)
+        if removals:
+            for tr in removals:
+                logger.debug(u"Removing %s", unicode(tr))
+            self.collection.remove_tracks(removals)
+            if self.collection._frozen:
+                self.collection._libraries_dirty = True
+            else:
+                event.log_event('libraries_modified', self.collection, None)
 
         logger.info("Scan completed: %s", self.location)
         self.scanning = False
 
+    def _scan_walk(self, libloc, pending, work, workers, stopped, visited):
+        """
+            Walks the library for rescan(), queueing the files found for
+            reading and everything found for committing. The locations of
+            the files found are added to visited.
+
+            The files of each directory are announced with a
+            ``library_directory_scanned`` event, whose data is a tuple of
+            the directory, its :class:`Gio.FileInfo` and the list of its
+            regular files, so that others don't have to list it again.
+            Directories which could not be listed completely, such as
+            those with symlinks to other files of the library, are not
+            announced.
+        """
+        listing = None
+        incomplete = set()
+
+        def announce(listing):
+            # the directory has been listed once the next one is walked
+            if listing is not None and listing[0].get_uri() not in incomplete:
+                event.log_event('library_directory_scanned', self, listing)
+
+        try:
+            for fil, fileinfo in common.walk_with_info(libloc, incomplete):
+                if stopped.is_set():
+                    listing = None
+                    break
+                if fileinfo is None:
+                    type = fil.query_info(
+                        "standard::type", Gio.FileQueryInfoFlags.NONE, None
+                    ).get_file_type()
+                else:
+                    type = fileinfo.get_file_type()
+                item = _ScanItem(fil, fileinfo, type == Gio.FileType.DIRECTORY)
+                if type == Gio.FileType.REGULAR:
+                    visited.add(fil.get_uri())
+                    work.put(item)
+                    if listing is not None:
+                        listing[2].append(fil)
+                else:
+                    item.done.set()
+                    # the files of a directory directly follow it
+                    announce(listing)
+                    listing = (fil, fileinfo, []) if fileinfo is not None else None
+                pending.put(item)
+            announce(listing)
+        except Exception:
+            logger.exception("Error while walking library %s", self.location)
+        finally:
+            pending.put(None)
+            for i in range(workers):
+                work.put(None)
+
+    def _scan_read(self, work, force_update, stopped):
+        """
+            Reads the tags of files queued by _scan_walk. The tag changes
+            are announced in batches of _SCAN_BATCH_SIZE tracks.
+        """
+        while True:
+            with event.batch():
+                for i in range(_SCAN_BATCH_SIZE):
+                    item = work.get()
+                    if item is None:
+                        return
+                    try:
+                        if not stopped.is_set():
+                            item.track, item.add = self._read_track(
+                                item.gfile, force_update, item.fileinfo
+                            )
+                    except Exception:
+                        logger.exception("Error reading %s", item.gfile.get_uri())
+                    finally:
+                        item.done.set()
+
+    def _scan_commit(self, pending, notify_interval, stopped):
+        """
+            Adds the tracks read by _scan_read to the collection in the
+            order they were found, and detects compilations per
+            directory.
+
+            :returns: False if the scan was canceled, True otherwise
+        """
+        count = 0
+        batch = []
+        dirtracks = deque()
+        compilations = deque()
+        ccheck = {}
+        item = True
+        try:
+            while True:
+                item = pending.get()
+                if item is None:
+                    break
+                item.done.wait()
+                count += 1
+
+                if item.is_dir:
+                    if dirtracks:
+                        for tr in dirtracks:
+                            self._check_compilation(ccheck, compilations, tr)
+                        for (basedir, album) in compilations:
+                            base = basedir.replace('"', '\\"')
+                            alb = album.replace('"', '\\"')
+                            items = [
+                                tr
+                                for tr in dirtracks
+                                if tr.get_tag_raw('__basedir') == base and
+                                # FIXME: this is ugly
+                                alb in "".join(tr.get_tag_raw('album') or []).lower()
+                            ]
+                            for it in items:
+                                it.set_tag_raw('__compilation', (basedir, album))
+                    dirtracks = deque()
+                    compilations = deque()
+                    ccheck = {}
+                elif item.track is not None:
+                    tr = item.track
+                    if item.add:
+                        batch.append(tr)
+
+                    if dirtracks is not None:
+                        dirtracks.append(tr)
+                        # do this so that if we have, say, a 4000-song folder
+                        # we dont get bogged down trying to keep track of them
+                        # for compilation detection. Most albums have far fewer
+                        # than 110 tracks anyway, so it is unlikely that this
+                        # restriction will affect the heuristic's accuracy.
+                        # 110 was chosen to accomodate "top 100"-style
+                        # compilations.
+                        if len(dirtracks) > 110:
+                            logger.debug(
+                                "Too many files, skipping "
+                                "compilation detection heuristic for %s",
+                                item.gfile.get_uri(),
+                            )
+                            dirtracks = None
+
+                if len(batch) >= _SCAN_BATCH_SIZE:
+                    self.collection.add_tracks(batch)
+                    batch = []
+
+                if self.collection and self.collection._scan_stopped:
+                    return False
+
+                # progress update
+                if notify_interval is not None and count % notify_interval == 0:
+                    event.log_event('tracks_scanned', self, count)
+        finally:
+            if batch:
+                self.collection.add_tracks(batch)
+            if item is not None:
+                # canceled or failed, stop the other threads
+                stopped.set()
+                while pending.get() is not None:
+                    pass
+
+        # final progress update
+        if notify_interval is not None:
+            event.log_event('tracks_scanned', self, count)
+
+        return True
+
     def add(self, loc, move=False):
         """
             Copies (or moves) a file into the library and adds it to the
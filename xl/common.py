@@ -27,6 +27,7 @@
     General functions and classes shared in the codebase
 """
 
+import cPickle
 import inspect
 from gi.repository import Gio
 from gi.repository import GLib
@@ -35,12 +36,14 @@ import logging
 import os
 import os.path
 import shelve
+import struct
 import subprocess
 import sys
 import threading
 import urllib2
 import urlparse
 import weakref
+import zlib
 from functools import wraps, partial
 from collections import deque
 from UserDict import DictMixin
@@ -459,6 +462,226 @@ else:
             raise ctypes.WinError(ctypes.get_last_error())
 
 
+_JOURNAL_MAGIC = 'EXAILE-JOURNAL 1\n'
+# operation, key length, value length, crc32 of key and value
+_JOURNAL_RECORD = struct.Struct('>cIII')
+_JOURNAL_SET = 'S'
+_JOURNAL_DELETE = 'D'
+
+
+def is_journal(path):
+    """
+        Checks whether the file at path is a :class:`Journal`
+    """
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(_JOURNAL_MAGIC)) == _JOURNAL_MAGIC
+    except (IOError, OSError):
+        return False
+
+
+class Journal(DictMixin):
+    """
+        A persistent mapping of string keys to picklable values, which
+        can be used in place of a shelf.
+
+        Each assignment or deletion appends a record to the end of the
+        file, so a write costs as much as the value written. Only the
+        position of each value is kept in memory; values are unpickled
+        when they are accessed. A torn or corrupted record at the end of
+        the file, as left behind by a crash, is discarded when the
+        journal is opened.
+
+        Once the superseded records take up more space than the current
+        ones, the file is compacted by rewriting only the current
+        records.
+
+        Reads and writes may happen from several threads.
+    """
+
+    #: Superseded records are never compacted below this many bytes
+    min_compact_size = 1024 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._index = {}  # key -> (value offset, value length, record length)
+        self._live = 0  # size of the current records
+        self._garbage = 0  # size of the superseded records
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._file = open(path, 'r+b')
+            self._recover()
+        else:
+            self._file = open(path, 'w+b')
+            self._file.write(_JOURNAL_MAGIC)
+            self._file.flush()
+
+        if self._needs_compaction():
+            self.compact()
+
+    def _recover(self):
+        """
+            Builds the index from the records in the file, dropping
+            anything after the last intact record
+        """
+        f = self._file
+        if f.read(len(_JOURNAL_MAGIC)) != _JOURNAL_MAGIC:
+            f.close()
+            raise ValueError("%s is not a journal" % self.path)
+
+        offset = len(_JOURNAL_MAGIC)
+        while True:
+            header = f.read(_JOURNAL_RECORD.size)
+            if len(header) < _JOURNAL_RECORD.size:
+                break
+            op, klen, vlen, crc = _JOURNAL_RECORD.unpack(header)
+            if op not in (_JOURNAL_SET, _JOURNAL_DELETE):
+                break
+            data = f.read(klen + vlen)
+            if len(data) < klen + vlen or zlib.crc32(data) & 0xFFFFFFFF != crc:
+                break
+            self._apply(op, data[:klen], offset, klen, vlen)
+            offset += _JOURNAL_RECORD.size + klen + vlen
+
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if offset < size:
+            logger.warning(
+                "Discarding %d bytes of incomplete records from %s",
+                size - offset,
+                self.path,
+            )
+            f.truncate(offset)
+            f.flush()
+
+    def _apply(self, op, key, offset, klen, vlen):
+        """
+            Updates the index for a record written at offset
+        """
+        reclen = _JOURNAL_RECORD.size + klen + vlen
+        old = self._index.pop(key, None)
+        if old is not None:
+            self._live -= old[2]
+            self._garbage += old[2]
+        if op == _JOURNAL_SET:
+            self._index[key] = (offset + _JOURNAL_RECORD.size + klen, vlen, reclen)
+            self._live += reclen
+        else:
+            self._garbage += reclen
+
+    def _append(self, op, key, value):
+        data = key + value
+        header = _JOURNAL_RECORD.pack(
+            op, len(key), len(value), zlib.crc32(data) & 0xFFFFFFFF
+        )
+        with self._lock:
+            f = self._file
+            f.seek(0, os.SEEK_END)
+            offset = f.tell()
+            f.write(header)
+            f.write(data)
+            self._apply(op, key, offset, len(key), len(value))
+
+    @staticmethod
+    def _key(key):
+        if isinstance(key, unicode):
+            return key.encode('utf-8')
+        return key
+
+    def __getitem__(self, key):
+        with self._lock:
+            offset, vlen, reclen = self._index[self._key(key)]
+            self._file.seek(offset)
+            data = self._file.read(vlen)
+        return cPickle.loads(data)
+
+    def __setitem__(self, key, value):
+        self._append(
+            _JOURNAL_SET, self._key(key), cPickle.dumps(value, PICKLE_PROTOCOL)
+        )
+
+    def __delitem__(self, key):
+        key = self._key(key)
+        with self._lock:
+            if key not in self._index:
+                raise KeyError(key)
+            self._append(_JOURNAL_DELETE, key, '')
+
+    def __contains__(self, key):
+        return self._key(key) in self._index
+
+    def __iter__(self):
+        return iter(self._index.keys())
+
+    def __len__(self):
+        return len(self._index)
+
+    def keys(self):
+        return self._index.keys()
+
+    def _needs_compaction(self):
+        return self._garbage > max(self._live, self.min_compact_size)
+
+    def compact(self):
+        """
+            Rewrites the file with only the current records
+        """
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        tmp_path = self.path + os.extsep + 'tmp'
+        index = {}
+        offset = len(_JOURNAL_MAGIC)
+        try:
+            with open(tmp_path, 'wb') as out:
+                out.write(_JOURNAL_MAGIC)
+                # copy in file order, so that loading reads sequentially
+                for key, (voffset, vlen, reclen) in sorted(
+                    self._index.iteritems(), key=lambda item: item[1][0]
+                ):
+                    self._file.seek(voffset + vlen - reclen)
+                    out.write(self._file.read(reclen))
+                    index[key] = (offset + reclen - vlen, vlen, reclen)
+                    offset += reclen
+                out.flush()
+                os.fsync(out.fileno())
+            self._file.close()
+            replace_file(tmp_path, self.path)
+        except Exception:
+            logger.exception("Could not compact %s", self.path)
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            if self._file.closed:
+                self._file = open(self.path, 'r+b')
+            return
+
+        self._file = open(self.path, 'r+b')
+        self._index = index
+        self._live = offset - len(_JOURNAL_MAGIC)
+        self._garbage = 0
+
+    def sync(self):
+        """
+            Writes the records appended so far to disk, compacting the
+            file if needed
+        """
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if self._needs_compaction():
+                self._compact()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self.sync()
+                self._file.close()
+
+
 class LimitedCache(DictMixin):
     """
         Simple cache that acts much like a dict, but has a maximum # of items
@@ -561,12 +784,35 @@ def walk(root):
         :returns: a generator object
         :rtype: :class:`Gio.File`
     """
+    for fil, fileinfo in walk_with_info(root):
+        yield fil
+
+
+def walk_with_info(root, incomplete=None):
+    """
+        Walk through a Gio directory like :func:`walk`, yielding each
+        file together with the :class:`Gio.FileInfo` it was enumerated
+        with
+
+        The file info contains the ``standard::type`` and
+        ``time::modified`` attributes (of the symlink target for
+        symlinks), so callers don't need to query them again. It is
+        None for the root directory.
+
+        :param root: a :class:`Gio.File` representing the
+            directory to walk through
+        :param incomplete: if given, a set to which the uris of the
+            directories whose files were not all yielded are added,
+            once they have been listed
+        :returns: a generator object
+        :rtype: tuple of :class:`Gio.File`, :class:`Gio.FileInfo`
+    """
     queue = deque()
-    queue.append(root)
+    queue.append((root, None))
 
     while len(queue) > 0:
-        dir = queue.pop()
-        yield dir
+        dir, dirinfo = queue.pop()
+        yield dir, dirinfo
         try:
             for fileinfo in dir.enumerate_children(
                 "standard::type,"
@@ -585,14 +831,18 @@ def walk(root):
                         fil2 = Gio.File.new_for_uri(target)
                     # already in the collection, we'll get it anyway
                     if fil2.has_prefix(root):
+                        if incomplete is not None:
+                            incomplete.add(dir.get_uri())
                         continue
                 type = fileinfo.get_file_type()
                 if type == Gio.FileType.DIRECTORY:
-                    queue.append(fil)
+                    queue.append((fil, fileinfo))
                 elif type == Gio.FileType.REGULAR:
-                    yield fil
+                    yield fil, fileinfo
         except GLib.Error:  # why doesnt gio offer more-specific errors?
             logger.exception("Unhandled exception while walking on %s.", dir)
+            if incomplete is not None:
+                incomplete.add(dir.get_uri())
 
 
 def walk_directories(root):
@@ -35,18 +35,67 @@ from gi.repository import Gio
 import logging
 import hashlib
 import os
-
-try:
-    import cPickle as pickle
-except ImportError:
-    import pickle
+import Queue
+import shutil
+import tempfile
+import threading
+import time
 
 from xl.nls import gettext as _
 import xl.unicode
 from xl import common, event, providers, settings, trax, xdg
+from xl.migrations.database import covers_to_journal
 
 logger = logging.getLogger(__name__)
 
+#: Number of fetched covers after which covers.db is saved
+_FETCH_SAVE_BATCH_SIZE = 50
+#: Maximum number of seconds between saves of covers.db while fetching
+_FETCH_SAVE_INTERVAL = 30
+#: Number of seconds between two garbage collections of the cover cache
+_GC_INTERVAL = 6 * 60 * 60
+#: Number of seconds during which the images listed in a directory are
+#: used without checking whether the directory was modified
+_LOCALFILE_CHECK_INTERVAL = 10
+
+
+def _touch(path):
+    """
+        Records an access of a cached file in its modification time, which
+        unlike the access time is kept up to date on every filesystem
+    """
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def _get_uri_version(uri):
+    """
+        Returns the modification time of a file as a version string for
+        :meth:`CoverSearchMethod.get_cover_version`, or None if the file
+        cannot be queried
+    """
+    try:
+        info = Gio.File.new_for_uri(uri).query_info(
+            "time::modified", Gio.FileQueryInfoFlags.NONE, None
+        )
+    except GLib.Error:
+        return None
+    mtime = info.get_modification_time()
+    return '%d.%06d' % (mtime.tv_sec, mtime.tv_usec)
+
+
+def _get_usage(cache_dir, names):
+    usage = []
+    for name in names:
+        try:
+            st = os.stat(os.path.join(cache_dir, name))
+        except OSError:
+            continue
+        usage.append((name, st.st_size, max(st.st_atime, st.st_mtime)))
+    return usage
+
 
 # TODO: maybe this could go into common.py instead? could be
 # useful in other areas.
@@ -110,9 +159,170 @@ class Cacher(object):
         path = os.path.join(self.cache_dir, key)
         if os.path.exists(path):
             with open(path, "rb") as fp:
-                return fp.read()
+                data = fp.read()
+            _touch(path)
+            return data
         return None
 
+    def keys(self):
+        """
+            Returns the keys of all entries in the cache.
+        """
+        return os.listdir(self.cache_dir)
+
+    def usage(self):
+        """
+            Returns the size in bytes and the time of the last access of
+            each entry in the cache, as a list of (key, size, atime).
+        """
+        return _get_usage(self.cache_dir, self.keys())
+
+
+class ThumbnailCacher(object):
+    """
+        On-disk cache of scaled down covers, stored by the db_string of
+        the cover and the size it was scaled to.
+
+        The thumbnails of a cover are kept in a directory of their own,
+        so that they can be removed together. Covers whose image can
+        change without their db_string changing are also stored by a
+        version, such as the modification time of their source, and
+        adding a new version of a thumbnail removes the older ones.
+    """
+
+    def __init__(self, cache_dir):
+        """
+            :param cache_dir: directory to use for the cache. will be
+                created if it does not exist.
+        """
+        try:
+            os.makedirs(cache_dir)
+        except OSError:
+            pass
+        self.cache_dir = cache_dir
+
+    def _get_dir(self, db_string):
+        if isinstance(db_string, unicode):
+            db_string = db_string.encode('utf-8')
+        return os.path.join(self.cache_dir, hashlib.sha256(db_string).hexdigest())
+
+    @staticmethod
+    def _get_name(size, version):
+        if version is None:
+            return str(size)
+        return '%d-%s' % (size, version)
+
+    def add(self, db_string, size, data, version=None):
+        """
+            Adds a thumbnail to the cache.
+
+            :param db_string: The db_string of the cover
+            :param size: The size the cover was scaled to, in pixels
+            :param data: The image data of the thumbnail, as a bytestring.
+            :param version: The version of the cover, if it can change
+        """
+        path = self._get_dir(db_string)
+        name = self._get_name(size, version)
+        try:
+            os.makedirs(path)
+        except OSError:
+            pass
+        # write to a temporary file first, so that other threads never
+        # read a partial thumbnail
+        fd, tmp = tempfile.mkstemp(dir=path)
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(data)
+            common.replace_file(tmp, os.path.join(path, name))
+        except (IOError, OSError):
+            logger.warning("Could not store a thumbnail", exc_info=True)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+
+        # thumbnails of other versions of the cover are outdated
+        prefix = '%d-' % size
+        for other in os.listdir(path):
+            if other != name and (other == str(size) or other.startswith(prefix)):
+                try:
+                    os.remove(os.path.join(path, other))
+                except OSError:
+                    pass
+
+    def remove(self, db_string):
+        """
+            Removes all thumbnails of a cover from the cache.
+
+            :param db_string: The db_string of the cover
+        """
+        shutil.rmtree(self._get_dir(db_string), ignore_errors=True)
+
+    def get(self, db_string, size, version=None):
+        """
+            Retrieves a thumbnail from the cache.  Returns None if there
+            is no thumbnail of the given size and version.
+
+            :param db_string: The db_string of the cover
+            :param size: The size the cover was scaled to, in pixels
+            :param version: The version of the cover, if it can change
+        """
+        path = os.path.join(self._get_dir(db_string), self._get_name(size, version))
+        try:
+            with open(path, "rb") as fp:
+                data = fp.read()
+        except IOError:
+            return None
+        _touch(path)
+        return data
+
+    def usage(self):
+        """
+            Returns the size in bytes and the time of the last access of
+            each thumbnail in the cache, as a list of (name, size, atime).
+        """
+        names = []
+        for dirname in os.listdir(self.cache_dir):
+            try:
+                files = os.listdir(os.path.join(self.cache_dir, dirname))
+            except OSError:
+                continue
+            names.extend(os.path.join(dirname, f) for f in files)
+        return _get_usage(self.cache_dir, names)
+
+    def remove_unused(self, db_strings):
+        """
+            Removes the thumbnails of all covers but the given ones.
+
+            :param db_strings: The db_strings of the covers to keep
+            :returns: the number of bytes freed
+        """
+        used = {os.path.basename(self._get_dir(d)) for d in db_strings}
+        freed = 0
+        for name, size, atime in self.usage():
+            if os.path.dirname(name) not in used:
+                freed += self.remove_file(name)
+        return freed
+
+    def remove_file(self, name):
+        """
+            Removes a single thumbnail, as named by usage().
+
+            :returns: the number of bytes freed
+        """
+        path = os.path.join(self.cache_dir, name)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return 0
+        try:
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass  # there are other thumbnails of the cover
+        return size
+
 
 class CoverManager(providers.ProviderHandler):
     """
@@ -127,6 +337,17 @@ class CoverManager(providers.ProviderHandler):
         """
         providers.ProviderHandler.__init__(self, "covers")
         self.__cache = Cacher(os.path.join(location, 'cache'))
+        self.__thumbnails = ThumbnailCacher(os.path.join(location, 'thumbnails'))
+        # the db_strings the cached covers were fetched from, by cache
+        # key, so that collected covers can be fetched again
+        self.__sources = common.Journal(os.path.join(location, 'cover_sources.db'))
+        # guards changes to the db and to the bookkeeping of the db
+        self.__db_lock = threading.RLock()
+        self.__save_lock = threading.Lock()
+        self.__gc_lock = threading.Lock()
+        # the db_strings of collected covers being fetched again
+        self.__refetching = set()
+        self.__store = None
         self.location = location
         self.methods = {}
         self.order = settings.get_option('covers/preferred_order', [])
@@ -148,6 +369,169 @@ class CoverManager(providers.ProviderHandler):
 
         event.add_callback(self._on_option_set, 'covers_option_set')
 
+    @property
+    def db(self):
+        """
+            The db dict, which maps the key of each album (see
+            _get_track_key) to the db_string of its cover.
+
+            Entries must be changed through set_cover and remove_cover,
+            so that only the changed entries have to be saved. Replacing
+            the whole dict causes all of it to be saved.
+        """
+        return self.__db
+
+    @db.setter
+    def db(self, db):
+        with self.__db_lock:
+            self.__db = db
+            # keys of the entries changed since the last save, or None
+            # if everything has to be saved
+            self.__changed = None
+            # the keys of the db entries referring to each cached cover
+            self.__cache_refs = {}
+            for key, db_string in db.iteritems():
+                if key != 'version' and db_string.startswith('cache:'):
+                    self.__cache_refs.setdefault(db_string[6:], set()).add(key)
+
+    def __set_entry(self, key, db_string):
+        """
+            Sets or removes (if db_string is None) the cover of an album
+            in the db, removing cached data that is no longer used
+
+            :returns: the previous db_string of the album
+        """
+        with self.__db_lock:
+            if db_string is None:
+                old_db_string = self.__db.pop(key, None)
+            else:
+                old_db_string = self.__db.get(key)
+                self.__db[key] = db_string
+            if self.__changed is not None:
+                self.__changed.add(key)
+
+            if db_string == old_db_string:
+                return old_db_string
+            if db_string is not None and db_string.startswith('cache:'):
+                self.__cache_refs.setdefault(db_string[6:], set()).add(key)
+            if old_db_string is not None:
+                self.__thumbnails.remove(old_db_string)
+                if old_db_string.startswith('cache:'):
+                    cache_key = old_db_string[6:]
+                    refs = self.__cache_refs.get(cache_key, set())
+                    refs.discard(key)
+                    if not refs:
+                        self.__cache_refs.pop(cache_key, None)
+                        self.__remove_cached(cache_key)
+        return old_db_string
+
+    def __remove_cached(self, cache_key):
+        """
+            Removes a cover from the cache, along with its source
+        """
+        self.__cache.remove(cache_key)
+        if cache_key in self.__sources:
+            del self.__sources[cache_key]
+
+    def remove_unused_cache(self):
+        """
+            Removes the cached covers and thumbnails that no entry of the
+            db refers to
+
+            :returns: the number of bytes freed
+        """
+        freed = 0
+        # the lock keeps set_cover from adding a file that is about to
+        # be removed
+        with self.__db_lock:
+            for cache_key, size, atime in self.__cache.usage():
+                if cache_key not in self.__cache_refs:
+                    self.__remove_cached(cache_key)
+                    freed += size
+            db_strings = [v for k, v in self.__db.iteritems() if k != 'version']
+        return freed + self.__thumbnails.remove_unused(db_strings)
+
+    def collect_garbage(self, budget=None):
+        """
+            Removes the unused entries from the cache, and then the least
+            recently used thumbnails and covers until the cache fits in
+            the budget. Albums whose cover is removed refer to the source
+            it was fetched from instead, so that the same cover is fetched
+            and cached again when it is needed. Albums whose cover has no
+            known source lose their db entry, and ``cover_removed`` is
+            emitted once for all of them, with None as the track.
+
+            :param budget: The size the cache may take up, in bytes, or
+                0 for no limit. Defaults to the ``covers/cache_size``
+                option, which is in MiB.
+            :returns: the number of bytes freed
+        """
+        if budget is None:
+            budget = settings.get_option('covers/cache_size', 512) * 1024 * 1024
+
+        evicted = False
+        dropped = 0
+        with self.__gc_lock:
+            freed = self.remove_unused_cache()
+            thumbnails = self.__thumbnails.usage()
+            covers = self.__cache.usage()
+            used = sum(e[1] for e in thumbnails) + sum(e[1] for e in covers)
+
+            if budget and used > budget:
+                # thumbnails go first, as they are cheap to recreate
+                thumbnails.sort(key=lambda e: e[2])
+                for name, size, atime in thumbnails:
+                    if used <= budget:
+                        break
+                    size = self.__thumbnails.remove_file(name)
+                    used -= size
+                    freed += size
+
+                covers.sort(key=lambda e: e[2])
+                for cache_key, size, atime in covers:
+                    if used <= budget:
+                        break
+                    with self.__db_lock:
+                        source = self.__sources.get(cache_key)
+                        for key in list(self.__cache_refs.get(cache_key, ())):
+                            self.__set_entry(key, source)
+                            if source is None:
+                                dropped += 1
+                        # removed by __set_entry once the last entry is gone
+                        self.__remove_cached(cache_key)
+                    evicted = True
+                    used -= size
+                    freed += size
+
+        if evicted:
+            self.timeout_save()
+        if dropped:
+            event.log_event('cover_removed', self, None)
+        logger.info("Freed %d bytes of the cover cache", freed)
+        return freed
+
+    @common.threaded
+    def _collect_garbage_threaded(self):
+        if self.__gc_lock.locked():
+            return
+        try:
+            self.collect_garbage()
+        except Exception:
+            logger.exception("Could not collect garbage in the cover cache")
+
+    def start_collecting_garbage(self, interval=_GC_INTERVAL):
+        """
+            Collects garbage in the cache in the background, once now and
+            then every interval seconds. See collect_garbage.
+        """
+
+        def collect():
+            self._collect_garbage_threaded()
+            return True
+
+        collect()
+        GLib.timeout_add_seconds(interval, collect)
+
     def _on_option_set(self, name, obj, data):
         if data == "covers/use_tags":
             if settings.get_option("covers/use_tags"):
@@ -292,11 +676,15 @@ class CoverManager(providers.ProviderHandler):
         """
         name = db_string.split(":", 1)[0]
         method = self.methods.get(name)
-        if method and method.use_cache and data:
-            db_string = "cache:%s" % self.__cache.add(data)
         key = self._get_track_key(track)
         if key:
-            self.db[key] = db_string
+            # the cached data must not be collected before it is referred to
+            with self.__db_lock:
+                if method and method.use_cache and data:
+                    cache_key = self.__cache.add(data)
+                    self.__sources[cache_key] = db_string
+                    db_string = "cache:%s" % cache_key
+                self.__set_entry(key, db_string)
             self.timeout_save()
             event.log_event('cover_set', self, track)
 
@@ -307,10 +695,7 @@ class CoverManager(providers.ProviderHandler):
         if track is None:
             return
         key = self._get_track_key(track)
-        db_string = self.db.get(key)
-        if db_string:
-            del self.db[key]
-            self.__cache.remove(db_string)
+        if key and self.__set_entry(key, None):
             self.timeout_save()
             event.log_event('cover_removed', self, track)
 
@@ -324,7 +709,9 @@ class CoverManager(providers.ProviderHandler):
             :param save_cover: if True, a set_cover call will be made
                     to store the cover for later use.
             :param set_only: Only retrieve covers that have been set
-                    in the db.
+                    in the db. Covers that were collected from the cache
+                    are fetched again in the background, and the default
+                    or None is returned until ``cover_set`` is emitted.
             :param use_default: If True, returns the default cover instead
                     of None when no covers are found.
         """
@@ -333,8 +720,22 @@ class CoverManager(providers.ProviderHandler):
 
         db_string = self.get_db_string(track)
         if db_string:
+            # the cover was collected from the cache, and has to be fetched
+            # from its source again
+            method = self.methods.get(db_string.split(":", 1)[0])
+            if set_only and method and method.use_cache:
+                self._refetch_cover_threaded(track, db_string)
+                return self.get_default_cover() if use_default else None
+
             cover = self.get_cover_data(db_string, use_default=use_default)
             if cover:
+                if (
+                    save_cover
+                    and method
+                    and method.use_cache
+                    and cover != self.get_default_cover()
+                ):
+                    self.set_cover(track, db_string, cover)
                 return cover
 
         if set_only:
@@ -350,6 +751,74 @@ class CoverManager(providers.ProviderHandler):
 
         return self.get_default_cover() if use_default else None
 
+    @common.threaded
+    def _refetch_cover_threaded(self, track, db_string):
+        """
+            Fetches a cover collected from the cache from its source, and
+            caches it again
+        """
+        with self.__db_lock:
+            if db_string in self.__refetching:
+                return
+            self.__refetching.add(db_string)
+        try:
+            data = self.get_cover_data(db_string)
+            # the cover may have been changed meanwhile
+            if data and self.get_db_string(track) == db_string:
+                self.set_cover(track, db_string, data)
+        except Exception:
+            logger.exception("Could not fetch the cover %s", db_string)
+        finally:
+            with self.__db_lock:
+                self.__refetching.discard(db_string)
+
+    def fetch_covers(self, items, stopper=None):
+        """
+            Fetches and sets the covers of many albums concurrently, see
+            :class:`CoverFetcher`. The number of albums fetched at once
+            and the number of concurrent requests and timeout of each
+            search method are set by the ``covers/fetch_workers``,
+            ``covers/method_workers`` and ``covers/method_timeout``
+            options.
+
+            The new covers are saved to the db in batches.
+
+            :param items: a list of (key, track) tuples, where key
+                    identifies the album of the track to the caller
+            :param stopper: a :class:`threading.Event` that stops the
+                    fetching when set
+            :returns: a generator of (key, data) tuples in the order the
+                    albums are done, where data is the cover data or None
+                    if no cover was found
+        """
+        fetcher = CoverFetcher(
+            self._get_methods(fixed=True),
+            workers=settings.get_option('covers/fetch_workers', 4),
+            method_workers=settings.get_option('covers/method_workers', 2),
+            timeout=settings.get_option('covers/method_timeout', 30),
+        )
+        unsaved = 0
+        last_save = time.time()
+
+        try:
+            for key, track, db_string, data in fetcher.fetch(items, stopper):
+                if data:
+                    self.set_cover(track, db_string, data)
+                    unsaved += 1
+                    if (
+                        unsaved >= _FETCH_SAVE_BATCH_SIZE
+                        or time.time() - last_save > _FETCH_SAVE_INTERVAL
+                    ):
+                        logger.debug('Saving cover database')
+                        self.save()
+                        unsaved = 0
+                        last_save = time.time()
+                yield key, data
+        finally:
+            if unsaved:
+                logger.debug('Saving cover database')
+                self.save()
+
     def get_cover_data(self, db_string, use_default=False):
         """
             Get the raw image data for a cover.
@@ -370,6 +839,43 @@ class CoverManager(providers.ProviderHandler):
             ret = self.get_default_cover()
         return ret
 
+    def get_thumbnail_data(self, db_string, size):
+        """
+            Get the image data of a thumbnail of a cover, as stored by
+            set_thumbnail_data.
+
+            :param db_string: The db_string identifying the cover.
+            :param size: The size of the thumbnail, in pixels.
+            :returns: the image data or None if there is no such thumbnail
+        """
+        version = self.__get_cover_version(db_string)
+        return self.__thumbnails.get(db_string, size, version)
+
+    def set_thumbnail_data(self, db_string, size, data):
+        """
+            Store the image data of a thumbnail of a cover, so that it
+            doesn't have to be scaled down from the cover again.
+
+            :param db_string: The db_string identifying the cover.
+            :param size: The size of the thumbnail, in pixels.
+            :param data: The image data of the thumbnail.
+        """
+        version = self.__get_cover_version(db_string)
+        self.__thumbnails.add(db_string, size, data, version)
+
+    def __get_cover_version(self, db_string):
+        """
+            Returns the version of a cover whose image can change without
+            its db_string changing, see CoverSearchMethod.get_cover_version
+        """
+        source, data = db_string.split(":", 1)
+        if source == "cache":
+            return None  # cached covers are stored by their content
+        get_cover_version = getattr(self.methods.get(source), 'get_cover_version', None)
+        if get_cover_version is None:
+            return None
+        return get_cover_version(data)
+
     def get_default_cover(self):
         """
             Get the raw image data for the cover to show if there is no
@@ -383,22 +889,22 @@ class CoverManager(providers.ProviderHandler):
             Load the saved db
         """
         path = os.path.join(self.location, 'covers.db')
-        data = None
-        for loc in [path, path + ".old", path + ".new"]:
-            try:
-                with open(loc, 'rb') as f:
-                    data = pickle.load(f)
-            except IOError:
-                pass
-            except EOFError:
-                try:
-                    os.remove(loc)
-                except Exception:
-                    pass
-            if data:
-                break
+        if covers_to_journal.needs_migration(path):
+            data = covers_to_journal.read_pickle(path)
+            if data and data.get('version', 1) < 2:
+                # The keys of version 1 can't be stored in a journal. The
+                # db is converted on the first save after covers_1to2.
+                self.db = data
+                return
+            covers_to_journal.migrate(path, data)
+
+        self.__store = common.Journal(path)
+        data = {
+            key.decode('utf-8'): value for key, value in self.__store.iteritems()
+        }
         if data:
             self.db = data
+            self.__changed = set()
         version = self.db.get('version', 1)
         if version > self.DB_VERSION:
             logger.error(
@@ -413,23 +919,41 @@ class CoverManager(providers.ProviderHandler):
 
     def save(self):
         """
-            Save the db
+            Save the changes to the db
         """
         path = os.path.join(self.location, 'covers.db')
-        try:
-            with open(path + ".new", 'wb') as f:
-                pickle.dump(self.db, f, common.PICKLE_PROTOCOL)
-        except IOError:
-            return
-        try:
-            os.rename(path, path + ".old")
-        except OSError:
-            pass  # if it doesn'texist we don't care
-        os.rename(path + ".new", path)
-        try:
-            os.remove(path + ".old")
-        except OSError:
-            pass
+        with self.__save_lock:
+            # covers may be set by another thread while saving
+            with self.__db_lock:
+                if self.__store is None and self.__db.get('version', 1) < 2:
+                    # the keys of version 1 can't be stored in a journal,
+                    # it is saved once covers_1to2 has converted it
+                    return
+                changed, self.__changed = self.__changed, set()
+                if changed is None:
+                    changed = set(self.__db)
+                    if self.__store is not None:
+                        changed.update(k.decode('utf-8') for k in self.__store.keys())
+            try:
+                if self.__store is None:
+                    with self.__db_lock:
+                        db = dict(self.__db)
+                    covers_to_journal.migrate(path, db)
+                    self.__store = common.Journal(path)
+                else:
+                    for key in changed:
+                        db_string = self.__db.get(key)
+                        if db_string is not None:
+                            self.__store[key] = db_string
+                        elif key in self.__store:
+                            del self.__store[key]
+                self.__store.sync()
+                self.__sources.sync()
+            except Exception:
+                logger.exception("Could not save %s", path)
+                with self.__db_lock:
+                    if self.__changed is not None:
+                        self.__changed.update(changed)
 
     def on_provider_added(self, provider):
         self.methods[provider.name] = provider
@@ -473,6 +997,183 @@ class CoverManager(providers.ProviderHandler):
         return None  # No cover found
 
 
+class _MethodCall(object):
+    """
+        A call to a cover search method that is run by a _MethodPool
+    """
+
+    __slots__ = ['func', 'args', 'result', 'done', 'abandoned']
+
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+        self.result = None
+        self.done = threading.Event()
+        self.abandoned = False
+
+
+class _MethodPool(object):
+    """
+        Worker threads that run the calls to one cover search method, so
+        that a method is never called more than a given number of times
+        at once.
+    """
+
+    def __init__(self, name, workers, timeout):
+        self.name = name
+        self.timeout = timeout
+        self._calls = Queue.Queue()
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(
+                target=self._run, name='CoverFetcher-%s-%d' % (name, i)
+            )
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            call = self._calls.get()
+            if call is None:
+                return
+            if call.abandoned:
+                continue
+            try:
+                call.result = call.func(*call.args)
+            except Exception:
+                logger.exception("Cover search method %s failed", self.name)
+            call.done.set()
+
+    def call(self, func, *args):
+        """
+            Calls func in one of the worker threads and returns its
+            result, or None if it fails or doesn't return in time.
+        """
+        call = _MethodCall(func, args)
+        self._calls.put(call)
+        if not call.done.wait(self.timeout):
+            # the worker is left to finish, so a method that hangs
+            # doesn't get any more calls than it already has
+            call.abandoned = True
+            logger.warning("Cover search method %s timed out", self.name)
+            return None
+        return call.result
+
+    def close(self):
+        """
+            Stops the worker threads once they are done with the calls
+            so far
+        """
+        for thread in self._threads:
+            self._calls.put(None)
+
+
+class CoverFetcher(object):
+    """
+        Finds covers for many albums concurrently.
+
+        Albums are handled by a number of workers, each of which tries
+        the search methods in order until one of them has a cover. The
+        calls to each search method are made by a pool of threads of its
+        own, so a slow method only holds up the albums waiting for it.
+    """
+
+    def __init__(self, methods, workers=4, method_workers=2, timeout=30):
+        """
+            :param methods: the search methods to use, in order of
+                    preference
+            :param workers: the number of albums to fetch at once
+            :param method_workers: the maximum number of concurrent calls
+                    to each search method
+            :param timeout: the number of seconds after which a call to
+                    a search method is given up on, or None to wait
+                    forever
+        """
+        self.methods = list(methods)
+        self.workers = max(1, workers)
+        self.method_workers = max(1, method_workers)
+        self.timeout = timeout
+
+    def fetch(self, items, stopper=None):
+        """
+            Finds the covers of albums.
+
+            :param items: a list of (key, track) tuples, where key
+                    identifies the album of the track to the caller
+            :param stopper: a :class:`threading.Event` that stops the
+                    fetching when set
+            :returns: a generator of (key, track, db_string, data) tuples
+                    in the order the albums are done. db_string and data
+                    are None if no cover was found.
+        """
+        # also stops the workers once the caller is done with the results
+        finished = threading.Event()
+        if stopper is None:
+            stopped = finished.is_set
+        else:
+            stopped = lambda: stopper.is_set() or finished.is_set()
+
+        pending = Queue.Queue()
+        for item in items:
+            pending.put(item)
+        results = Queue.Queue()
+        pools = [
+            (method, _MethodPool(method.name, self.method_workers, self.timeout))
+            for method in self.methods
+        ]
+
+        for i in range(min(self.workers, len(items))):
+            thread = threading.Thread(
+                target=self._fetch_worker,
+                name='CoverFetcher-%d' % i,
+                args=(pending, results, pools, stopped),
+            )
+            thread.daemon = True
+            thread.start()
+
+        try:
+            for i in range(len(items)):
+                while True:
+                    if stopped():
+                        return
+                    try:
+                        result = results.get(True, 0.5)
+                    except Queue.Empty:
+                        continue
+                    break
+                yield result
+        finally:
+            finished.set()
+            for method, pool in pools:
+                pool.close()
+
+    def _fetch_worker(self, pending, results, pools, stopped):
+        while not stopped():
+            try:
+                key, track = pending.get_nowait()
+            except Queue.Empty:
+                return
+            results.put((key, track) + self._fetch_cover(track, pools, stopped))
+
+    @staticmethod
+    def _fetch_cover(track, pools, stopped):
+        """
+            Returns the db_string and the data of the first cover found
+            for a track, or None and None
+        """
+        for method, pool in pools:
+            if stopped():
+                break
+            covers = pool.call(method.find_covers, track, 1)
+            if not covers:
+                continue
+            data = pool.call(method.get_cover_data, covers[0])
+            if data:
+                return '%s:%s' % (method.name, covers[0]), data
+        return None, None
+
+
 class CoverSearchMethod(object):
     """
         Base class for creating cover search methods.
@@ -511,6 +1212,18 @@ class CoverSearchMethod(object):
         """
         raise NotImplementedError
 
+    def get_cover_version(self, db_string):
+        """
+            Get a string that changes when the image of a cover changes,
+            such as the modification time of the file it is read from.
+            Only used for methods which do not cache their covers.
+
+            :param db_string: A method-dependent string that identifies the
+                    cover.
+            :returns: the version, or None if the image never changes
+        """
+        return None
+
 
 class TagCoverFetcher(CoverSearchMethod):
     """
@@ -553,6 +1266,10 @@ class TagCoverFetcher(CoverSearchMethod):
 
         return covers[int(index)].data
 
+    def get_cover_version(self, db_string):
+        tag, index, uri = db_string.split(':', 2)
+        return _get_uri_version(uri)
+
 
 class LocalFileCoverFetcher(CoverSearchMethod):
     """
@@ -572,7 +1289,15 @@ class LocalFileCoverFetcher(CoverSearchMethod):
     def __init__(self):
         CoverSearchMethod.__init__(self)
 
+        # The images found in each directory, by directory uri, as a tuple
+        # of the modification time of the directory, a list of tuples of
+        # the image base name and uri, and the time it was last checked
+        self._images = {}
+        self._images_lock = threading.Lock()
+
         event.add_callback(self.on_option_set, 'covers_localfile_option_set')
+        event.add_callback(self.on_directory_scanned, 'library_directory_scanned')
+        event.add_callback(self.on_location_changed, 'library_location_changed')
         self.on_option_set(
             'covers_localfile_option_set', settings, 'covers/localfile/preferred_names'
         )
@@ -585,35 +1310,94 @@ class LocalFileCoverFetcher(CoverSearchMethod):
             return []
         basedir = Gio.File.new_for_uri(track.get_loc_for_io()).get_parent()
         try:
-            if (
-                not basedir.query_info(
-                    "standard::type", Gio.FileQueryInfoFlags.NONE, None
-                ).get_file_type()
-                == Gio.FileType.DIRECTORY
-            ):
-                return []
+            images = self._get_images(basedir)
         except GLib.Error:
             return []
         covers = []
-        for fileinfo in basedir.enumerate_children(
-            "standard::type" ",standard::name", Gio.FileQueryInfoFlags.NONE, None
-        ):
-            gloc = basedir.get_child(fileinfo.get_name())
-            if not fileinfo.get_file_type() == Gio.FileType.REGULAR:
-                continue
-            filename = gloc.get_basename()
-            base, ext = os.path.splitext(filename)
-            if ext.lower() not in self.extensions:
-                continue
+        for base, uri in images:
             if base in self.preferred_names:
-                covers.insert(0, gloc.get_uri())
+                covers.insert(0, uri)
             else:
-                covers.append(gloc.get_uri())
+                covers.append(uri)
         if limit == -1:
             return covers
         else:
             return covers[:limit]
 
+    def _get_images(self, basedir):
+        """
+            Returns the images in a directory, listing it only if it has
+            been modified since it was last listed
+        """
+        uri = basedir.get_uri()
+        now = time.time()
+        with self._images_lock:
+            images = self._images.get(uri)
+        if images is not None and now - images[2] < _LOCALFILE_CHECK_INTERVAL:
+            return images[1]
+
+        info = basedir.query_info(
+            "standard::type,time::modified", Gio.FileQueryInfoFlags.NONE, None
+        )
+        if not info.get_file_type() == Gio.FileType.DIRECTORY:
+            return []
+        mtime = self._get_mtime(info)
+        if images is not None and images[0] == mtime:
+            with self._images_lock:
+                self._images[uri] = (mtime, images[1], now)
+            return images[1]
+
+        images = self._find_images(
+            basedir.get_child(fileinfo.get_name())
+            for fileinfo in basedir.enumerate_children(
+                "standard::type" ",standard::name", Gio.FileQueryInfoFlags.NONE, None
+            )
+            if fileinfo.get_file_type() == Gio.FileType.REGULAR
+        )
+        with self._images_lock:
+            self._images[uri] = (mtime, images, now)
+        return images
+
+    def _find_images(self, files):
+        """
+            Returns the base names and uris of the images among files
+        """
+        images = []
+        for gloc in files:
+            filename = gloc.get_basename()
+            base, ext = os.path.splitext(filename)
+            if ext.lower() in self.extensions:
+                images.append((base, gloc.get_uri()))
+        return images
+
+    @staticmethod
+    def _get_mtime(info):
+        mtime = info.get_modification_time()
+        return (mtime.tv_sec, mtime.tv_usec)
+
+    def on_directory_scanned(self, e, library, listing):
+        """
+            Remembers the images of a directory listed by a library scan
+        """
+        directory, info, files = listing
+        images = self._find_images(files)
+        with self._images_lock:
+            self._images[directory.get_uri()] = (
+                self._get_mtime(info),
+                images,
+                time.time(),
+            )
+
+    def on_location_changed(self, e, library, gfile):
+        """
+            Forgets the images of directories changed in a library
+        """
+        parent = gfile.get_parent()
+        with self._images_lock:
+            self._images.pop(gfile.get_uri(), None)
+            if parent is not None:
+                self._images.pop(parent.get_uri(), None)
+
     def get_cover_data(self, db_string):
         try:
             data = Gio.File.new_for_uri(db_string).load_contents(None)[1]
@@ -621,6 +1405,9 @@ class LocalFileCoverFetcher(CoverSearchMethod):
         except GLib.GError:
             return None
 
+    def get_cover_version(self, db_string):
+        return _get_uri_version(db_string)
+
     def on_option_set(self, e, settings, option):
         """
             Updates the internal settings upon option change
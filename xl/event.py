@@ -35,8 +35,12 @@ be listened for by ANY object.
 
 Events should be emitted AFTER the given event has taken place. Often the
 most appropriate spot is immediately before a return statement.
+
+Events that are sent in bulk, such as ``track_tags_changed``, can also be
+listened for in batches, see log_batched_event.
 """
 
+from contextlib import contextmanager
 from inspect import ismethod
 import logging
 import re
@@ -62,6 +66,16 @@ _NONE = Nothing()  # used by event for a safe None replacement
 _UiThread = threading.current_thread()
 
 
+class _Batch(threading.local):
+    def __init__(self):
+        self.depth = 0
+        # the collected data, by event type and object
+        self.events = {}
+
+
+_batch = _Batch()
+
+
 def log_event(evty, obj, data):
     """
         Sends an event.
@@ -78,6 +92,67 @@ def log_event(evty, obj, data):
     EVENT_MANAGER.emit(e)
 
 
+def log_batched_event(evty, obj, data):
+    """
+        Sends an event, and then its batched variant, whose type is evty
+        with ``_batch`` appended. The batched variant is sent with None as
+        object and a dict mapping obj to data as data.
+
+        Inside of a :func:`batch` block, the batched variant is only sent
+        once, at the end of the outermost block, with the objects and data
+        of all events of the type sent by the thread in the block. The data
+        of the events of an object are merged, when they are sets, or else
+        the last data is kept.
+
+        Listening for the batched variant allows doing the work for a bulk
+        operation only once. UI callbacks should listen for it, so that a
+        bulk operation in another thread only queues one event for the UI
+        thread.
+
+        :param evty: the *type* or *name* of the event.
+        :type evty: string
+        :param obj: the object sending the event.
+        :type obj: object
+        :param data: some data about the event, None if not required
+        :type data: object
+    """
+    log_event(evty, obj, data)
+    if _batch.depth:
+        events = _batch.events.setdefault(evty, {})
+        old_data = events.get(obj)
+        if isinstance(old_data, (set, frozenset)) and isinstance(
+            data, (set, frozenset)
+        ):
+            data = old_data | data
+        events[obj] = data
+    else:
+        log_event(evty + '_batch', None, {obj: data})
+
+
+@contextmanager
+def batch():
+    """
+        A context manager that collects the batched variants of the events
+        sent with :func:`log_batched_event` by this thread, and sends them
+        when the outermost block ends.
+
+        Example::
+
+            with event.batch():
+                for track in tracks:
+                    track.set_tags(genre=genre)
+    """
+    _batch.depth += 1
+    try:
+        yield
+    finally:
+        _batch.depth -= 1
+        if not _batch.depth:
+            events, _batch.events = _batch.events, {}
+            for evty, data in events.iteritems():
+                log_event(evty + '_batch', None, data)
+
+
 def add_callback(function, evty=None, obj=None, *args, **kwargs):
     """
         Adds a callback to an event
@@ -258,6 +333,29 @@ def _getWeakRef(obj, notifyDead=None):
         return createRef(obj, notifyDead)
 
 
+def _build_dispatch(cbs, evty):
+    """
+        Returns the callbacks to call for events of a type, as a tuple of
+        the callbacks for any object and a WeakKeyDictionary of the
+        callbacks for specific objects.
+
+        :param cbs: the callbacks, by event type and object
+        :param evty: the event type, or _NONE for the types that have no
+            callbacks of their own
+    """
+    any_type = cbs.get(_NONE, {})
+    this_type = cbs.get(evty, {}) if evty is not _NONE else {}
+
+    by_object = weakref.WeakKeyDictionary()
+    for obj in set(any_type.keys()) | set(this_type.keys()):
+        if obj is not _NONE:
+            by_object[obj] = tuple(any_type.get(obj, ())) + tuple(
+                this_type.get(obj, ())
+            )
+    any_object = tuple(any_type.get(_NONE, ())) + tuple(this_type.get(_NONE, ()))
+    return any_object, by_object
+
+
 class EventManager(object):
     """
         Manages all Events
@@ -268,6 +366,16 @@ class EventManager(object):
         self.all_callbacks = {}
         self.callbacks = {}
         self.ui_callbacks = {}
+
+        # Each dict of callbacks has a dispatch table, which maps event
+        # types to the result of _build_dispatch. The tables are replaced
+        # rather than changed, so that emit can read them without locking.
+        self.dispatch = {}
+        for cbs in (self.all_callbacks, self.callbacks, self.ui_callbacks):
+            self.dispatch[id(cbs)] = {}
+
+        # event and callback statistics, collected if not None
+        self.profile = None
         self.use_logger = use_logger
         self.use_verbose_logger = verbose
         self.logger_filter = logger_filter
@@ -300,15 +408,18 @@ class EventManager(object):
         if is_ui_thread:
             self._emit(event, self.all_callbacks, emit_logmsg, emit_verbose)
         else:
-            # Don't issue the log message twice
-            with self.pending_ui_lock:
-                do_emit = not self.pending_ui
-                self.pending_ui.append(
-                    (event, self.ui_callbacks, emit_logmsg, emit_verbose)
-                )
-
-            if do_emit:
-                GLib.idle_add(self._emit_pending)
+            # Events without UI callbacks aren't queued, unless they have to
+            # be logged. Don't issue the log message twice
+            if emit_logmsg or self._get_callbacks(self.ui_callbacks, event):
+                with self.pending_ui_lock:
+                    do_emit = not self.pending_ui
+                    # the event is counted by the first pass below
+                    self.pending_ui.append(
+                        (event, self.ui_callbacks, emit_logmsg, emit_verbose, False)
+                    )
+
+                if do_emit:
+                    GLib.idle_add(self._emit_pending)
             self._emit(event, self.callbacks, False, emit_verbose)
 
     def _emit_pending(self):
@@ -320,23 +431,28 @@ class EventManager(object):
         for event in events:
             self._emit(*event)
 
-    def _emit(self, event, exc_callbacks, emit_logmsg, emit_verbose):
+    def _get_callbacks(self, cbs, event):
+        """
+            Returns the callbacks in cbs to call for an event
+        """
+        table = self.dispatch[id(cbs)]
+        dispatch = table.get(event.type) or table.get(_NONE)
+        if dispatch is None:
+            return ()
+        callbacks = dispatch[0]
+        try:
+            callbacks += dispatch[1].get(event.object, ())
+        except TypeError:
+            pass  # no callbacks can be registered for this object
+        return callbacks
 
-        # Accumulate in this set to ensure callbacks only get called once
-        callbacks = set()
+    def _emit(self, event, exc_callbacks, emit_logmsg, emit_verbose, count=True):
 
-        with self.lock:
-            for tcall in [_NONE, event.type]:
-                tcb = exc_callbacks.get(tcall)
-                if tcb is not None:
-                    for ocall in [_NONE, event.object]:
-                        ocb = tcb.get(ocall)
-                        if ocb is not None:
-                            callbacks.update(ocb)
-
-        # However, do not actually call the callbacks from within the lock
-        # -> Otherwise non-ui threads could accidentally block the UI if
-        #    they decide to run for too long
+        callbacks = self._get_callbacks(exc_callbacks, event)
+
+        profile = self.profile
+        if profile is not None:
+            start = time.time()
 
         for cb in callbacks:
             try:
@@ -345,11 +461,7 @@ class EventManager(object):
                     # Remove callbacks that have been garbage collected.. but
                     # really, should be using remove_callback to clean up after
                     # your event handler
-                    with self.lock:
-                        try:
-                            exc_callbacks[event.type][event.object].remove(cb)
-                        except (KeyError, ValueError):
-                            pass
+                    self._remove_dead_callback(exc_callbacks, event, cb)
                 else:
                     if emit_verbose:
                         logger.debug(
@@ -357,14 +469,23 @@ class EventManager(object):
                             "%(function)s in response "
                             "to %(event)s." % {'function': fn, 'event': event.type}
                         )
-                    fn.__call__(
-                        event.type, event.object, event.data, *cb.args, **cb.kwargs
-                    )
+                    if profile is not None:
+                        cb_start = time.time()
+                    try:
+                        fn.__call__(
+                            event.type, event.object, event.data, *cb.args, **cb.kwargs
+                        )
+                    finally:
+                        if profile is not None:
+                            profile.add_callback(event.type, fn, time.time() - cb_start)
                 fn = None
             except Exception:
                 # something went wrong inside the function we're calling
                 logger.exception("Event callback exception caught!")
 
+        if profile is not None:
+            profile.add_event(event.type, time.time() - start, count)
+
         if emit_logmsg:
             logger.debug(
                 "Sent '%s' event from %r with data %r",
@@ -373,6 +494,58 @@ class EventManager(object):
                 event.data,
             )
 
+    def _remove_dead_callback(self, cbs, event, cb):
+        with self.lock:
+            for evty in (_NONE, event.type):
+                for obj in (_NONE, event.object):
+                    try:
+                        cbs[evty][obj].remove(cb)
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                    self._update_dispatch(cbs, evty)
+                    return
+
+    def _update_dispatch(self, cbs, evty):
+        """
+            Rebuilds the dispatch table of cbs after the callbacks for
+            events of type evty changed. Must be called with the lock held.
+        """
+        if evty is _NONE:
+            # the callbacks for any type are part of every entry
+            types = list(cbs.keys()) + [_NONE]
+        else:
+            types = [evty]
+
+        table = dict(self.dispatch[id(cbs)])
+        for evty in types:
+            if evty in cbs:
+                table[evty] = _build_dispatch(cbs, evty)
+            else:
+                table.pop(evty, None)
+        self.dispatch[id(cbs)] = table
+
+    def set_profiling(self, enabled):
+        """
+            Enables or disables counting the events and the time spent in
+            their callbacks. The statistics are reset on every change.
+            See get_profile.
+        """
+        with self.lock:
+            self.profile = EventProfile() if enabled else None
+
+    def get_profile(self):
+        """
+            Returns the statistics collected since profiling was enabled,
+            or None if profiling is disabled.
+
+            :returns: a dict with two keys. 'events' maps event types to
+                a tuple of (count, seconds). 'callbacks' maps tuples of
+                (event type, callback name) to (count, seconds).
+        """
+        profile = self.profile
+        if profile is not None:
+            return profile.get()
+
     def emit_async(self, event):
         """
             Same as emit(), but does not block.
@@ -420,6 +593,7 @@ class EventManager(object):
 
                 # add the actual callback
                 callbacks.append(cb)
+                self._update_dispatch(cbs, evty)
 
         if self.use_logger:
             if (
@@ -468,6 +642,7 @@ class EventManager(object):
                     del cbs[evty][obj]
                     if len(cbs[evty]) == 0:
                         del cbs[evty]
+                self._update_dispatch(cbs, evty)
 
         if self.use_logger:
             if (
@@ -478,6 +653,43 @@ class EventManager(object):
                 logger.debug("Removed callback %s for [%s, %s]" % (function, evty, obj))
 
 
+class EventProfile(object):
+    """
+        Counts events and the time spent in their callbacks, by event type
+        and by callback
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = {}
+        self.callbacks = {}
+
+    def _add(self, stats, key, duration, count=True):
+        with self.lock:
+            old_count, total = stats.get(key, (0, 0.0))
+            stats[key] = (old_count + int(count), total + duration)
+
+    def add_event(self, evty, duration, count=True):
+        """
+            Adds the time spent in callbacks for an event. Events that are
+            handled in two passes, for other threads and then for the UI
+            thread, are only counted in the first one.
+        """
+        self._add(self.events, evty, duration, count)
+
+    def add_callback(self, evty, function, duration):
+        name = getattr(function, '__name__', None) or repr(function)
+        cls = getattr(function, 'im_class', None)
+        if cls is not None:
+            name = '%s.%s' % (cls.__name__, name)
+        name = '%s.%s' % (getattr(function, '__module__', None), name)
+        self._add(self.callbacks, (evty, name), duration)
+
+    def get(self):
+        with self.lock:
+            return {'events': dict(self.events), 'callbacks': dict(self.callbacks)}
+
+
 EVENT_MANAGER = EventManager()
 
 # vim: et sts=4 sw=4
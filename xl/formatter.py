@@ -36,7 +36,7 @@ from gi.repository import GObject
 import re
 from string import Template, _TemplateMetaclass
 
-from xl import common, providers, settings, trax
+from xl import common, event, providers, settings, trax
 from xl.common import TimeSpan
 from xl.nls import gettext as _, ngettext
 
@@ -150,6 +150,172 @@ class ParameterTemplate(Template):
         return self.pattern.sub(convert, self.template)
 
 
+class _Field(object):
+    """
+        An identifier of a compiled template with its parameters
+    """
+
+    __slots__ = [
+        'needle',
+        'identifier',
+        'parameters',
+        'arguments',
+        'prefix',
+        'suffix',
+        'pad',
+        'padstring',
+        'text',
+    ]
+
+    def __init__(self, needle, identifier, parameters, text):
+        """
+            :param needle: the key of the identifier in substitutions,
+                with its parameters if there are any
+            :param identifier: the name of the identifier
+            :param parameters: the parameters passed to the identifier
+            :param text: the text to keep if there is no substitution
+        """
+        self.needle = needle
+        self.identifier = identifier
+        self.parameters = parameters
+        self.text = text
+
+        # The parameters handled by Formatter.format, the others are
+        # passed on to callable substitutions
+        self.arguments = arguments = dict(parameters)
+        self.prefix = arguments.pop('prefix', '')
+        self.suffix = arguments.pop('suffix', '')
+        self.pad = int(arguments.pop('pad', 0))
+        self.padstring = arguments.pop('padstring', '')
+
+    def apply(self, substitute):
+        """
+            Returns the text to put in place of the identifier
+
+            :param substitute: the value of the identifier
+        """
+        pad = self.pad
+        padstring = self.padstring
+
+        if pad > 0 and padstring:
+            # Decrease pad length by value length
+            pad = max(0, pad - len(substitute))
+            # Retrieve the maximum multiplier for the pad string
+            padcount = pad / len(padstring) + 1
+            # Generate pad string
+            padstring = padcount * padstring
+            # Clamp pad string
+            padstring = padstring[0:pad]
+            substitute = '%s%s' % (padstring, substitute)
+
+        if substitute:
+            substitute = '%s%s%s' % (self.prefix, substitute, self.suffix)
+
+        # We use this idiom instead of str() because the latter
+        # will fail if substitute is a Unicode containing non-ASCII
+        return '%s' % (substitute,)
+
+
+class _CompiledTemplate(object):
+    """
+        A format string split into literal text and identifiers, so
+        that it does not have to be parsed again for every format call
+    """
+
+    def __init__(self, template):
+        """
+            :param template: the template to compile
+            :type template: :class:`ParameterTemplate`
+        """
+        self.template = template.template
+        #: the distinct identifiers of the template, by needle
+        self.fields = []
+        #: the literal text around the identifiers, one more than indices
+        self.literals = []
+        #: the position in fields of each identifier of the template
+        self.indices = []
+
+        positions = {}
+        literal = []
+        start = 0
+
+        for match in template.pattern.finditer(self.template):
+            literal.append(self.template[start : match.start()])
+            start = match.end()
+            groups = match.groupdict()
+
+            # We only care about braced and named, escaped and invalid
+            # delimiters are replaced with the delimiter itself
+            identifier = groups['braced'] or groups['named']
+
+            if identifier is None:
+                literal.append(template.delimiter)
+                continue
+
+            identifier_parts = [identifier]
+            parameters = {}
+
+            if groups['parameters'] is not None:
+                parameters = self._parse_parameters(groups['parameters'])
+                identifier_parts += [groups['parameters']]
+
+            # Required to make multiple occurences of the same
+            # identifier with different parameters work
+            needle = ':'.join(identifier_parts)
+
+            if needle not in positions:
+                positions[needle] = len(self.fields)
+                field = _Field(needle, identifier, parameters, match.group())
+                self.fields.append(field)
+
+            self.literals.append(''.join(literal))
+            self.indices.append(positions[needle])
+            literal = []
+
+        literal.append(self.template[start:])
+        self.literals.append(''.join(literal))
+
+    @staticmethod
+    def _parse_parameters(parameters):
+        """
+            Turns the parameters of an identifier into a dictionary
+        """
+        # Split parameters on unescaped comma
+        parameters = [p.lstrip() for p in re.split(r'(?<!\\),', parameters)]
+        # Split arguments on unescaped equals sign
+        parameters = [(re.split(r'(?<!\\)=', p, 1) + [True])[:2] for p in parameters]
+        # Turn list of lists into a proper dictionary
+        parameters = dict(parameters)
+
+        # Remove now obsolete escapes
+        for p in parameters:
+            argument = parameters[p]
+
+            if not isinstance(argument, bool):
+                argument = argument.replace(r'\,', ',')
+                argument = argument.replace(r'\}', '}')
+                argument = argument.replace(r'\=', '=')
+                parameters[p] = argument
+
+        return parameters
+
+    def join(self, values):
+        """
+            Returns the text of the template with the identifiers replaced
+
+            :param values: the text of each of the fields
+            :type values: list of strings
+        """
+        literals = self.literals
+        parts = [literals[0]]
+
+        for i, index in enumerate(self.indices):
+            parts.append(values[index])
+            parts.append(literals[i + 1])
+
+        return ''.join(parts)
+
+
 class Formatter(GObject.GObject):
     """
         A generic text formatter based on a format string
@@ -184,6 +350,7 @@ class Formatter(GObject.GObject):
         GObject.GObject.__init__(self)
 
         self._template = ParameterTemplate(format)
+        self._compiled = None
         self._substitutions = {}
 
     def do_get_property(self, property):
@@ -223,51 +390,24 @@ class Formatter(GObject.GObject):
             :returns: the extractions
             :rtype: dict
         """
-        matches = self._template.pattern.finditer(self._template.template)
-        extractions = {}
-
-        # Extract list of identifiers and parameters from the format string
-        for match in matches:
-            groups = match.groupdict()
-
-            # We only care about braced and named, not escaped and invalid
-            identifier = groups['braced'] or groups['named']
-
-            if identifier is None:
-                continue
-
-            identifier_parts = [identifier]
-            parameters = {}
+        return dict(
+            (field.needle, (field.identifier, dict(field.parameters)))
+            for field in self._compile().fields
+        )
 
-            if groups['parameters'] is not None:
-                # Split parameters on unescaped comma
-                parameters = [
-                    p.lstrip() for p in re.split(r'(?<!\\),', groups['parameters'])
-                ]
-                # Split arguments on unescaped equals sign
-                parameters = [
-                    (re.split(r'(?<!\\)=', p, 1) + [True])[:2] for p in parameters
-                ]
-                # Turn list of lists into a proper dictionary
-                parameters = dict(parameters)
-
-                # Remove now obsolete escapes
-                for p in parameters:
-                    argument = parameters[p]
-
-                    if not isinstance(argument, bool):
-                        argument = argument.replace(r'\,', ',')
-                        argument = argument.replace(r'\}', '}')
-                        argument = argument.replace(r'\=', '=')
-                        parameters[p] = argument
+    def _compile(self):
+        """
+            Returns the compiled format string, which is parsed
+            again only after the format has changed
 
-                identifier_parts += [groups['parameters']]
+            :rtype: :class:`_CompiledTemplate`
+        """
+        compiled = self._compiled
 
-            # Required to make multiple occurences of the same
-            # identifier with different parameters work
-            extractions[':'.join(identifier_parts)] = (identifier, parameters)
+        if compiled is None or compiled.template != self._template.template:
+            compiled = self._compiled = _CompiledTemplate(self._template)
 
-        return extractions
+        return compiled
 
     def format(self, *args):
         """
@@ -277,43 +417,25 @@ class Formatter(GObject.GObject):
             :returns: the formatted text
             :rtype: string
         """
-        extractions = self.extract()
-        substitutions = {}
-
-        for needle, (identifier, parameters) in extractions.iteritems():
-            substitute = None
-
-            if needle in self._substitutions:
-                substitute = self._substitutions[needle]
-            elif identifier in self._substitutions:
-                substitute = self._substitutions[identifier]
+        compiled = self._compile()
+        values = []
 
-            if substitute is not None:
-                prefix = parameters.pop('prefix', '')
-                suffix = parameters.pop('suffix', '')
-                pad = int(parameters.pop('pad', 0))
-                padstring = parameters.pop('padstring', '')
+        for field in compiled.fields:
+            substitute = self._substitutions.get(field.needle)
 
-                if callable(substitute):
-                    substitute = substitute(*args, **parameters)
+            if substitute is None:
+                substitute = self._substitutions.get(field.identifier)
 
-                if pad > 0 and padstring:
-                    # Decrease pad length by value length
-                    pad = max(0, pad - len(substitute))
-                    # Retrieve the maximum multiplier for the pad string
-                    padcount = pad / len(padstring) + 1
-                    # Generate pad string
-                    padstring = padcount * padstring
-                    # Clamp pad string
-                    padstring = padstring[0:pad]
-                    substitute = '%s%s' % (padstring, substitute)
+            if substitute is None:
+                values.append(field.text)
+                continue
 
-                if substitute:
-                    substitute = '%s%s%s' % (prefix, substitute, suffix)
+            if callable(substitute):
+                substitute = substitute(*args, **field.arguments)
 
-                substitutions[needle] = substitute
+            values.append(field.apply(substitute))
 
-        return self._template.safe_substitute(substitutions)
+        return compiled.join(values)
 
 
 class ProgressTextFormatter(Formatter):
@@ -378,6 +500,8 @@ class TrackFormatter(Formatter):
         A formatter for track data
     """
 
+    _bound = None
+
     def format(self, track, markup_escape=False):
         """
             Returns a string for places where
@@ -396,23 +520,70 @@ class TrackFormatter(Formatter):
                 'First argument to format() needs ' 'to be of type xl.trax.Track'
             )
 
-        extractions = self.extract()
-        self._substitutions = {}
+        compiled = self._compile()
+        values = []
 
-        for identifier, (tag, parameters) in extractions.iteritems():
-            provider = providers.get_provider('tag-formatting', tag)
+        for field, format_field in zip(compiled.fields, self._bind(compiled)):
+            substitute = format_field(track)
 
-            if provider is None:
-                substitute = track.get_tag_display(tag)
-            else:
-                substitute = provider.format(track, parameters)
+            if substitute is None:
+                values.append(field.text)
+                continue
 
             if markup_escape:
                 substitute = GLib.markup_escape_text(substitute).decode('utf-8')
 
-            self._substitutions[identifier] = substitute
+            values.append(field.apply(substitute))
 
-        return Formatter.format(self)
+        return compiled.join(values)
+
+    def _bind(self, compiled):
+        """
+            Returns a callable for each field of the compiled format
+            string, which returns the value of the field for a track
+
+            The tag-formatting providers are looked up again only
+            after the format has changed or providers were added or
+            removed.
+        """
+        bound = self._bound
+        serial = _providers_serial
+
+        if bound is not None and bound[0] is compiled and bound[1] == serial:
+            return bound[2]
+
+        callables = [self._bind_field(field) for field in compiled.fields]
+        self._bound = (compiled, serial, callables)
+
+        return callables
+
+    @staticmethod
+    def _bind_field(field):
+        """
+            Returns a callable which returns the value of a field for a track
+        """
+        tag = field.identifier
+        provider = providers.get_provider('tag-formatting', tag)
+
+        if provider is None:
+            return lambda track: track.get_tag_display(tag)
+
+        parameters = field.parameters
+        return lambda track: provider.format(track, parameters)
+
+
+#: Changes whenever a tag-formatting provider is added or removed, so
+#: that TrackFormatter knows when to look up the providers again
+_providers_serial = 0
+
+
+def _on_provider_changed(type, obj, data):
+    global _providers_serial
+    _providers_serial += 1
+
+
+event.add_callback(_on_provider_changed, 'tag-formatting_provider_added')
+event.add_callback(_on_provider_changed, 'tag-formatting_provider_removed')
 
 
 class TagFormatter(object):
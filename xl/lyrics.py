@@ -25,36 +25,77 @@
 # from your version.
 
 from datetime import datetime, timedelta
+from gi.repository import GLib
+import logging
 import os
 import re
+import time
 import zlib
 import threading
 
 from xl.nls import gettext as _
 from xl import common, event, providers, settings, xdg
 
+logger = logging.getLogger(__name__)
+
+#: Maximum number of seconds between a change of the cache and its write
+_FLUSH_INTERVAL = 30
+#: Number of seconds between two garbage collections of the cache
+_GC_INTERVAL = 6 * 60 * 60
+#: Number of seconds after the last lookup of lyrics during which remote
+#: methods are used to prefetch lyrics
+_PREFETCH_REMOTE_TIME = 30 * 60
+
+# marks the keys deleted since the last flush of a LyricsCache
+_DELETED = object()
+
 
 class LyricsNotFoundException(Exception):
     pass
 
 
+class LyricsNotAvailableException(LyricsNotFoundException):
+    """
+        Raised by search methods which know that there are no lyrics for
+        a track, as opposed to not being able to look for them, such as
+        when offline. Only this result is cached.
+    """
+
+    pass
+
+
 class LyricsCache:
     '''
         Basically just a thread-safe shelf for convinience.
         Supports container syntax.
+
+        Changes are kept in memory and written to the shelf in batches,
+        at most flush_interval seconds after they are made, so that
+        readers don't have to wait for the shelf to be synced.
     '''
 
-    def __init__(self, location, default=None):
+    def __init__(self, location, default=None, flush_interval=_FLUSH_INTERVAL):
         '''
             @param location: specify the shelve file location
 
             @param default: can specify a default to return from getter when
                 there is nothing in the shelve
+
+            @param flush_interval: the maximum number of seconds between a
+                change and its write to the shelve
         '''
         self.location = location
         self.db = common.open_shelf(location)
+        # guards the shelf
         self.lock = threading.Lock()
         self.default = default
+        self.flush_interval = flush_interval
+        # the changes that are not in the shelf yet, deleted keys are
+        # mapped to _DELETED
+        self.__pending = {}
+        self.__pending_lock = threading.Lock()
+        self.__flush_id = None
+        self.__closed = False
 
         # Callback to close db
         event.add_callback(self.on_quit_application, 'quit_application')
@@ -64,27 +105,132 @@ class LyricsCache:
             Closes db on quit application
             Gets the lock/wait operations
         """
+        self.flush()
         with self.lock:
+            self.__closed = True
             self.db.close()
 
+    def flush(self):
+        """
+            Writes the pending changes to the shelf and syncs it
+        """
+        with self.__pending_lock:
+            pending = self.__pending.items()
+        if not pending:
+            return
+
+        with self.lock:
+            if self.__closed:
+                return
+            for key, value in pending:
+                if value is not _DELETED:
+                    self.db[key] = value
+                elif key in self.db:
+                    del self.db[key]
+            self.db.sync()
+
+            # readers look at the pending changes until they are written,
+            # and those made while writing are left for the next flush
+            with self.__pending_lock:
+                for key, value in pending:
+                    if self.__pending.get(key) is value:
+                        del self.__pending[key]
+
+    def __on_flush_timeout(self):
+        with self.__pending_lock:
+            self.__flush_id = None
+        self.__flush_threaded()
+        return False
+
+    @common.threaded
+    def __flush_threaded(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Could not save %s", self.location)
+
+    def __set_pending(self, key, value):
+        with self.__pending_lock:
+            self.__pending[key] = value
+            if self.__flush_id is None:
+                self.__flush_id = GLib.timeout_add_seconds(
+                    self.flush_interval, self.__on_flush_timeout
+                )
+
+    def expire(self, max_age, max_entries=0):
+        """
+            Removes the entries that are older than max_age, and then
+            the oldest entries until at most max_entries are left. The
+            values must be tuples whose last item is the datetime at
+            which they were stored.
+
+            :param max_age: a :class:`datetime.timedelta`
+            :param max_entries: the number of entries to keep, or 0 for
+                no limit
+            :returns: the number of removed entries
+        """
+        self.flush()
+        oldest = datetime.now() - max_age
+
+        with self.lock:
+            if self.__closed:
+                return 0
+            expired = []
+            entries = []
+            for key in self.db.keys():
+                try:
+                    time = self.db[key][-1]
+                except Exception:
+                    time = None
+                if not isinstance(time, datetime) or time < oldest:
+                    expired.append(key)
+                else:
+                    entries.append((time, key))
+
+            if max_entries and len(entries) > max_entries:
+                entries.sort()
+                expired.extend(key for time, key in entries[:-max_entries])
+
+            for key in expired:
+                del self.db[key]
+            if expired:
+                self.db.sync()
+
+        return len(expired)
+
     def keys(self):
         '''
             Return the shelve keys
         '''
-        return self.db.keys()
+        with self.__pending_lock:
+            pending = dict(self.__pending)
+        with self.lock:
+            keys = set(self.db.keys())
+        for key, value in pending.iteritems():
+            if value is _DELETED:
+                keys.discard(key)
+            else:
+                keys.add(key)
+        return list(keys)
 
     def _get(self, key, default=None):
+        if default is None:
+            default = self.default
+        with self.__pending_lock:
+            value = self.__pending.get(key)
+        if value is _DELETED:
+            return default
+        elif value is not None:
+            return value
+
         with self.lock:
             try:
                 return self.db[key]
             except Exception:
-                return default if default is not None else self.default
+                return default
 
     def _set(self, key, value):
-        with self.lock:
-            self.db[key] = value
-            # force save, wasn't auto-saving...
-            self.db.sync()
+        self.__set_pending(key, value)
 
     def __getitem__(self, key):
         return self._get(key)
@@ -93,17 +239,23 @@ class LyricsCache:
         self._set(key, value)
 
     def __contains__(self, key):
-        return key in self.db
+        with self.__pending_lock:
+            value = self.__pending.get(key)
+        if value is not None:
+            return value is not _DELETED
+        with self.lock:
+            return key in self.db
 
     def __delitem__(self, key):
-        with self.lock:
-            del self.db[key]
+        if key not in self:
+            raise KeyError(key)
+        self.__set_pending(key, _DELETED)
 
     def __iter__(self):
-        return self.db.__iter__()
+        return iter(self.keys())
 
     def __len__(self):
-        return len(self.db)
+        return len(self.keys())
 
 
 class LyricsManager(providers.ProviderHandler):
@@ -117,8 +269,17 @@ class LyricsManager(providers.ProviderHandler):
         providers.ProviderHandler.__init__(self, "lyrics")
         self.preferred_order = settings.get_option('lyrics/preferred_order', [])
         self.cache = LyricsCache(os.path.join(xdg.get_cache_dir(), 'lyrics.cache'))
-
-        event.add_callback(self.on_track_tags_changed, 'track_tags_changed')
+        # the tracks left to prefetch, whether remote methods are used,
+        # and whether a thread prefetches them
+        self.__prefetch_tracks = []
+        self.__prefetch_remote = False
+        self.__prefetching = False
+        self.__prefetch_lock = threading.Lock()
+        # the time lyrics were last looked up, other than by prefetching
+        self.__last_lookup = 0
+
+        event.add_callback(self.on_track_tags_changed, 'track_tags_changed_batch')
+        event.add_callback(self.on_playback_track_start, 'playback_track_start')
 
     def __get_cache_key(self, track, provider):
         """
@@ -171,6 +332,7 @@ class LyricsManager(providers.ProviderHandler):
         lyrics = None
         source = None
         url = None
+        self.__last_lookup = time.time()
 
         for method in self.get_providers():
             try:
@@ -204,6 +366,7 @@ class LyricsManager(providers.ProviderHandler):
                 found from all sources.
         """
         lyrics_found = []
+        self.__last_lookup = time.time()
 
         for method in self.get_providers():
             lyrics = None
@@ -245,29 +408,132 @@ class LyricsManager(providers.ProviderHandler):
         source = None
         url = None
         cache_time = settings.get_option('lyrics/cache_time', 720)  # in hours
+        # how long the lack of lyrics is remembered, in hours
+        negative_cache_time = settings.get_option('lyrics/negative_cache_time', 24)
         key = self.__get_cache_key(track, method)
 
         # check cache for lyrics
-        if key in self.cache:
-            (lyrics, source, url, time) = self.cache[key]
+        cached = None if refresh else self.cache[key]
+        if cached is not None:
+            (lyrics, source, url, cache_date) = cached
+            age = datetime.now() - cache_date
+            if lyrics is None:
+                # the method found no lyrics the last time
+                if age < timedelta(hours=negative_cache_time):
+                    raise LyricsNotAvailableException()
             # return if they are not expired
-            now = datetime.now()
-            if now - time < timedelta(hours=cache_time) and not refresh:
+            elif age < timedelta(hours=cache_time):
                 try:
                     lyrics = zlib.decompress(lyrics)
                 except zlib.error as e:
                     raise LyricsNotFoundException(e)
                 return (lyrics.decode('utf-8', errors='replace'), source, url)
 
-        (lyrics, source, url) = method.find_lyrics(track)
+        try:
+            (lyrics, source, url) = method.find_lyrics(track)
+        except LyricsNotAvailableException:
+            self.cache[key] = (None, None, None, datetime.now())
+            raise
         assert isinstance(lyrics, unicode), (method, track)
 
         # update cache
-        time = datetime.now()
-        self.cache[key] = (zlib.compress(lyrics.encode('utf-8')), source, url, time)
+        cache_date = datetime.now()
+        self.cache[key] = (
+            zlib.compress(lyrics.encode('utf-8')),
+            source,
+            url,
+            cache_date,
+        )
 
         return (lyrics, source, url)
 
+    def prefetch(self, tracks, remote=True):
+        """
+            Fetches the lyrics of tracks from all providers in the
+            background, so that they are cached when the tracks are
+            played. Replaces the tracks of the previous call that are
+            not fetched yet.
+
+            :param tracks: an iterable of tracks
+            :param remote: whether to use the providers which fetch
+                lyrics over the network
+        """
+        with self.__prefetch_lock:
+            self.__prefetch_tracks = list(tracks)
+            self.__prefetch_remote = remote
+            if self.__prefetching or not self.__prefetch_tracks:
+                return
+            self.__prefetching = True
+        self.__prefetch_threaded()
+
+    @common.threaded
+    def __prefetch_threaded(self):
+        while True:
+            with self.__prefetch_lock:
+                if not self.__prefetch_tracks:
+                    self.__prefetching = False
+                    return
+                track = self.__prefetch_tracks.pop(0)
+                remote = self.__prefetch_remote
+
+            for method in self.get_providers():
+                if not remote and getattr(method, 'remote', True):
+                    continue
+                try:
+                    self._find_cached_lyrics(method, track)
+                except LyricsNotFoundException:
+                    pass
+                except Exception:
+                    logger.exception("Could not prefetch lyrics from %s", method.name)
+
+    def collect_garbage(self):
+        """
+            Removes the expired entries from the cache, and then the
+            oldest entries until it holds at most ``lyrics/cache_size``
+            entries (0 for no limit)
+
+            :returns: the number of removed entries
+        """
+        cache_time = settings.get_option('lyrics/cache_time', 720)
+        cache_size = settings.get_option('lyrics/cache_size', 5000)
+        removed = self.cache.expire(timedelta(hours=cache_time), cache_size)
+        logger.info("Removed %d entries from the lyrics cache", removed)
+        return removed
+
+    @common.threaded
+    def _collect_garbage_threaded(self):
+        try:
+            self.collect_garbage()
+        except Exception:
+            logger.exception("Could not collect garbage in the lyrics cache")
+
+    def start_collecting_garbage(self, interval=_GC_INTERVAL):
+        """
+            Collects garbage in the cache in the background, once now and
+            then every interval seconds. See collect_garbage.
+        """
+
+        def collect():
+            self._collect_garbage_threaded()
+            return True
+
+        collect()
+        GLib.timeout_add_seconds(interval, collect)
+
+    def on_playback_track_start(self, e, player, track):
+        """
+            Prefetches the lyrics of the next ``lyrics/prefetch_count``
+            tracks of the queue of the player. Remote providers are only
+            used while lyrics are being looked up, so that they are not
+            queried when no lyrics are shown.
+        """
+        count = settings.get_option('lyrics/prefetch_count', 3)
+        queue = getattr(player, 'queue', None)
+        if count <= 0 or queue is None:
+            return
+        remote = time.time() - self.__last_lookup < _PREFETCH_REMOTE_TIME
+        self.prefetch(queue.get_upcoming(count), remote)
+
     def on_provider_removed(self, provider):
         """
             Remove the provider from the methods dict, and the
@@ -280,17 +546,21 @@ class LyricsManager(providers.ProviderHandler):
         except (ValueError, AttributeError):
             pass
 
-    def on_track_tags_changed(self, e, track, tags):
+    def on_track_tags_changed(self, e, obj, changes):
         """
             Updates the internal cache upon lyric tag changes
         """
-        if 'lyrics' in tags:
-            local_provider = self.get_provider('__local')
+        tracks = [track for track, tags in changes.iteritems() if 'lyrics' in tags]
+        if not tracks:
+            return
 
-            # If the local tag provider was removed, don't bother
-            if local_provider is None:
-                return
+        local_provider = self.get_provider('__local')
 
+        # If the local tag provider was removed, don't bother
+        if local_provider is None:
+            return
+
+        for track in tracks:
             key = self.__get_cache_key(track, local_provider)
 
             # Try to remove the corresponding cache entry
@@ -308,6 +578,9 @@ class LyricSearchMethod(object):
         Lyrics plugins will subclass this
     """
 
+    #: Whether lyrics are fetched over the network
+    remote = True
+
     def find_lyrics(self, track):
         """
             Called by LyricsManager when lyrics are requested
@@ -315,7 +588,9 @@ class LyricSearchMethod(object):
             :param track: the track that we want lyrics for
             :return: tuple of lyrics text, provider name, URL
             :rtype: Tuple[unicode, basestring, basestring]
-            :raise: LyricsNotFoundException if not found
+            :raise: LyricsNotAvailableException if there are no lyrics
+                for the track, LyricsNotFoundException if they could not
+                be looked for
         """
         raise NotImplementedError
 
@@ -349,11 +624,12 @@ class LocalLyricSearch(LyricSearchMethod):
 
     name = "__local"
     display_name = _("Local")
+    remote = False
 
     def find_lyrics(self, track):
         lyrics = track.get_tag_disk('lyrics')
         if not lyrics:
-            raise LyricsNotFoundException()
+            raise LyricsNotAvailableException()
         return (lyrics[0], self.name, "")
 
 
@@ -695,6 +695,14 @@ class Exaile(object):
 
         mig.migrate()
 
+        from xl import covers
+
+        covers.MANAGER.start_collecting_garbage()
+
+        from xl import lyrics
+
+        lyrics.MANAGER.start_collecting_garbage()
+
         from xl import event
 
         # Set up the player and playback queue
@@ -103,12 +103,14 @@ formats = {
 # pass get_loc_for_io() to this.
 
 
-def get_format(loc):
+def get_format(loc, header_only=False):
     """
         get a Format object appropriate for the file at loc.
         if no suitable object can be found, None is returned.
 
         :param loc: The location to read from as a Gio URI
+        :param header_only: whether to defer loading large tags such as
+            covers and lyrics, see :class:`BaseFormat`
     """
     loc = Gio.File.new_for_uri(loc).get_path()
     if not loc:
@@ -139,7 +141,7 @@ def get_format(loc):
         formatclass = BaseFormat
 
     try:
-        return formatclass(loc)
+        return formatclass(loc, header_only)
     except NotReadable:
         return None
 
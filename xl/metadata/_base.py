@@ -28,6 +28,7 @@ from collections import namedtuple
 import copy
 
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -91,17 +92,25 @@ class BaseFormat(object):
 
         cls.ignore_tags = set(disk_tags)
 
-    def __init__(self, loc):
+    def __init__(self, loc, header_only=False):
         """
             Raises :class:`NotReadable` if the file cannot be
             opened for some reason.
 
             :param loc: absolute path to the file to read
                 (note - this may change to accept gio uris in the future)
+            :param header_only: if True, large tags such as covers and
+                lyrics are not loaded from the file until they are read,
+                which makes :meth:`read_all` faster. The keys of these
+                tags may be missing from :meth:`get_keys_disk`.
         """
         self.loc = loc
         self.open = False
         self.mutagen = None
+        self.header_only = header_only
+        #: held while the object is in use, for objects shared between
+        #: threads such as the ones cached by tracks
+        self.lock = threading.RLock()
         try:
             self._reverse_mapping
         except AttributeError:
@@ -115,10 +124,30 @@ class BaseFormat(object):
         """
         if self.MutagenType:
             try:
-                self.mutagen = self.MutagenType(self.loc)
+                if self.header_only:
+                    self.mutagen = self._load_header()
+                else:
+                    self.mutagen = self.MutagenType(self.loc)
             except Exception:
                 raise NotReadable
 
+    def _load_header(self):
+        """
+            Returns the mutagen object used when only the header was
+            requested. Formats which can skip large tags override this,
+            the others load the whole file.
+        """
+        self.header_only = False
+        return self.MutagenType(self.loc)
+
+    def load_all(self):
+        """
+            Loads the tags skipped when only the header was loaded
+        """
+        if self.header_only:
+            self.header_only = False
+            self.load()
+
     def save(self):
         """
             Saves any changes to the tags.
@@ -191,6 +220,9 @@ class BaseFormat(object):
             :param tags: a list of exaile tag names to read
             :returns: a dictionary of tag/value pairs.
         """
+        if self.header_only and not self.ignore_tags.isdisjoint(tags):
+            self.load_all()
+
         raw = self._get_raw()
         td = {}
         for tag in tags:
@@ -247,6 +279,8 @@ class BaseFormat(object):
         if not self.MutagenType or not self.writable:
             raise NotWritable
         else:
+            # Tags which weren't loaded would be lost
+            self.load_all()
             tagdict = copy.deepcopy(tagdict)
             raw = self._get_raw()
             # Add tags if it doesn't have them.
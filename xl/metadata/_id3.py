@@ -27,6 +27,27 @@
 from xl.metadata._base import BaseFormat, CoverImage
 from mutagen import id3
 
+#: Frames not parsed when only the header is loaded: covers, lyrics and
+#: other frames which usually hold large payloads, also in ID3v2.2 form
+_HEADER_SKIPPED_FRAMES = {
+    'APIC',
+    'PIC',
+    'USLT',
+    'ULT',
+    'SYLT',
+    'SLT',
+    'GEOB',
+    'GEO',
+    'PRIV',
+}
+
+_HEADER_FRAMES = {
+    name: frame
+    for frames in (id3.Frames, id3.Frames_2_2)
+    for name, frame in frames.iteritems()
+    if name not in _HEADER_SKIPPED_FRAMES
+}
+
 
 class ID3Format(BaseFormat):
     MutagenType = id3.ID3
@@ -64,6 +85,13 @@ class ID3Format(BaseFormat):
     writable = True
     others = False  # make this true once custom tag support actually works
 
+    def _load_header(self):
+        raw = self.MutagenType(self.loc, known_frames=_HEADER_FRAMES)
+        # The skipped frames are kept unparsed, they aren't needed
+        if raw.tags is not None:
+            raw.tags.unknown_frames = []
+        return raw
+
     def get_keys_disk(self):
         keys = []
         for v in self._get_raw().values():
@@ -24,12 +24,39 @@
 # do so. If you do not wish to do so, delete this exception statement
 # from your version.
 
+import struct
+
 import xl.unicode
 from xl.metadata._base import CaseInsensitveBaseFormat, CoverImage
 from mutagen import flac
 from mutagen.flac import Picture
 
 
+class _SkippedPicture(Picture):
+    """
+        A picture block whose image data is skipped instead of read
+    """
+
+    def load(self, data):
+        self.type, length = struct.unpack('>2I', data.read(8))
+        self.mime = data.read(length).decode('UTF-8', 'replace')
+        (length,) = struct.unpack('>I', data.read(4))
+        self.desc = data.read(length).decode('UTF-8', 'replace')
+        (self.width, self.height, self.depth, self.colors, length) = struct.unpack(
+            '>5I', data.read(20)
+        )
+        data.seek(length, 1)
+
+
+class _HeaderFLAC(flac.FLAC):
+    """
+        Loads a FLAC file without the data of its pictures
+    """
+
+    METADATA_BLOCKS = list(flac.FLAC.METADATA_BLOCKS)
+    METADATA_BLOCKS[Picture.code] = _SkippedPicture
+
+
 class FlacFormat(CaseInsensitveBaseFormat):
     MutagenType = flac.FLAC
     tag_mapping = {
@@ -41,6 +68,9 @@ class FlacFormat(CaseInsensitveBaseFormat):
     writable = True
     case_sensitive = False
 
+    def _load_header(self):
+        return _HeaderFLAC(self.loc)
+
     def get_bitrate(self):
         return -1
 
@@ -28,6 +28,31 @@
 from xl.metadata._base import BaseFormat, CoverImage
 from mutagen import mp4
 
+#: Atoms not loaded when only the header is loaded: covers and lyrics
+_HEADER_SKIPPED_ATOMS = {'covr', '\xa9lyr'}
+
+
+class _HeaderMP4Tags(mp4.MP4Tags):
+    """
+        Loads the tags of an MP4 file, except for covers and lyrics
+    """
+
+    def load(self, atoms, fileobj):
+        try:
+            ilst = atoms.path('moov', 'udta', 'meta', 'ilst')[-1]
+        except KeyError:
+            pass  # reported by MP4Tags
+        else:
+            ilst.children = [
+                atom for atom in ilst.children if atom.name not in _HEADER_SKIPPED_ATOMS
+            ]
+
+        mp4.MP4Tags.load(self, atoms, fileobj)
+
+
+class _HeaderMP4(mp4.MP4):
+    MP4Tags = _HeaderMP4Tags
+
 
 class MP4Format(BaseFormat):
     MutagenType = mp4.MP4
@@ -56,6 +81,9 @@ class MP4Format(BaseFormat):
     others = False
     writable = True
 
+    def _load_header(self):
+        return _HeaderMP4(self.loc)
+
     def _get_tag(self, f, name):
         if name not in f:
             return []
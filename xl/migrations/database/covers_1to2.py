@@ -28,7 +28,6 @@
 __all__ = ['migrate']
 
 import logging
-import os
 
 from gi.repository import Gio
 
@@ -69,8 +68,6 @@ def migrate():
         return
     logger.info("Upgrading covers.db to version 2")
 
-    valid_cachefiles = set()
-
     old_db = man.db
     new_db = {'version': 2}
     for coll in xl.collection.COLLECTIONS:
@@ -80,11 +77,6 @@ def migrate():
             if value:
                 new_key = man._get_track_key(tr)
                 new_db[new_key] = value
-                if value.startswith('cache:'):
-                    valid_cachefiles.add(value[6:])
     man.db = new_db
     man.save()
-
-    cachedir = os.path.join(man.location, 'cache')
-    for cachefile in frozenset(os.listdir(cachedir)) - valid_cachefiles:
-        os.remove(os.path.join(cachedir, cachefile))
+    man.remove_unused_cache()
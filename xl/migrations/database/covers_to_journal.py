@@ -0,0 +1,114 @@
+# Copyright (C) 2008-2010 Adam Olsen
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# The developers of the Exaile media player hereby grant permission
+# for non-GPL compatible GStreamer and Exaile plugins to be used and
+# distributed together with GStreamer and Exaile. This permission is
+# above and beyond the permissions granted by the GPL license by which
+# Exaile is covered. If you modify this code, you may extend this
+# exception to your version of the code, but you are not obligated to
+# do so. If you do not wish to do so, delete this exception statement
+# from your version.
+
+import logging
+import os
+import shutil
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from xl import common
+
+logger = logging.getLogger(__name__)
+
+
+def _get_paths(path):
+    """
+        Returns the paths of the pickled db, in the order they are tried
+    """
+    return [path, path + ".old", path + ".new"]
+
+
+def needs_migration(path):
+    """
+        Checks whether there is a pickled covers.db at path that has to be
+        converted
+    """
+    if os.path.exists(path):
+        return not common.is_journal(path)
+    return any(os.path.exists(loc) for loc in _get_paths(path))
+
+
+def read_pickle(path):
+    """
+        Reads a pickled covers.db, as saved by Exaile 4.0 and earlier,
+        falling back to the files left behind by an interrupted save.
+
+        :returns: the db dict or None if there is none
+    """
+    data = None
+    for loc in _get_paths(path):
+        try:
+            with open(loc, 'rb') as f:
+                data = pickle.load(f)
+        except IOError:
+            pass
+        except EOFError:
+            try:
+                os.remove(loc)
+            except Exception:
+                pass
+        if data:
+            break
+    return data
+
+
+def migrate(path, db=None):
+    """
+        Converts the pickled covers.db at path to a journal. A copy of
+        the pickle is kept as path-pickle.bak
+
+        :param db: the contents of the db, if they have been read already
+    """
+    logger.info("Converting %s to a journal", path)
+    if db is None:
+        db = read_pickle(path) or {}
+    tmp_path = path + os.extsep + 'tmp'
+    bak_path = path + '-pickle.bak'
+
+    try:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        journal = common.Journal(tmp_path)
+        for k, v in db.iteritems():
+            journal[k] = v
+        journal.close()
+
+        if os.path.exists(path):
+            shutil.copyfile(path, bak_path)
+        common.replace_file(tmp_path, path)
+    except Exception:
+        logger.warning("%s may be corrupt", path)
+        try:
+            os.unlink(tmp_path)
+        except Exception:
+            pass
+        raise
+
+    logger.info("Migration successfully completed!")
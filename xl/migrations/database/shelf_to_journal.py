@@ -0,0 +1,81 @@
+# Copyright (C) 2008-2010 Adam Olsen
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# The developers of the Exaile media player hereby grant permission
+# for non-GPL compatible GStreamer and Exaile plugins to be used and
+# distributed together with GStreamer and Exaile. This permission is
+# above and beyond the permissions granted by the GPL license by which
+# Exaile is covered. If you modify this code, you may extend this
+# exception to your version of the code, but you are not obligated to
+# do so. If you do not wish to do so, delete this exception statement
+# from your version.
+
+import logging
+import os
+import shutil
+from whichdb import whichdb
+
+from xl import common
+
+logger = logging.getLogger(__name__)
+
+
+def needs_migration(path):
+    """
+        Checks whether there is a shelf at path that has to be converted
+    """
+    if os.path.exists(path):
+        return os.path.getsize(path) > 0 and not common.is_journal(path)
+    # some dbm modules store the data in files with other names
+    return whichdb(path) is not None
+
+
+def migrate(path):
+    """
+        Converts the shelf at path to a journal. A copy of the shelf is
+        kept as path-shelf.bak
+    """
+    logger.info("Converting %s to a journal", path)
+    tmp_path = path + os.extsep + 'tmp'
+    bak_path = path + '-shelf.bak'
+
+    try:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        old_shelf = common.open_shelf(path)
+        try:
+            journal = common.Journal(tmp_path)
+            for k, v in old_shelf.iteritems():
+                journal[k] = v
+            journal.close()
+        finally:
+            old_shelf.close()
+
+        # shelves made by dbm modules that store the data in other files
+        # are left where they are
+        if os.path.exists(path):
+            shutil.copyfile(path, bak_path)
+        common.replace_file(tmp_path, path)
+    except Exception:
+        logger.warning("%s may be corrupt", path)
+        try:
+            os.unlink(tmp_path)
+        except Exception:
+            pass
+        raise
+
+    logger.info("Migration successfully completed!")
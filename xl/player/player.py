@@ -80,7 +80,7 @@ class ExailePlayer(object):
         self._setup_engine(disable_autoswitch)
 
         event.add_callback(self._on_track_end, 'playback_track_end', self)
-        event.add_callback(self._on_track_tags_changed, 'track_tags_changed')
+        event.add_callback(self._on_track_tags_changed, 'track_tags_changed_batch')
 
     def _setup_engine(self, disable_autoswitch):
 
@@ -119,9 +119,10 @@ class ExailePlayer(object):
         track.set_tags(__playcount=i + 1, __last_played=time.time())
 
     @common.idle_add()
-    def _on_track_tags_changed(self, eventtype, track, tags):
-        if '__stopoffset' in tags:
-            self._engine.on_track_stopoffset_changed(track)
+    def _on_track_tags_changed(self, eventtype, obj, changes):
+        for track, tags in changes.iteritems():
+            if '__stopoffset' in tags:
+                self._engine.on_track_stopoffset_changed(track)
 
     def destroy(self):
         """
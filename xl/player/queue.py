@@ -139,6 +139,37 @@ class PlayQueue(playlist.Playlist):
         else:
             return None
 
+    def get_upcoming(self, count):
+        '''
+            Retrieves the tracks that are likely to be played next, such
+            as for prefetching their data. Unlike get_next, this does
+            not take the repeat modes into account, and only the first
+            track of a shuffled playlist is known.
+
+            :param count: the maximum number of tracks to return
+            :returns: a list of up to count tracks
+            :rtype: list of :class:`xl.trax.Track`
+        '''
+        tracks = []
+        if self.__queue_has_tracks and len(self):
+            if self.__remove_item_on_playback:
+                start = 0
+            else:
+                start = self.current_position + 1
+            tracks.extend(self[start : start + count])
+
+        current_playlist = self.current_playlist
+        if len(tracks) < count and current_playlist is not self:
+            next = current_playlist.get_next()
+            if next is not None:
+                tracks.append(next)
+                if current_playlist.shuffle_mode == 'disabled':
+                    start = current_playlist.current_position + 2
+                    end = start + count - len(tracks)
+                    tracks.extend(current_playlist[start:end])
+
+        return tracks[:count]
+
     def next(self, autoplay=True, track=None):
         """
             Goes to the next track, either in the queue, or in the current
@@ -36,8 +36,10 @@ from collections import deque, namedtuple
 from datetime import datetime, timedelta
 import logging
 import os
+import Queue
 import random
 import re
+import threading
 import time
 import urlparse
 import urllib
@@ -54,6 +56,14 @@ from xl.metadata.tags import tag_data
 
 logger = logging.getLogger(__name__)
 
+#: Number of seconds to wait before reading the tags of tracks that were
+#: loaded from their saved metadata, so that startup isn't slowed down
+_REFRESH_DELAY = 10
+#: Number of tracks whose tag changes are announced at once while refreshing
+_REFRESH_BATCH_SIZE = 50
+#: Number of seconds to pause after reading the tags of each track
+_REFRESH_PAUSE = 0.01
+
 
 class InvalidPlaylistTypeError(Exception):
     pass
@@ -893,6 +903,53 @@ class XSPFConverter(FormatConverter):
 providers.register('playlist-format-converter', XSPFConverter())
 
 
+class _TrackRefresher(object):
+    """
+        Reads the tags of tracks in a background thread, one at a time and
+        with pauses in between, so that it doesn't compete with the UI
+    """
+
+    def __init__(self):
+        self.queue = Queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def add(self, tracks):
+        """
+            Queues tracks to have their tags read
+        """
+        for track in tracks:
+            self.queue.put(track)
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self._run, name='PlaylistTrackRefresher'
+                )
+                self.thread.daemon = True
+                self.thread.start()
+
+    def _run(self):
+        time.sleep(_REFRESH_DELAY)
+        while True:
+            tracks = [self.queue.get()]
+            try:
+                while len(tracks) < _REFRESH_BATCH_SIZE:
+                    tracks.append(self.queue.get_nowait())
+            except Queue.Empty:
+                pass
+
+            with event.batch():
+                for track in tracks:
+                    try:
+                        track.read_tags()
+                    except Exception:
+                        logger.exception("Error reading %s", track.get_loc_for_io())
+                    time.sleep(_REFRESH_PAUSE)
+
+
+_REFRESHER = _TrackRefresher()
+
+
 class Playlist(object):
     # TODO: how do we document events in sphinx?
     """
@@ -1528,6 +1585,8 @@ class Playlist(object):
         f.close()
 
         trs = []
+        refresh = []
+        lazy = settings.get_option('playlist/lazy_load', True)
 
         for loc in locs:
             meta = None
@@ -1537,19 +1596,32 @@ class Playlist(object):
                 meta = splitted[-1]
 
             track = None
-            track = trax.Track(uri=loc)
+            if lazy:
+                track = trax.Track._get_existing(loc)
+                if track is None:
+                    track = trax.Track(uri=loc, scan=False)
+                    if track.is_local():
+                        # start with the saved metadata, the file is read
+                        # later on by _REFRESHER
+                        refresh.append(track)
+                        if meta is not None:
+                            self.__set_saved_meta(track, meta)
+                    else:
+                        track.read_tags(notify_changed=False)
+            else:
+                track = trax.Track(uri=loc)
 
             # readd meta
             if not track:
                 continue
             if not track.is_local() and meta is not None:
-                meta = cgi.parse_qs(meta)
-                for k, v in meta.iteritems():
-                    track.set_tag_raw(k, v[0].decode('utf-8'), notify_changed=False)
+                self.__set_saved_meta(track, meta)
 
             trs.append(track)
 
         self.__tracks[:] = trs
+        if refresh:
+            _REFRESHER.add(refresh)
 
         for item, val in items.iteritems():
             if item in self.save_attrs:
@@ -1562,6 +1634,14 @@ class Playlist(object):
                         val,
                     )
 
+    def __set_saved_meta(self, track, meta):
+        """
+            Sets the tags of a track from the metadata saved with it
+        """
+        meta = cgi.parse_qs(meta)
+        for k, v in meta.iteritems():
+            track.set_tag_raw(k, v[0].decode('utf-8'), notify_changed=False)
+
     def reverse(self):
         # reverses current view
         pass
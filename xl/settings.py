@@ -29,9 +29,12 @@
 """
 
 from ConfigParser import RawConfigParser, NoSectionError, NoOptionError
+from copy import deepcopy
 import logging
 import os
 import sys
+import threading
+import weakref
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +54,26 @@ TYPE_MAPPING = {
 
 MANAGER = None
 
+#: Stands for options which are not set in the cache of parsed values
+_UNSET = object()
+
+
+class OptionValue(object):
+    """
+        Holds the current value of an option, updated whenever the
+        option is changed. See :meth:`SettingsManager.subscribe_option`
+    """
+
+    __slots__ = ['option', 'default', 'value', '__weakref__']
+
+    def __init__(self, option, default, value):
+        self.option = option
+        self.default = default
+        self.value = value
+
+    def __repr__(self):
+        return 'OptionValue(%r, %r)' % (self.option, self.value)
+
 
 class SettingsManager(RawConfigParser):
     """
@@ -75,6 +98,10 @@ class SettingsManager(RawConfigParser):
         RawConfigParser.__init__(self)
 
         self.location = location
+        # Parsed values of options, by option path
+        self._option_cache = {}
+        self._option_lock = threading.RLock()
+        self._subscriptions = {}
         self._saving = False
         self._dirty = False
 
@@ -142,11 +169,14 @@ class SettingsManager(RawConfigParser):
         splitvals = option.split('/')
         section, key = "/".join(splitvals[:-1]), splitvals[-1]
 
-        try:
-            self.set(section, key, value)
-        except NoSectionError:
-            self.add_section(section)
-            self.set(section, key, value)
+        with self._option_lock:
+            try:
+                self.set(section, key, value)
+            except NoSectionError:
+                self.add_section(section)
+                self.set(section, key, value)
+
+            self._update_option(option)
 
         self._dirty = True
 
@@ -170,16 +200,70 @@ class SettingsManager(RawConfigParser):
             :returns: the option value or *default*
             :rtype: any
         """
+        try:
+            value = self._option_cache[option]
+        except KeyError:
+            value = self._update_option(option)
+
+        if value is _UNSET:
+            return default
+
+        # Don't let callers modify the cached lists and dictionaries
+        if isinstance(value, (list, dict)):
+            return deepcopy(value)
+
+        return value
+
+    def subscribe_option(self, option, default=None):
+        """
+            Returns an object whose ``value`` attribute always holds the
+            current value of an option, or *default* if the option is not
+            set. Reading the attribute is cheaper than calling
+            :meth:`get_option`, which makes it suited for hot code paths.
+
+            The value is updated when the option is changed, as long as
+            the returned object is referenced. Lists and dictionaries
+            must not be modified.
+
+            :param option: the full path to an option
+            :type option: string
+            :param default: a default value to use as fallback
+            :type default: any
+            :rtype: :class:`OptionValue`
+        """
+        subscription = OptionValue(option, default, default)
+
+        with self._option_lock:
+            self._subscriptions.setdefault(option, weakref.WeakSet()).add(
+                subscription
+            )
+            self._update_option(option)
+
+        return subscription
+
+    def _update_option(self, option):
+        """
+            Parses the current value of an option into the cache and
+            the subscriptions to it
+
+            :returns: the parsed value, or _UNSET if the option isn't set
+        """
         splitvals = option.split('/')
         section, key = "/".join(splitvals[:-1]), splitvals[-1]
 
-        try:
-            value = self.get(section, key)
-            value = self._str_to_val(value)
-        except NoSectionError:
-            value = default
-        except NoOptionError:
-            value = default
+        with self._option_lock:
+            try:
+                value = self._str_to_val(self.get(section, key))
+            except (NoSectionError, NoOptionError):
+                value = _UNSET
+
+            self._option_cache[option] = value
+
+            for subscription in self._subscriptions.get(option, ()):
+                if value is _UNSET:
+                    subscription.value = subscription.default
+                else:
+                    subscription.value = value
 
         return value
 
@@ -209,7 +293,9 @@ class SettingsManager(RawConfigParser):
         splitvals = option.split('/')
         section, key = "/".join(splitvals[:-1]), splitvals[-1]
 
-        RawConfigParser.remove_option(self, section, key)
+        with self._option_lock:
+            RawConfigParser.remove_option(self, section, key)
+            self._update_option(option)
 
     def _set_direct(self, option, value):
         """
@@ -224,11 +310,14 @@ class SettingsManager(RawConfigParser):
         splitvals = option.split('/')
         section, key = "/".join(splitvals[:-1]), splitvals[-1]
 
-        try:
-            self.set(section, key, value)
-        except NoSectionError:
-            self.add_section(section)
-            self.set(section, key, value)
+        with self._option_lock:
+            try:
+                self.set(section, key, value)
+            except NoSectionError:
+                self.add_section(section)
+                self.set(section, key, value)
+
+            self._update_option(option)
 
         event.log_event('option_set', self, option)
 
@@ -349,5 +438,6 @@ MANAGER = SettingsManager(
 
 get_option = MANAGER.get_option
 set_option = MANAGER.set_option
+subscribe_option = MANAGER.subscribe_option
 
 # vim: et sts=4 sw=4
@@ -41,6 +41,7 @@ from xl.trax.search import (
     TracksInList,
     TracksNotInList,
     match_track_from_string,
+    clear_search_cache,
 )
 from xl.trax.util import (
     is_valid_track,
@@ -49,5 +50,6 @@ from xl.trax.util import (
     get_tracks_from_uri,
     sort_tracks,
     sort_result_tracks,
+    SortKeyCache,
     get_rating_from_tracks,
 )
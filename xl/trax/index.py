@@ -0,0 +1,321 @@
+# Copyright (C) 2008-2010 Adam Olsen
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+#
+# The developers of the Exaile media player hereby grant permission
+# for non-GPL compatible GStreamer and Exaile plugins to be used and
+# distributed together with GStreamer and Exaile. This permission is
+# above and beyond the permissions granted by the GPL license by which
+# Exaile is covered. If you modify this code, you may extend this
+# exception to your version of the code, but you are not obligated to
+# do so. If you do not wish to do so, delete this exception statement
+# from your version.
+
+
+"""
+    Inverted tag index used to narrow down searches on a TrackDB
+"""
+
+import logging
+import threading
+
+from xl.trax.track import SUMMARY_TAGS
+from xl.unicode import shave_marks
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['TagIndex']
+
+# Tags that Track.get_tag_search computes or transforms before handing
+# them to the search system, so their raw values can't be indexed. Tags
+# mapped to another tag are looked up under that tag instead.
+_UNINDEXABLE_TAGS = frozenset(
+    (
+        'tracknumber',
+        'discnumber',
+        '__length',
+        '__playcount',
+        '__rating',
+        '__startoffset',
+        '__stopoffset',
+        '__bitrate',
+        '__basename',
+    )
+)
+
+_TAG_ALIASES = {'albumartist': 'artist'}
+
+
+def normalize(value):
+    """
+        Returns the form of a tag value that is stored in the index,
+        which is the case-insensitive form used by the search system.
+    """
+    return shave_marks(value).lower()
+
+
+class TagIndex(object):
+    """
+        Keeps an inverted index of (tag, normalized value) to the set of
+        tracks having that value, so that search matchers can be
+        resolved to a set of candidate tracks without looking at every
+        track in a :class:`xl.trax.TrackDB`.
+
+        Lookups return a superset of the tracks that would actually
+        match, so callers must still run the matchers on the candidates.
+        Lookups return None when the index can't answer for a tag.
+
+        Only the values of non-internal tags are indexed. For internal
+        tags only their presence is tracked, which is what the
+        ``tag==__null__`` queries need.
+
+        Tracks of which only the summary tags have been loaded (see
+        :data:`xl.trax.track.SUMMARY_TAGS`) are indexed by those tags, and
+        are candidates for lookups on any other tag.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # tag -> normalized value -> set of tracks
+        self._values = {}
+        # tag -> set of tracks that have the tag
+        self._present = {}
+        # track -> tag -> tuple of normalized values, needed for removal
+        self._entries = {}
+        # tracks that have values that could not be normalized. These
+        # are always returned as candidates.
+        self._unindexed = set()
+        # tracks that are only indexed by their summary tags
+        self._partial = set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, track):
+        return track in self._entries
+
+    @staticmethod
+    def is_indexed(tag):
+        """
+            Returns whether lookups on the given tag can be answered
+        """
+        return tag not in _UNINDEXABLE_TAGS
+
+    def add(self, track):
+        """
+            Adds a track to the index
+
+            :param track: The :class:`xl.trax.Track` to add
+        """
+        with self._lock:
+            if track in self._entries:
+                self._remove(track)
+            self._add(track)
+
+    def add_tracks(self, tracks):
+        """
+            Like add(), but takes a list of :class:`xl.trax.Track`
+        """
+        with self._lock:
+            for track in tracks:
+                if track in self._entries:
+                    self._remove(track)
+                self._add(track)
+
+    def remove(self, track):
+        """
+            Removes a track from the index
+
+            :param track: The :class:`xl.trax.Track` to remove
+        """
+        with self._lock:
+            self._remove(track)
+
+    def remove_tracks(self, tracks):
+        """
+            Like remove(), but takes a list of :class:`xl.trax.Track`
+        """
+        with self._lock:
+            for track in tracks:
+                self._remove(track)
+
+    def update(self, track, tags):
+        """
+            Reindexes the given tags of a track. Does nothing if the
+            track is not in the index.
+
+            :param track: The :class:`xl.trax.Track` that changed
+            :param tags: The names of the tags that changed
+        """
+        with self._lock:
+            entries = self._entries.get(track)
+            if entries is None:
+                return
+            if track in self._partial and not track._is_partial():
+                # all of the tags have been loaded since
+                self._remove(track)
+                self._add(track)
+                return
+            for tag in tags:
+                if not self.is_indexed(tag):
+                    continue
+                self._unindex_tag(track, tag, entries.pop(tag, None))
+                self._index_tag(track, tag, entries)
+
+    def clear(self):
+        """
+            Removes all tracks from the index
+        """
+        with self._lock:
+            self._values = {}
+            self._present = {}
+            self._entries = {}
+            self._unindexed = set()
+            self._partial = set()
+
+    def _add(self, track):
+        entries = self._entries[track] = {}
+        if track._is_partial():
+            self._partial.add(track)
+            tags = SUMMARY_TAGS
+        else:
+            tags = track.list_tags()
+        for tag in tags:
+            if self.is_indexed(tag):
+                self._index_tag(track, tag, entries)
+
+    def _remove(self, track):
+        entries = self._entries.pop(track, None)
+        if entries is None:
+            return
+        for tag, values in entries.iteritems():
+            self._unindex_tag(track, tag, values)
+        self._unindexed.discard(track)
+        self._partial.discard(track)
+
+    def _index_tag(self, track, tag, entries):
+        value = track.get_tag_raw(tag)
+        if value is None or (tag.startswith('__') and value == u'__null__'):
+            return
+
+        self._present.setdefault(tag, set()).add(track)
+
+        if tag.startswith('__'):
+            entries[tag] = ()
+            return
+
+        if not isinstance(value, list):
+            value = [value]
+        try:
+            values = tuple({normalize(v) for v in value})
+        except Exception:
+            logger.debug("Cannot index %s of %s", tag, track, exc_info=True)
+            self._unindexed.add(track)
+            values = ()
+
+        by_value = self._values.setdefault(tag, {})
+        for v in values:
+            by_value.setdefault(v, set()).add(track)
+        entries[tag] = values
+
+    def _unindex_tag(self, track, tag, values):
+        if values is None:
+            return
+
+        present = self._present.get(tag)
+        if present is not None:
+            present.discard(track)
+            if not present:
+                del self._present[tag]
+
+        by_value = self._values.get(tag)
+        if by_value is None:
+            return
+        for v in values:
+            tracks = by_value.get(v)
+            if tracks is not None:
+                tracks.discard(track)
+                if not tracks:
+                    del by_value[v]
+        if not by_value:
+            del self._values[tag]
+
+    def _lookup_tag(self, tag):
+        tag = _TAG_ALIASES.get(tag, tag)
+        if not self.is_indexed(tag):
+            return None
+        return tag
+
+    def lookup_exact(self, tag, value):
+        """
+            Returns the tracks that may have a value of the tag that is
+            equal to *value*, or None if the tag is not indexed.
+        """
+        tag = self._lookup_tag(tag)
+        if tag is None or tag.startswith('__'):
+            return None
+        try:
+            value = normalize(value)
+        except Exception:
+            return None
+        with self._lock:
+            result = set(self._values.get(tag, {}).get(value, ()))
+            result |= self._unindexed
+            if tag not in SUMMARY_TAGS:
+                result |= self._partial
+        return result
+
+    def lookup_substring(self, tag, value):
+        """
+            Returns the tracks that may have a value of the tag that
+            contains *value*, or None if the tag is not indexed.
+
+            This checks each distinct value of the tag rather than each
+            track, which is much cheaper for tags like artist or album.
+        """
+        tag = self._lookup_tag(tag)
+        if tag is None or tag.startswith('__'):
+            return None
+        try:
+            value = normalize(value)
+        except Exception:
+            return None
+        result = set()
+        with self._lock:
+            for v, tracks in self._values.get(tag, {}).iteritems():
+                if value in v:
+                    result |= tracks
+            result |= self._unindexed
+            if tag not in SUMMARY_TAGS:
+                result |= self._partial
+        return result
+
+    def lookup_null(self, tag):
+        """
+            Returns the tracks that don't have the tag set, or None if
+            the tag is not indexed.
+        """
+        tag = self._lookup_tag(tag)
+        if tag is None:
+            return None
+        with self._lock:
+            result = set(self._entries)
+            result.difference_update(self._present.get(tag, ()))
+            result |= self._unindexed
+        return result
+
+
+# vim: et sts=4 sw=4
@@ -24,13 +24,19 @@
 # do so. If you do not wish to do so, delete this exception statement
 # from your version.
 
+import threading
 import time
 import re
 
+from xl import common
+from xl.trax.track import Track
 from xl.unicode import shave_marks
 
 __all__ = ['TracksMatcher', 'search_tracks']
 
+#: The number of compiled search strings kept by TracksMatcher
+_COMPILED_CACHE_SIZE = 128
+
 
 class SearchResultTrack(object):
     """
@@ -39,11 +45,56 @@ class SearchResultTrack(object):
         :param track: The Track object
     """
 
-    __slots__ = ['track', 'on_tags']
+    __slots__ = ['track', 'on_tags', '_values']
 
     def __init__(self, track):
         self.track = track
         self.on_tags = []
+        # tag values looked up while a TracksMatcher is matching the
+        # track, so that each tag is only looked up once
+        self._values = None
+
+
+def _lower(value):
+    return value.lower()
+
+
+def _identity(value):
+    return value
+
+
+def _get_values(srtrack, tag, lower):
+    """
+        Returns the search values of a tag of the track of a
+        SearchResultTrack, as a list that is converted by lower
+    """
+    cache = getattr(srtrack, '_values', None)
+    if cache is not None:
+        try:
+            return cache[(tag, lower)]
+        except KeyError:
+            pass
+
+    # tracks keep the values of the common conversions themselves
+    if lower is _lower:
+        vals = srtrack.track._get_search_values(tag, True)
+    elif lower is _identity:
+        vals = srtrack.track._get_search_values(tag)
+    else:
+        vals = _convert_values(srtrack, tag, lower)
+
+    if cache is not None:
+        cache[(tag, lower)] = vals
+    return vals
+
+
+def _convert_values(srtrack, tag, lower):
+    vals = srtrack.track.get_tag_search(tag, format=False)
+    if vals == '__null__':
+        vals = None
+    if not isinstance(vals, list):
+        vals = [vals]
+    return [lower(item) if item is not None else None for item in vals]
 
 
 class _Matcher(object):
@@ -61,16 +112,7 @@ class _Matcher(object):
         self.lower = lower
 
     def match(self, srtrack):
-        vals = srtrack.track.get_tag_search(self.tag, format=False)
-        if vals == '__null__':
-            vals = None
-        if not isinstance(vals, list):
-            vals = [vals]
-
-        for item in vals:
-            if item is not None:
-                item = self.lower(item)
-
+        for item in _get_values(srtrack, self.tag, self.lower):
             if self._matches(item):
                 return True
         return False
@@ -78,6 +120,16 @@ class _Matcher(object):
     def _matches(self, value):
         raise NotImplementedError
 
+    def candidates(self, index):
+        """
+            Returns a set of tracks that is guaranteed to contain all
+            tracks matched by this condition, or None if the index can't
+            narrow them down.
+
+            :param index: a :class:`xl.trax.index.TagIndex`
+        """
+        return None
+
 
 class _ExactMatcher(_Matcher):
     """
@@ -98,6 +150,11 @@ class _ExactMatcher(_Matcher):
             newcontent = self.content
         return newvalue == newcontent
 
+    def candidates(self, index):
+        if self.content is None:
+            return index.lookup_null(self.tag)
+        return index.lookup_exact(self.tag, self.content)
+
 
 class _InMatcher(_Matcher):
     """
@@ -112,6 +169,11 @@ class _InMatcher(_Matcher):
         except TypeError:
             return False
 
+    def candidates(self, index):
+        if not isinstance(self.content, basestring):
+            return None
+        return index.lookup_substring(self.tag, self.content)
+
 
 class _RegexMatcher(_Matcher):
     """
@@ -176,6 +238,9 @@ class _NotMetaMatcher(object):
     def match(self, srtrack):
         return not self.matcher.match(srtrack)
 
+    def candidates(self, index):
+        return None
+
 
 class _OrMetaMatcher(object):
     """
@@ -191,6 +256,9 @@ class _OrMetaMatcher(object):
     def match(self, srtrack):
         return self.left.match(srtrack) or self.right.match(srtrack)
 
+    def candidates(self, index):
+        return _union_candidates([self.left, self.right], index)
+
 
 class _MultiMetaMatcher(object):
     """
@@ -209,6 +277,9 @@ class _MultiMetaMatcher(object):
                 return False
         return True
 
+    def candidates(self, index):
+        return _intersect_candidates(self.matchers, index)
+
 
 class _ManyMultiMetaMatcher(object):
     """
@@ -239,6 +310,16 @@ class _ManyMultiMetaMatcher(object):
                     self.tags.update(ma.tags)
         return matched
 
+    def candidates(self, index):
+        return _union_candidates(self.matchers, index)
+
+    def copy(self):
+        """
+            Returns a matcher for the same conditions, which keeps track
+            of its own matched tags
+        """
+        return _ManyMultiMetaMatcher(self.matchers)
+
 
 class TracksMatcher(object):
     """
@@ -247,6 +328,9 @@ class TracksMatcher(object):
     """
 
     __slots__ = ['matchers', 'case_sensitive', 'keyword_tags']
+    # compiled matchers by search string, case_sensitive and keyword_tags
+    __compiled = common.LimitedCache(_COMPILED_CACHE_SIZE)
+    __compiled_lock = threading.Lock()
 
     def __init__(self, search_string, case_sensitive=True, keyword_tags=None):
         """
@@ -258,11 +342,25 @@ class TracksMatcher(object):
         """
         self.case_sensitive = case_sensitive
         self.keyword_tags = keyword_tags or []
-        search_string = shave_marks(search_string)
-        tokens = self.__tokenize_query(search_string)
-        tokens = self.__red(tokens)
-        tokens = self.__optimize_tokens(tokens)
-        self.matchers = self.__tokens_to_matchers(tokens)
+
+        # Compiled matchers don't change, so they are shared by all
+        # TracksMatchers of the same search. Only the matched tags of
+        # _ManyMultiMetaMatchers are kept in the matcher itself.
+        key = (search_string, case_sensitive, tuple(self.keyword_tags))
+        with self.__compiled_lock:
+            matchers = self.__compiled.get(key)
+        if matchers is None:
+            search_string = shave_marks(search_string)
+            tokens = self.__tokenize_query(search_string)
+            tokens = self.__red(tokens)
+            tokens = self.__optimize_tokens(tokens)
+            matchers = self.__tokens_to_matchers(tokens)
+            with self.__compiled_lock:
+                self.__compiled[key] = matchers
+
+        self.matchers = [
+            ma.copy() if type(ma) is _ManyMultiMetaMatcher else ma for ma in matchers
+        ]
 
     def append_matcher(self, matcher, or_match=False):
         '''Here so you can use playlist matchers. Probably needs better impl'''
@@ -283,19 +381,37 @@ class TracksMatcher(object):
             Determine whether a given SearchResultTrack's internal
             Track object matches this search condition.
         """
-        for ma in self.matchers:
-            if not ma.match(srtrack):
-                break
-            if ma.tag is not None:
-                if ma.tag not in srtrack.on_tags:
-                    srtrack.on_tags.append(ma.tag)
-            elif hasattr(ma, 'tags'):
-                for t in ma.tags:
-                    if t not in srtrack.on_tags:
-                        srtrack.on_tags.append(t)
-        else:
-            return True
-        return False
+        own_values = srtrack._values is None
+        if own_values:
+            srtrack._values = {}
+        try:
+            for ma in self.matchers:
+                if not ma.match(srtrack):
+                    break
+                if ma.tag is not None:
+                    if ma.tag not in srtrack.on_tags:
+                        srtrack.on_tags.append(ma.tag)
+                elif hasattr(ma, 'tags'):
+                    for t in ma.tags:
+                        if t not in srtrack.on_tags:
+                            srtrack.on_tags.append(t)
+            else:
+                return True
+            return False
+        finally:
+            # the tags of the track may change before the next match
+            if own_values:
+                srtrack._values = None
+
+    def candidates(self, index):
+        """
+            Returns a set of tracks that is guaranteed to contain all
+            tracks matched by this TracksMatcher, or None if the index
+            can't narrow them down.
+
+            :param index: a :class:`xl.trax.index.TagIndex`
+        """
+        return _intersect_candidates(self.matchers, index)
 
     def __tokens_to_matchers(self, tokens, matchers=None):
         """
@@ -339,9 +455,9 @@ class TracksMatcher(object):
         # normal token
         else:
             if not self.case_sensitive:
-                lower = lambda x: x.lower()
+                lower = _lower
             else:
-                lower = lambda x: x
+                lower = _identity
 
             # TODO: this stuff is kinda repetitive, can we consolidate
             # it? Maybe move some of this into the matcher classes?
@@ -513,6 +629,9 @@ class TracksInList(object):
     def match(self, track):
         return track.track in self._tracks
 
+    def candidates(self, index):
+        return set(self._tracks)
+
 
 class TracksNotInList(TracksInList):
     '''
@@ -522,14 +641,86 @@ class TracksNotInList(TracksInList):
     def match(self, track):
         return track.track not in self._tracks
 
+    def candidates(self, index):
+        return None
 
-def search_tracks(trackiter, trackmatchers):
+
+def _get_candidates(matcher, index):
+    try:
+        candidates = matcher.candidates
+    except AttributeError:
+        # matchers from elsewhere don't have to support indexes
+        return None
+    return candidates(index)
+
+
+def _intersect_candidates(matchers, index):
+    """
+        Candidates for matchers that must all match. Matchers that can't
+        be resolved by the index don't restrict the result.
+    """
+    result = None
+    for ma in matchers:
+        candidates = _get_candidates(ma, index)
+        if candidates is None:
+            continue
+        if result is None:
+            result = candidates
+        else:
+            result &= candidates
+        if not result:
+            break
+    return result
+
+
+def _union_candidates(matchers, index):
+    """
+        Candidates for matchers of which any may match. If any of the
+        matchers can't be resolved by the index, neither can the union.
+    """
+    result = set()
+    for ma in matchers:
+        candidates = _get_candidates(ma, index)
+        if candidates is None:
+            return None
+        result |= candidates
+    return result
+
+
+def search_tracks(trackiter, trackmatchers, index=None):
     """
         Search a set of tracks for those that match specified conditions.
 
-        :param trackiter: An iterable object returning Track objects
+        If an index is available, the matchers are first resolved to a set
+        of candidate tracks, and only those are checked one by one.
+
+        :param trackiter: An iterable object returning Track objects. If
+            it is a :class:`xl.trax.TrackDB`, its index is used.
         :param trackmatchers: A list of TrackMatcher objects
+        :param index: A :class:`xl.trax.index.TagIndex` containing every
+            track returned by *trackiter*, used to skip tracks that
+            cannot match.
     """
+    if index is None:
+        index = getattr(trackiter, 'tag_index', None)
+        owned = True
+    else:
+        owned = False
+
+    if index is not None:
+        candidates = _intersect_candidates(trackmatchers, index)
+        if candidates is not None:
+            if owned:
+                # the index covers exactly the tracks of trackiter, so
+                # there's no need to look at the others at all
+                trackiter = [tr for tr in candidates if tr in index]
+            else:
+                trackiter = (
+                    tr
+                    for tr in trackiter
+                    if getattr(tr, 'track', tr) in candidates
+                )
+
     for srtr in trackiter:
         if not isinstance(srtr, SearchResultTrack):
             srtr = SearchResultTrack(srtr)
@@ -549,7 +740,7 @@ def search_tracks(trackiter, trackmatchers):
 
 
 def search_tracks_from_string(
-    trackiter, search_string, case_sensitive=True, keyword_tags=None
+    trackiter, search_string, case_sensitive=True, keyword_tags=None, index=None
 ):
     """
         Convenience wrapper around search_tracks that builds matchers
@@ -563,7 +754,15 @@ def search_tracks_from_string(
             search_string, case_sensitive=case_sensitive, keyword_tags=keyword_tags
         )
     ]
-    return search_tracks(trackiter, matchers)
+    return search_tracks(trackiter, matchers, index=index)
+
+
+def clear_search_cache():
+    """
+        Drops the tag values cached for searching tracks, such as once
+        a search filter is cleared, to free the memory they take up.
+    """
+    Track._clear_search_values()
 
 
 def match_track_from_string(
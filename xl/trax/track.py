@@ -25,14 +25,19 @@
 # do so. If you do not wish to do so, delete this exception statement
 # from your version.
 
+import collections
+import contextlib
 from copy import deepcopy
 from gi.repository import Gio
 from gi.repository import GLib
 import logging
+import os
+import threading
 import time
 import unicodedata
 import weakref
 import re
+import sys
 
 import xl.unicode
 from xl import event, metadata, settings
@@ -69,10 +74,217 @@ _no_set_raw = {'__basename', '__loc'} | disk_tags
 
 _unset = object()
 
+#: Tags that are stored separately by a TrackDB, so that it can load
+#: them without loading the other tags of its tracks. These are the tags
+#: commonly needed to display, sort and search the collection.
+SUMMARY_TAGS = frozenset(
+    (
+        '__basedir',
+        '__compilation',
+        '__date_added',
+        '__length',
+        '__loc',
+        '__modified',
+        '__playcount',
+        '__rating',
+        'album',
+        'albumartist',
+        'albumartistsort',
+        'albumsort',
+        'artist',
+        'artistsort',
+        'date',
+        'discnumber',
+        'genre',
+        'title',
+        'titlesort',
+        'tracknumber',
+    )
+)
+
+#: Tags whose values are usually shared by many tracks. Their values are
+#: interned so that tracks of the same artist or album share one string.
+_INTERNED_TAGS = frozenset(
+    (
+        '__basedir',
+        'album',
+        'albumartist',
+        'albumartistsort',
+        'artist',
+        'artistsort',
+        'composer',
+        'date',
+        'genre',
+        'performer',
+    )
+)
+
+#: Internal tags that are kept as numbers, even if they are set as strings
+_NUMERIC_TAGS = {
+    '__bitrate': int,
+    '__length': float,
+    '__modified': float,
+    '__playcount': int,
+}
+
+#: Minimum number of interned values above which unused ones are pruned
+_INTERNED_PRUNE_SIZE = 1024
+
+_interned_values = {}
+_interned_prune_size = _INTERNED_PRUNE_SIZE
+
+
+def _prune_interned_values():
+    """
+        Removes the interned values that are no longer used, and lets
+        the table grow to twice its remaining size before the next prune
+    """
+    global _interned_prune_size
+    for value in _interned_values.keys():
+        # referenced by the table as key and value, by the list of keys,
+        # by this loop and twice by the call to getrefcount
+        if sys.getrefcount(value) <= 6:
+            _interned_values.pop(value, None)
+    _interned_prune_size = max(2 * len(_interned_values), _INTERNED_PRUNE_SIZE)
+
+
+def _intern_value(value):
+    # str and unicode values can compare equal, so only unicode values
+    # share the table
+    if type(value) is unicode:
+        if len(_interned_values) >= _interned_prune_size:
+            _prune_interned_values()
+        return _interned_values.setdefault(value, value)
+    elif type(value) is str:
+        return intern(value)
+    return value
+
+
+def _compact_value(tag, value):
+    """
+        Returns the value of a tag in the layout that a Track keeps in
+        memory: single values of non-internal tags are stored without a
+        list, values of shared tags are interned and numeric internal tags
+        are stored as numbers.
+    """
+    if tag.startswith('__'):
+        convert = _NUMERIC_TAGS.get(tag)
+        if convert is not None and isinstance(value, basestring):
+            try:
+                return convert(value)
+            except ValueError:
+                pass
+        elif tag in _INTERNED_TAGS:
+            return _intern_value(value)
+        return value
+
+    if type(value) is not list:
+        return value
+    if tag in _INTERNED_TAGS:
+        value = [_intern_value(v) for v in value]
+    if len(value) == 1:
+        return value[0]
+    return list(value)
+
+
+def _compact_tags(tags):
+    """
+        Returns a copy of a tag dict in the layout that a Track keeps in
+        memory, see _compact_value
+    """
+    compact = {}
+    for tag, value in tags.iteritems():
+        if type(tag) is str:
+            tag = intern(tag)
+        if tag.startswith('__'):
+            value = deepcopy(value)
+        compact[tag] = _compact_value(tag, value)
+    return compact
+
+
+def _expand_value(tag, value):
+    """
+        Returns the value of a tag as returned by get_tag_raw, which is
+        always a list for non-internal tags
+    """
+    if value is None or type(value) is list or tag.startswith('__'):
+        return value
+    return [value]
+
+
+def _expand_tags(tags):
+    """
+        Returns a copy of a tag dict with all values as returned by
+        get_tag_raw, which is the layout that is stored in a TrackDB
+    """
+    return {
+        tag: deepcopy(_expand_value(tag, value)) for tag, value in tags.iteritems()
+    }
+
+
+_partial_tags_lock = threading.Lock()
+
+
+class _PartialTags(dict):
+    """
+        The tags of a Track that has been loaded lazily by a TrackDB.
+
+        At first only the tags in SUMMARY_TAGS are present. The first time
+        any other tag is looked up, the rest of the tags are loaded by
+        calling loader.
+    """
+
+    __slots__ = ['_loader']
+
+    def __init__(self, summary, loader):
+        dict.__init__(self, _compact_tags(summary))
+        self._loader = loader
+
+    def is_loaded(self):
+        return self._loader is None
+
+    def load(self):
+        if self._loader is None:
+            return
+        with _partial_tags_lock:
+            if self._loader is None:
+                return
+            try:
+                tags = _compact_tags(self._loader())
+            except Exception:
+                logger.exception(
+                    "Could not load the tags of %s", dict.get(self, '__loc')
+                )
+                tags = {}
+            # tags that are already present may have been changed since
+            for tag, value in tags.iteritems():
+                if not dict.__contains__(self, tag):
+                    dict.__setitem__(self, tag, value)
+            self._loader = None
+
+    def get(self, tag, default=None):
+        if self._loader is not None and tag not in SUMMARY_TAGS:
+            self.load()
+        return dict.get(self, tag, default)
+
+    def __getitem__(self, tag):
+        if self._loader is not None and tag not in SUMMARY_TAGS:
+            self.load()
+        return dict.__getitem__(self, tag)
+
+    def __contains__(self, tag):
+        if self._loader is not None and tag not in SUMMARY_TAGS:
+            self.load()
+        return dict.__contains__(self, tag)
+
 
 class _MetadataCacher(object):
     """
-        Cache metadata Format objects to speed up get_tag_disk
+        Cache metadata Format objects by location, to speed up reading
+        and writing the tags of a file several times in a row
+
+        The least recently used objects are dropped, as well as the ones
+        of files changed since they were loaded. This is thread-safe.
     """
 
     def __init__(self, timeout=10, maxentries=20):
@@ -80,52 +292,78 @@ class _MetadataCacher(object):
             :param timeout: time (in s) until the cached obj gets removed.
             :param maxentries: maximum number of format objs to cache
         """
-        self._cache = []
+        # loc: [formatobj, stat, last use], least recently used first
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
         self.timeout = timeout
         self.maxentries = maxentries
         self._cleanup_id = None
 
+    @staticmethod
+    def __get_stat(formatobj):
+        """
+            Returns the modification and status change times of the file,
+            the latter also changes with permissions
+        """
+        try:
+            stat = os.stat(formatobj.loc)
+        except (AttributeError, OSError):  # no file to check
+            return None
+        return stat.st_mtime, stat.st_ctime
+
     def __cleanup(self):
-        if self._cleanup_id:
-            GLib.source_remove(self._cleanup_id)
+        with self._lock:
             self._cleanup_id = None
-        current = time.time()
-        thresh = current - self.timeout
-        for item in self._cache[:]:
-            if item[2] < thresh:
-                self._cache.remove(item)
-        if self._cache:
-            next_expiry = min(i[2] for i in self._cache)
-            timeout = int((next_expiry + self.timeout) - current)
-            self._cleanup_id = GLib.timeout_add_seconds(timeout, self.__cleanup)
-
-    def add(self, trackobj, formatobj):
-        for item in self._cache:
-            if item[0] == trackobj:
-                return
-        item = [trackobj, formatobj, time.time()]
-        self._cache.append(item)
-        if len(self._cache) > self.maxentries:
-            least = min((i[2], i) for i in self._cache)[1]
-            self._cache.remove(least)
-        if not self._cleanup_id:
-            self._cleanup_id = GLib.timeout_add_seconds(self.timeout, self.__cleanup)
-
-    def remove(self, trackobj):
-        for item in self._cache:
-            if item[0] == trackobj:
-                self._cache.remove(item)
-                break
+            thresh = time.time() - self.timeout
+            while self._cache:
+                loc, item = next(self._cache.iteritems())
+                if item[2] >= thresh:
+                    timeout = int(item[2] - thresh) + 1
+                    self._cleanup_id = GLib.timeout_add_seconds(
+                        timeout, self.__cleanup
+                    )
+                    break
+                del self._cache[loc]
 
-    def get(self, trackobj):
-        for item in self._cache:
-            if item[0] == trackobj:
-                item[2] = time.time()
-                return item[1]
+    def add(self, loc, formatobj):
+        """
+            Caches the Format object of a location, which must reflect
+            the current content of the file
+        """
+        item = [formatobj, self.__get_stat(formatobj), time.time()]
+        with self._lock:
+            self._cache.pop(loc, None)
+            self._cache[loc] = item
+            if len(self._cache) > self.maxentries:
+                self._cache.popitem(last=False)
+            if self._cleanup_id is None:
+                self._cleanup_id = GLib.timeout_add_seconds(
+                    self.timeout, self.__cleanup
+                )
+
+    def remove(self, loc):
+        with self._lock:
+            self._cache.pop(loc, None)
+
+    def get(self, loc):
+        """
+            Returns the cached Format object of a location, or None
+        """
+        with self._lock:
+            item = self._cache.pop(loc, None)
+            if item is None or item[1] != self.__get_stat(item[0]):
+                return None
+            item[2] = time.time()
+            self._cache[loc] = item
+            return item[0]
 
 
 _CACHER = _MetadataCacher()
 
+#: Minimum number of tracks whose search values are cached at once, see
+#: Track._get_search_values. The bound grows with the largest TrackDB.
+_SEARCH_VALUES_LIMIT = 20000
+
 
 class Track(object):
     """
@@ -133,9 +371,21 @@ class Track(object):
     """
 
     # save a little memory this way
-    __slots__ = ["__tags", "_scan_valid", "_dirty", "__weakref__", "_init"]
+    __slots__ = [
+        "__tags",
+        "_scan_valid",
+        "_dirty",
+        "_search_values",
+        "__weakref__",
+        "_init",
+    ]
     # this is used to enforce the one-track-per-uri rule
     __tracksdict = weakref.WeakValueDictionary()
+    # the tracks with cached search values, to bound the memory the
+    # caches take up, and the number of tracks of the largest TrackDB
+    __search_cached = weakref.WeakSet()
+    __search_cached_lock = threading.Lock()
+    __search_trackdb_size = 0
     # store a copy of the settings values here - much faster (0.25 cpu
     # seconds) (see _the_cuts_cb)
     __the_cuts = settings.get_option('collection/strip_list', [])
@@ -190,6 +440,10 @@ class Track(object):
                         unpickles = kwargs.get("_unpickles")
 
                 if unpickles is not None:
+                    # the tags of a lazily loaded record are only iterated
+                    # over once they are all loaded
+                    if isinstance(unpickles, _PartialTags):
+                        unpickles.load()
                     tags = tr.list_tags()
                     to_set = {
                         tag: values
@@ -229,8 +483,13 @@ class Track(object):
         self._scan_valid = None  # whether our last tag read attempt worked
 
         # This is not used by write_tags, this is used by the collection to
-        # indicate that the tags haven't been written to the collection
-        self._dirty = False
+        # indicate that the tags haven't been written to the collection.
+        # The track dbs holding a track are told when it becomes dirty, see
+        # set_tags, so new tracks start out dirty.
+        self._dirty = _unpickles is None
+
+        # normalized search values, see _get_search_values
+        self._search_values = None
 
         if _unpickles:
             self._unpickles(_unpickles)
@@ -243,6 +502,49 @@ class Track(object):
         else:
             raise ValueError("Cannot create a Track from nothing")
 
+    @classmethod
+    def _from_summary(cls, summary, loader):
+        """
+            Creates a Track that only has the tags of a summary (see
+            SUMMARY_TAGS) at first. The other tags are loaded by calling
+            loader, which returns the full tags, once they are needed.
+
+            internal use only please
+        """
+        return cls(_unpickles=_PartialTags(summary, loader))
+
+    def _get_summary(self):
+        """
+            Returns the values of the SUMMARY_TAGS of this track
+
+            internal use only please
+        """
+        tags = self.__tags
+        return {
+            tag: deepcopy(_expand_value(tag, dict.get(tags, tag)))
+            for tag in SUMMARY_TAGS
+            if dict.get(tags, tag) is not None
+        }
+
+    def _is_partial(self):
+        """
+            Returns whether only the SUMMARY_TAGS of this track have been
+            loaded so far
+
+            internal use only please
+        """
+        tags = self.__tags
+        return type(tags) is _PartialTags and not tags.is_loaded()
+
+    def __get_all_tags(self):
+        """
+            Returns the tag dict, loading the tags of a partial track
+        """
+        tags = self.__tags
+        if type(tags) is _PartialTags:
+            tags.load()
+        return tags
+
     def __register(self):
         """
             Register this instance into the global registry of Track
@@ -270,8 +572,9 @@ class Track(object):
         gloc = Gio.File.new_for_commandline_arg(loc)
         self.__tags['__loc'] = gloc.get_uri()
         self.__register()
+        self._search_values = None
         if notify_changed:
-            event.log_event('track_tags_changed', self, {'__loc'})
+            event.log_batched_event('track_tags_changed', self, {'__loc'})
 
     def exists(self):
         """
@@ -350,10 +653,10 @@ class Track(object):
             `xl.metadata` otherwise.
         """
         try:
-            f = metadata.get_format(self.get_loc_for_io())
-            if f is None:
-                return False  # not a supported type
-            f.write_tags(self.__tags)
+            with self._use_format_obj(write=True) as f:
+                if f is None:
+                    return False  # not a supported type
+                f.write_tags(_expand_tags(self.__get_all_tags()))
 
             # now that we've written the tags to disk, remove any tags that the
             # user asked to be deleted
@@ -370,35 +673,47 @@ class Track(object):
             logger.exception("Unknown exception: Could not write tags to file")
             return False
 
-    def read_tags(self, force=True, notify_changed=True):
+    def read_tags(self, force=True, notify_changed=True, fileinfo=None):
         """
             Reads tags from the file for this Track.
             
             :param force: If not True, then only read the tags if the file has
                           be modified.
+            :param fileinfo: A :class:`Gio.FileInfo` of the file holding its
+                             ``time::modified`` attribute, such as the ones
+                             yielded by :func:`xl.common.walk_with_info`.
+                             Saves querying the file again.
 
-            Returns False if unsuccessful, and a Format object from
-            `xl.metadata` otherwise.
+            Returns False if unsuccessful, True if the tags were already up
+            to date, and a Format object from `xl.metadata` otherwise.
         """
         loc = self.get_loc_for_io()
         try:
-            f = metadata.get_format(loc)
-            if f is None:
-                self._scan_valid = False
-                return False  # not a supported type
-
-            # Retrieve file specific metadata
             gloc = Gio.File.new_for_uri(loc)
-            mtime = gloc.query_info(
-                "time::modified", Gio.FileQueryInfoFlags.NONE, None
-            ).get_modification_time()
-            mtime = mtime.tv_sec + (mtime.tv_usec / 100000.0)
-
-            if not force and self.__tags.get('__modified', 0) >= mtime:
-                return f
-
-            # Read the tags
-            ntags = f.read_all()
+            mtime = None
+
+            # Only tracks that have been read before have __modified, so
+            # their format is known to be supported and checking the mtime
+            # first avoids creating a Format object for unchanged files
+            if not force and '__modified' in self.__tags:
+                mtime = self.__get_mtime(gloc, fileinfo)
+                if self.__tags['__modified'] >= mtime:
+                    return True
+
+            # Covers and lyrics aren't stored in the track
+            with self._use_format_obj(header_only=True) as f:
+                if f is None:
+                    self._scan_valid = False
+                    return False  # not a supported type
+
+                # Retrieve file specific metadata
+                if mtime is None:
+                    mtime = self.__get_mtime(gloc, fileinfo)
+
+                # Read the tags
+                ntags = f.read_all()
+                others = f.others
+                tag_mapping = f.tag_mapping
             ntags['__modified'] = mtime
 
             # TODO: this probably breaks on non-local files
@@ -409,14 +724,14 @@ class Track(object):
             # the file format.
 
             nkeys = set(ntags.keys())
-            ekeys = {k for k in self.__tags.keys() if not k.startswith('__')}
+            ekeys = {k for k in self.__get_all_tags() if not k.startswith('__')}
 
             # delete anything that wasn't in the new tags
             to_del = ekeys - nkeys
 
             # but if not others set, only delete supported tags
-            if not f.others:
-                to_del &= set(f.tag_mapping.keys())
+            if not others:
+                to_del &= set(tag_mapping.keys())
 
             for tag in to_del:
                 ntags[tag] = None
@@ -430,6 +745,19 @@ class Track(object):
             logger.exception("Error reading tags for %s", loc)
             return False
 
+    @staticmethod
+    def __get_mtime(gloc, fileinfo=None):
+        """
+            Returns the modification time of a file, as stored in the
+            __modified tag
+        """
+        if fileinfo is None:
+            fileinfo = gloc.query_info(
+                "time::modified", Gio.FileQueryInfoFlags.NONE, None
+            )
+        mtime = fileinfo.get_modification_time()
+        return mtime.tv_sec + (mtime.tv_usec / 100000.0)
+
     def is_local(self):
         """
             Determines whether a file is accessible on the local filesystem.
@@ -465,7 +793,7 @@ class Track(object):
 
             internal use only please
         """
-        return deepcopy(self.__tags)
+        return _expand_tags(self.__get_all_tags())
 
     def _unpickles(self, pickle_obj):
         """
@@ -473,13 +801,18 @@ class Track(object):
 
             internal use only please
         """
-        self.__tags = deepcopy(pickle_obj)
+        if type(pickle_obj) is _PartialTags:
+            self.__tags = pickle_obj
+        else:
+            self.__tags = _compact_tags(pickle_obj)
 
     def list_tags(self):
         """
             Returns a list of the names of all tags present in this Track.
         """
-        return [k for k, v in self.__tags.iteritems() if v is not None] + ['__basename']
+        return [k for k, v in self.__get_all_tags().iteritems() if v is not None] + [
+            '__basename'
+        ]
 
     def _xform_set_values(self, tag, values):
         # Handle values that aren't lists
@@ -555,15 +888,31 @@ class Track(object):
             # Transform and set the value. We do NOT delete the value from the tag
             # dict (which was done prior to Exaile 4), otherwise we don't know that
             # the user wanted the tag to be deleted
-            new_value = self._xform_set_values(tag, values)
+            new_value = _compact_value(tag, self._xform_set_values(tag, values))
             if self.__tags.get(tag, _unset) != new_value:
                 changed.add(tag)
                 self.__tags[tag] = new_value
 
         if changed:
+            was_dirty = self._dirty
             self._dirty = True
+            self._search_values = None
             if notify_changed:
-                event.log_event("track_tags_changed", self, changed)
+                event.log_batched_event("track_tags_changed", self, changed)
+            elif not was_dirty:
+                # the track dbs holding the track still have to save it
+                event.log_event("track_dirty", self, None)
+
+    def __get(self, tag, default=None):
+        """
+            Returns the raw value of a tag, or default if the tag is not
+            present. Single values of non-internal tags are returned in a
+            list, as with get_tag_raw.
+        """
+        value = self.__tags.get(tag, _unset)
+        if value is _unset:
+            return default
+        return _expand_value(tag, value)
 
     def get_tag_raw(self, tag, join=False):
         """
@@ -581,7 +930,7 @@ class Track(object):
         elif tag == '__startoffset':  # necessary?
             value = self.__tags.get(tag, 0)
         else:
-            value = self.__tags.get(tag)
+            value = self.__get(tag)
 
         if join and value and not tag.startswith('__'):
             return self.join_values(value)
@@ -607,14 +956,14 @@ class Track(object):
         # and unknown values are always sorted below all normal
         # values.
         value = None
-        sorttag = self.__tags.get(tag + "sort")
+        sorttag = self.__get(tag + "sort")
         if sorttag and tag != "albumartist":
             value = sorttag
         elif tag == "albumartist":
             if artist_compilations and self.__tags.get('__compilation'):
-                value = self.__tags.get('albumartist', u"\uffff\uffff\uffff\ufffe")
+                value = self.__get('albumartist', u"\uffff\uffff\uffff\ufffe")
             else:
-                value = self.__tags.get('artist', u"\uffff\uffff\uffff\uffff")
+                value = self.__get('artist', u"\uffff\uffff\uffff\uffff")
             if sorttag and value not in (
                 u"\uffff\uffff\uffff\ufffe",
                 u"\uffff\uffff\uffff\uffff",
@@ -623,21 +972,21 @@ class Track(object):
             else:
                 sorttag = None
         elif tag in ('tracknumber', 'discnumber'):
-            value = self.split_numerical(self.__tags.get(tag))[0]
+            value = self.split_numerical(self.__get(tag))[0]
         elif tag in ('__length', '__playcount'):
             value = self.__tags.get(tag, 0)
         elif tag == 'bpm':
             try:
-                value = int(self.__tags.get(tag, [0])[0])
+                value = int(self.__get(tag, [0])[0])
             except ValueError:
-                digits = re.search(r'\d+\.?\d*', self.__tags.get(tag, [0])[0])
+                digits = re.search(r'\d+\.?\d*', self.__get(tag, [0])[0])
                 if digits:
                     value = float(digits.group())
         elif tag == '__basename':
             # TODO: Check if unicode() is required
             value = self.get_basename()
         else:
-            value = self.__tags.get(tag)
+            value = self.__get(tag)
 
         if value is None:
             value = u"\uffff\uffff\uffff\uffff"  # unknown
@@ -683,11 +1032,11 @@ class Track(object):
         value = None
         if tag == "albumartist":
             if artist_compilations and self.__tags.get('__compilation'):
-                value = self.__tags.get('albumartist', _VARIOUSARTISTSSTR)
+                value = self.__get('albumartist', _VARIOUSARTISTSSTR)
             else:
-                value = self.__tags.get('artist', _UNKNOWNSTR)
+                value = self.__get('artist', _UNKNOWNSTR)
         elif tag in ('tracknumber', 'discnumber'):
-            value = self.split_numerical(self.__tags.get(tag))[0] or u""
+            value = self.split_numerical(self.__get(tag))[0] or u""
         elif tag in ('__length', '__startoffset', '__stopoffset'):
             value = self.__tags.get(tag, u"")
         elif tag in ('__rating', '__playcount'):
@@ -705,7 +1054,7 @@ class Track(object):
         elif tag == '__basename':
             value = self.get_basename_display()
         else:
-            value = self.__tags.get(tag)
+            value = self.__get(tag)
 
         if value is None:
             value = ''
@@ -743,13 +1092,13 @@ class Track(object):
         extraformat = ""
         if tag == "albumartist":
             if artist_compilations and self.__tags.get('__compilation'):
-                value = self.__tags.get('albumartist', None)
+                value = self.__get('albumartist', None)
                 tag = 'albumartist'
                 extraformat += " ! __compilation==__null__"
             else:
-                value = self.__tags.get('artist')
+                value = self.__get('artist')
         elif tag in ('tracknumber', 'discnumber'):
-            value = self.split_numerical(self.__tags.get(tag))[0]
+            value = self.split_numerical(self.__get(tag))[0]
         elif tag in (
             '__length',
             '__playcount',
@@ -769,7 +1118,7 @@ class Track(object):
         elif tag == '__basename':
             value = self.get_basename_display()
         else:
-            value = self.__tags.get(tag)
+            value = self.__get(tag)
 
         # Quote arguments
         if value is None:
@@ -799,17 +1148,122 @@ class Track(object):
 
         return value
 
-    def _get_format_obj(self):
-        f = _CACHER.get(self)
-        if not f:
+    def _get_search_values(self, tag, lower=False):
+        """
+            Returns the values of a tag as matched by the search system:
+            a list of the values of get_tag_search(tag, format=False),
+            with None for a missing tag, and lowercased if lower is True.
+
+            The values are cached until the tags of the track change, or
+            until the values of more tracks than the largest TrackDB, and
+            at least _SEARCH_VALUES_LIMIT, are cached, when all caches are
+            dropped. See also _clear_search_values.
+
+            internal use only please
+        """
+        # get the cache before reading the tags, so that values read
+        # from outdated tags end up in an outdated cache
+        cache = self._search_values
+        if cache is None:
+            cache = self._search_values = {}
+            self.__add_search_cached()
+        key = (tag, lower)
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+
+        if lower:
+            values = [
+                None if v is None else v.lower()
+                for v in self._get_search_values(tag)
+            ]
+        else:
+            values = self.get_tag_search(tag, format=False)
+            if values == '__null__':
+                values = None
+            if not isinstance(values, list):
+                values = [values]
+        cache[key] = values
+        return values
+
+    def __add_search_cached(self):
+        """
+            Records that this track has cached search values, dropping
+            the caches of all tracks first if there are too many
+        """
+        limit = max(_SEARCH_VALUES_LIMIT, Track.__search_trackdb_size)
+        with Track.__search_cached_lock:
+            if len(Track.__search_cached) >= limit:
+                Track.__drop_search_values()
+            Track.__search_cached.add(self)
+
+    @classmethod
+    def __drop_search_values(cls):
+        # must be called with the lock held
+        for track in list(cls._Track__search_cached):
+            track._search_values = None
+        cls._Track__search_cached.clear()
+
+    @classmethod
+    def _clear_search_values(cls, *args):
+        """
+            PRIVATE
+
+            drops all cached search values, such as when collection
+            options change or a search filter is cleared
+        """
+        with cls._Track__search_cached_lock:
+            cls._Track__drop_search_values()
+
+    @classmethod
+    def _fit_search_values(cls, count):
+        """
+            PRIVATE
+
+            lets the search values of at least count tracks be cached at
+            once, so that searching a TrackDB of count tracks again finds
+            the values of the previous search
+        """
+        if count > cls._Track__search_trackdb_size:
+            cls._Track__search_trackdb_size = count
+
+    @contextlib.contextmanager
+    def _use_format_obj(self, header_only=False, write=False):
+        """
+            Context manager yielding the Format object of the file, from
+            the cache if the file wasn't modified since, or None if it is
+            not supported. The object is shared with other threads
+            through the cache, so it is locked until the block exits.
+
+            :param header_only: whether a Format object which did not
+                load large tags such as covers and lyrics will do
+            :param write: whether the block writes to the file, in which
+                case the cached object is replaced once it is done
+        """
+        loc = self.get_loc_for_io()
+        f = _CACHER.get(loc)
+        if f is None:
             try:
-                f = metadata.get_format(self.get_loc_for_io())
+                f = metadata.get_format(loc, header_only)
             except Exception:  # TODO: What exception?
-                return None
+                f = None
             if not f:
-                return None
-        _CACHER.add(self, f)
-        return f
+                yield None
+                return
+            _CACHER.add(loc, f)
+
+        with f.lock:
+            try:
+                if not header_only:
+                    f.load_all()
+                yield f
+            except Exception:
+                # the object may not match the file anymore
+                _CACHER.remove(loc)
+                raise
+            if write:
+                _CACHER.add(loc, f)
 
     def get_tag_disk(self, tag):
         """
@@ -822,12 +1276,12 @@ class Track(object):
 
             :returns: None if the tag does not exist
         """
-        f = self._get_format_obj()
-        if f:
-            try:
-                return f.read_tags([tag])[tag]
-            except KeyError:
-                return None
+        with self._use_format_obj() as f:
+            if f:
+                try:
+                    return f.read_tags([tag])[tag]
+                except KeyError:
+                    return None
 
     def set_tag_disk(self, tag, values):
         """
@@ -840,19 +1294,19 @@ class Track(object):
 
             :returns: None if the tag does not exist
         """
-        f = self._get_format_obj()
-        if f:
-            values = self._xform_set_values(tag, values)
-            f.write_tags({tag: values})
+        with self._use_format_obj(write=True) as f:
+            if f:
+                values = self._xform_set_values(tag, values)
+                f.write_tags({tag: values})
 
     def list_tags_disk(self):
         """
             List all the tags directly from file metadata. Can be slow,
             use with caution.
         """
-        f = self._get_format_obj()
-        if f:
-            return f.get_keys_disk()
+        with self._use_format_obj() as f:
+            if f:
+                return f.get_keys_disk()
 
     ### convenience funcs for rating ###
     # these dont fit in the normal set of tag access methods,
@@ -1048,5 +1502,11 @@ class Track(object):
         '''Internal API, returns number of track objects we have'''
         return len(cls._Track__tracksdict)
 
+    @classmethod
+    def _get_existing(cls, uri):
+        '''Internal API, returns the track object for uri, or None'''
+        return cls._Track__tracksdict.get(Gio.File.new_for_uri(uri).get_uri())
+
 
 event.add_callback(Track._the_cuts_cb, 'collection_option_set')
+event.add_callback(Track._clear_search_values, 'collection_option_set')
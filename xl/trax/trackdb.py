@@ -29,12 +29,14 @@ from __future__ import absolute_import
 import logging
 
 from copy import deepcopy
+from functools import partial
 
-from xl import common, event
+from xl import common, event, settings
 from xl.nls import gettext as _
 
+from xl.trax.index import TagIndex
 from xl.trax.track import Track
-from xl.trax.util import sort_tracks
+from xl.trax.util import SortKeyCache, sort_tracks
 from xl.trax.search import search_tracks_from_string
 
 from time import time
@@ -52,6 +54,60 @@ class TrackHolder(object):
         return getattr(self._track, attr)
 
 
+def _load_stored_tags(pdata, key):
+    return pdata["tracks-%s" % key][0]
+
+
+class ShelfStorage(object):
+    """
+        Stores a :class:`TrackDB` in a shelf (see :func:`xl.common.open_shelf`),
+        which is opened again for every load and save
+    """
+
+    #: whether the tracks can be loaded lazily, see TrackDB
+    lazy = False
+
+    def __init__(self, location):
+        self.location = location
+
+    def open(self):
+        return common.open_shelf(self.location)
+
+    def release(self, pdata):
+        pdata.close()
+
+
+class JournalStorage(object):
+    """
+        Stores a :class:`TrackDB` in a :class:`xl.common.Journal`, which
+        stays open so that a save only has to append the changed records.
+
+        An existing shelf at the location is converted to a journal.
+    """
+
+    lazy = True
+
+    def __init__(self, location):
+        self.location = location
+        self._journal = None
+
+    def open(self):
+        if self._journal is None:
+            import xl.migrations.database.shelf_to_journal as mig
+
+            if mig.needs_migration(self.location):
+                mig.migrate(self.location)
+            self._journal = common.Journal(self.location)
+        return self._journal
+
+    def release(self, pdata):
+        pdata.sync()
+
+
+#: Storage backends of TrackDB, selected by the collection/storage option
+STORAGE_BACKENDS = {'shelf': ShelfStorage, 'journal': JournalStorage}
+
+
 class TrackDBIterator(object):
     def __init__(self, track_iterator):
         self.iter = track_iterator
@@ -81,9 +137,19 @@ class TrackDB(object):
                 of :class:`Track` objects.
         :param load_first: Set to True if this collection should be
                 loaded before any tracks are created.
+        :param storage: The name of the storage backend to use, see
+                :data:`STORAGE_BACKENDS`. Defaults to the
+                collection/storage option.
+
+        If the storage backend allows it and the collection/lazy_load
+        option is set, loading only reads the summary tags of each track
+        (see :data:`xl.trax.track.SUMMARY_TAGS`). The other tags of a
+        track are read from the storage the first time they are needed.
     """
 
-    def __init__(self, name="", location="", pickle_attrs=[], loadfirst=False):
+    def __init__(
+        self, name="", location="", pickle_attrs=[], loadfirst=False, storage=None
+    ):
         """
             Sets up the trackDB.
         """
@@ -103,17 +169,30 @@ class TrackDB(object):
         self.location = location
         self._dirty = False
         self.tracks = {}  # key is always URI of the track
-        self.pickle_attrs = pickle_attrs
-        self.pickle_attrs += ['tracks', 'name', '_key']
+        self.pickle_attrs = pickle_attrs + ['tracks', 'name', '_key']
         self._saving = False
         self._key = 0
         self._dbversion = 2.0
         self._dbminorversion = 0
         self._deleted_keys = []
+        # holders of the tracks that were added or changed since the last save
+        self._dirty_holders = set()
+        if storage is None:
+            storage = settings.get_option('collection/storage', 'journal')
+        self._storage_backend = STORAGE_BACKENDS[storage]
+        self._storage = None
+        self._saved_location = None
+        #: Inverted index of the track tags, used by searches
+        self.tag_index = TagIndex()
+        #: Cached sort keys of the tracks, used by sort_tracks
+        self.sort_keys = SortKeyCache(self._is_member_track)
         if location:
             self.load_from_location()
             self._timeout_save()
 
+        event.add_callback(self._on_track_tags_changed, 'track_tags_changed')
+        event.add_callback(self._on_track_dirty, 'track_dirty')
+
     def __iter__(self):
         """
             Provide the ability to iterate over a TrackDB.
@@ -131,6 +210,38 @@ class TrackDB(object):
         """
         return len(self.tracks)
 
+    def _is_member_track(self, track):
+        holder = self.tracks.get(track.get_loc_for_io())
+        return holder is not None and holder._track is track
+
+    @common.synchronized
+    def _on_track_tags_changed(self, type, track, tags):
+        """
+            Keeps the tag index and the sort keys up to date, and marks
+            the track for saving
+        """
+        if self._is_member_track(track):
+            self._dirty_holders.add(self.tracks[track.get_loc_for_io()])
+            self.tag_index.update(track, tags)
+            self.sort_keys.forget([track])
+
+    @common.synchronized
+    def _on_track_dirty(self, type, track, data):
+        """
+            Marks a track changed without a track_tags_changed event for
+            saving
+        """
+        if self._is_member_track(track):
+            self._dirty_holders.add(self.tracks[track.get_loc_for_io()])
+
+    def _get_storage(self, location):
+        """
+            Returns the storage backend for location
+        """
+        if self._storage is None or self._storage.location != location:
+            self._storage = self._storage_backend(location)
+        return self._storage
+
     @common.glib_wait_seconds(300)
     def _timeout_save(self):
         """
@@ -185,7 +296,8 @@ class TrackDB(object):
 
         logger.debug("Loading %s DB from %s.", self.name, location)
 
-        pdata = common.open_shelf(location)
+        storage = self._get_storage(location)
+        pdata = storage.open()
 
         if "_dbversion" in pdata:
             if int(pdata['_dbversion']) > int(self._dbversion):
@@ -194,6 +306,7 @@ class TrackDB(object):
                 logger.info("Upgrading DB format....")
                 import shutil
 
+                pdata.sync()
                 shutil.copyfile(location, location + "-%s.bak" % pdata['_dbversion'])
                 import xl.migrations.database as dbmig
 
@@ -201,30 +314,54 @@ class TrackDB(object):
                     self, pdata, pdata['_dbversion'], self._dbversion
                 )
 
+        lazy = storage.lazy and settings.get_option('collection/lazy_load', True)
+
         for attr in self.pickle_attrs:
             try:
                 if 'tracks' == attr:
                     data = {}
-                    for k in (x for x in pdata.keys() if x.startswith("tracks-")):
-                        p = pdata[k]
-                        tr = Track(_unpickles=p[0])
+                    # tracks saved without a summary are loaded completely,
+                    # and get one with the next save
+                    unsummarized = []
+                    keys = pdata.keys()
+                    summaries = {x for x in keys if x.startswith("summary-")}
+                    for k in (x for x in keys if x.startswith("tracks-")):
+                        skey = "summary-" + k[7:]
+                        if lazy and skey in summaries:
+                            p = pdata[skey]
+                            tr = Track._from_summary(
+                                p[0], partial(_load_stored_tags, pdata, p[1])
+                            )
+                        else:
+                            p = pdata[k]
+                            tr = Track(_unpickles=p[0])
                         loc = tr.get_loc_for_io()
                         if loc not in data:
                             data[loc] = TrackHolder(tr, p[1], **p[2])
+                            if skey not in summaries:
+                                unsummarized.append(data[loc])
                         else:
                             logger.warning("Duplicate track found: %s", loc)
                             # presumably the second track was written because of an error,
                             # so use the first track found.
                             del pdata[k]
+                            if skey in summaries:
+                                del pdata[skey]
 
                     setattr(self, attr, data)
+                    self._dirty_holders = set(unsummarized)
+                    self.tag_index.clear()
+                    self.tag_index.add_tracks(h._track for h in data.itervalues())
+                    self.sort_keys.clear()
+                    Track._fit_search_values(len(data))
                 else:
                     setattr(self, attr, pdata.get(attr, getattr(self, attr)))
             except Exception:
                 # FIXME: Do something about this
                 logger.exception("Exception occurred while loading %s", location)
 
-        pdata.close()
+        storage.release(pdata)
+        self._saved_location = location
 
         self._dirty = False
 
@@ -234,16 +371,13 @@ class TrackDB(object):
             Saves a pickled representation of this :class:`TrackDB` to the
             specified location.
 
+            Only the tracks that were added or changed since the last save
+            are written.
+
             :param location: the location to save the data to
             :type location: string
         """
-        if not self._dirty:
-            for track in self.tracks.itervalues():
-                if track._track._dirty:
-                    self._dirty = True
-                    break
-
-        if not self._dirty:
+        if not self._dirty and not self._dirty_holders:
             return
 
         if not location:
@@ -258,38 +392,53 @@ class TrackDB(object):
         logger.debug("Saving %s DB to %s.", self.name, location)
 
         try:
-            pdata = common.open_shelf(location)
+            storage = self._get_storage(location)
+            pdata = storage.open()
             if pdata.get('_dbversion', self._dbversion) > self._dbversion:
                 raise common.VersionError("DB was created on a newer Exaile.")
         except Exception:
             logger.exception("Failed to open music DB for writing.")
+            self._saving = False
             return
 
+        holders = self._dirty_holders
+        self._dirty_holders = set()
+        if location != self._saved_location:
+            # a different location doesn't have any of the tracks yet
+            holders = set(self.tracks.itervalues())
+
         for attr in self.pickle_attrs:
             # bad hack to allow saving of lists/dicts of Tracks
             if 'tracks' == attr:
-                for k, track in self.tracks.iteritems():
-                    key = "tracks-%s" % track._key
-                    if track._track._dirty or key not in pdata:
-                        pdata[key] = (
-                            track._track._pickles(),
-                            track._key,
-                            deepcopy(track._attrs),
-                        )
+                for track in holders:
+                    pdata["tracks-%s" % track._key] = (
+                        track._track._pickles(),
+                        track._key,
+                        deepcopy(track._attrs),
+                    )
+                    pdata["summary-%s" % track._key] = (
+                        track._track._get_summary(),
+                        track._key,
+                        deepcopy(track._attrs),
+                    )
             else:
-                pdata[attr] = deepcopy(getattr(self, attr))
+                value = getattr(self, attr)
+                if attr not in pdata or pdata[attr] != value:
+                    pdata[attr] = deepcopy(value)
 
-        pdata['_dbversion'] = self._dbversion
+        if pdata.get('_dbversion') != self._dbversion:
+            pdata['_dbversion'] = self._dbversion
 
         for key in self._deleted_keys:
-            key = "tracks-%s" % key
-            if key in pdata:
-                del pdata[key]
+            for k in ("tracks-%s" % key, "summary-%s" % key):
+                if k in pdata:
+                    del pdata[k]
+        self._deleted_keys = []
 
-        pdata.sync()
-        pdata.close()
+        storage.release(pdata)
+        self._saved_location = location
 
-        for track in self.tracks.itervalues():
+        for track in holders:
             track._track._dirty = False
 
         self._dirty = False
@@ -349,10 +498,14 @@ class TrackDB(object):
             if location in self.tracks:
                 continue
             locations += [location]
-            self.tracks[location] = TrackHolder(tr, self._key)
+            holder = TrackHolder(tr, self._key)
+            self.tracks[location] = holder
+            self._dirty_holders.add(holder)
+            self.tag_index.add(tr)
             self._key += 1
 
         if locations:
+            Track._fit_search_values(len(self.tracks))
             event.log_event('tracks_added', self, locations)
             self._dirty = True
 
@@ -374,8 +527,14 @@ class TrackDB(object):
         for tr in tracks:
             location = tr.get_loc_for_io()
             locations += [location]
+            if tr._is_partial():
+                # the stored tags are deleted with the next save
+                tr.list_tags()
             self._deleted_keys.append(self.tracks[location]._key)
+            self._dirty_holders.discard(self.tracks[location])
+            self.tag_index.remove(self.tracks[location]._track)
             del self.tracks[location]
+        self.sort_keys.forget(tracks)
 
         event.log_event('tracks_removed', self, locations)
 
@@ -402,7 +561,7 @@ class TrackDB(object):
         ]
 
         if sort_fields:
-            tracks = sort_tracks(sort_fields, tracks, reverse)
+            tracks = sort_tracks(sort_fields, tracks, reverse=reverse)
         if return_lim > 0:
             tracks = tracks[:return_lim]
 
@@ -26,11 +26,16 @@
 
 from gi.repository import Gio
 from gi.repository import GLib
+import threading
+import weakref
 
-from xl import metadata
+from xl import event, metadata
 from xl.trax.track import Track
 from xl.trax.search import search_tracks, TracksMatcher
 
+# All live SortKeyCache instances, consulted by sort_tracks
+_SORT_KEY_CACHES = weakref.WeakSet()
+
 
 def is_valid_track(location):
     """
@@ -96,10 +101,117 @@ def get_tracks_from_uri(uri):
     return tracks
 
 
-def sort_tracks(fields, iter, trackfunc=None, reverse=False, artist_compilations=False):
+class SortKeyCache(object):
+    """
+        Caches the values returned by :meth:`Track.get_tag_sort`, so that
+        sorting doesn't have to compute them again every time.
+
+        The values are stored per tag, and are filled lazily for the
+        tracks accepted by *is_member*. Other tracks are not cached.
+        Owners must call :meth:`forget` when the tags of a track change.
+        All values are dropped when the ``collection/strip_list`` option
+        changes.
+
+        :param is_member: function returning whether a
+            :class:`xl.trax.Track` should be cached
+    """
+
+    def __init__(self, is_member):
+        self._is_member = is_member
+        # (tag, artist_compilations) -> {track: sort key}
+        self._columns = {}
+        # Held while filling or dropping values, so that a value computed
+        # from old tags can't be stored after it has been invalidated
+        self._lock = threading.Lock()
+        _SORT_KEY_CACHES.add(self)
+        event.add_callback(self._on_option_set, 'collection_option_set')
+
+    def _get_column(self, tag, artist_compilations):
+        # artist_compilations only makes a difference for albumartist
+        key = (tag, tag == 'albumartist' and bool(artist_compilations))
+        try:
+            return self._columns[key]
+        except KeyError:
+            return self._columns.setdefault(key, {})
+
+    def lookup(self, track, fields, artist_compilations=False):
+        """
+            Returns the sort keys of a track for the given fields as a
+            tuple, or None if the track is not cached and not accepted
+            by this cache.
+        """
+        keys = []
+        member = None
+        for field in fields:
+            column = self._get_column(field, artist_compilations)
+            try:
+                keys.append(column[track])
+            except KeyError:
+                if member is None:
+                    member = self._is_member(track)
+                if not member:
+                    return None
+                with self._lock:
+                    key = column[track] = track.get_tag_sort(
+                        field, artist_compilations=artist_compilations
+                    )
+                keys.append(key)
+        return tuple(keys)
+
+    def get_keys(self, track, fields, artist_compilations=False):
+        """
+            Returns the sort keys of a track for the given fields as a
+            tuple, computing them if the track is not cached.
+        """
+        keys = self.lookup(track, fields, artist_compilations)
+        if keys is None:
+            keys = tuple(
+                track.get_tag_sort(field, artist_compilations=artist_compilations)
+                for field in fields
+            )
+        return keys
+
+    def forget(self, tracks):
+        """
+            Drops the cached values of the given tracks
+        """
+        with self._lock:
+            for column in self._columns.values():
+                for track in tracks:
+                    column.pop(track, None)
+
+    def clear(self):
+        """
+            Drops all cached values
+        """
+        with self._lock:
+            self._columns = {}
+
+    def _on_option_set(self, type, settings, option):
+        if option == 'collection/strip_list':
+            self.clear()
+
+
+def _get_sort_keys(track, fields, artist_compilations, caches):
+    for cache in caches:
+        keys = cache.lookup(track, fields, artist_compilations)
+        if keys is not None:
+            return keys
+    return tuple(
+        track.get_tag_sort(field, artist_compilations=artist_compilations)
+        for field in fields
+    )
+
+
+def sort_tracks(
+    fields, iter, trackfunc=None, reverse=False, artist_compilations=False, cache=None
+):
     """
         Sorts tracks.
 
+        Sort keys are taken from the :class:`SortKeyCache` of the
+        :class:`xl.trax.TrackDB` holding each track, if any.
+
         :param fields: tag names to sort by
         :type fields: iterable
         :param iter: the tracks to sort,
@@ -110,25 +222,34 @@ def sort_tracks(fields, iter, trackfunc=None, reverse=False, artist_compilations
         :type trackfunc: function or None
         :param reverse: whether to sort in reversed order
         :type reverse: boolean
+        :param cache: the cache to look up sort keys in. Defaults to
+            the caches of all track databases.
+        :type cache: :class:`SortKeyCache` or None
     """
-    fields = list(fields)  # we need the index method
+    fields = tuple(fields)
+    if cache is None:
+        caches = list(_SORT_KEY_CACHES)
+    else:
+        caches = [cache]
     if trackfunc is None:
-        trackfunc = lambda tr: tr
-    keyfunc = lambda tr: [
-        trackfunc(tr).get_tag_sort(field, artist_compilations=artist_compilations)
-        for field in fields
-    ]
+        keyfunc = lambda tr: _get_sort_keys(tr, fields, artist_compilations, caches)
+    else:
+        keyfunc = lambda tr: _get_sort_keys(
+            trackfunc(tr), fields, artist_compilations, caches
+        )
     return sorted(iter, key=keyfunc, reverse=reverse)
 
 
-def sort_result_tracks(fields, trackiter, reverse=False, artist_compilations=False):
+def sort_result_tracks(
+    fields, trackiter, reverse=False, artist_compilations=False, cache=None
+):
     """
         Sorts SearchResultTracks, ie. the output from a search.
 
         Same params as sort_tracks.
     """
     return sort_tracks(
-        fields, trackiter, lambda tr: tr.track, reverse, artist_compilations
+        fields, trackiter, lambda tr: tr.track, reverse, artist_compilations, cache
     )
 
 
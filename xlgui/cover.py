@@ -47,6 +47,74 @@ from xlgui.guiutil import pixbuf_from_data
 
 logger = logging.getLogger(__name__)
 
+#: Recently used thumbnails, by db_string and size
+_THUMBNAILS = common.LimitedCache(200)
+_THUMBNAILS_LOCK = threading.Lock()
+
+
+def get_cover_thumbnail(db_string, size, cover_data=None):
+    """Get a cover scaled down to fit into a square of the given size.
+
+    Thumbnails are kept in memory and on disk, so the full cover is only
+    decoded the first time a thumbnail of a size is needed.
+
+    :param db_string: The db_string identifying the cover
+    :type db_string: str
+    :param size: Width and height to scale to, in pixels
+    :type size: int
+    :param cover_data: The image data of the cover, if already known
+    :type cover_data: bytes
+    :return: The thumbnail or None if the cover could not be loaded
+    :rtype: GdkPixbuf.Pixbuf
+    """
+    key = (db_string, size)
+    with _THUMBNAILS_LOCK:
+        pixbuf = _THUMBNAILS.get(key)
+    if pixbuf is not None:
+        return pixbuf
+
+    pixbuf = pixbuf_from_data(COVER_MANAGER.get_thumbnail_data(db_string, size))
+    if pixbuf is None:
+        if cover_data is None:
+            cover_data = COVER_MANAGER.get_cover_data(db_string)
+        pixbuf = pixbuf_from_data(cover_data, (size, size))
+        if pixbuf is None:
+            return None
+        try:
+            data = pixbuf.save_to_bufferv('png', [], [])[1]
+        except GLib.Error:
+            logger.warning("Could not create a thumbnail", exc_info=True)
+        else:
+            COVER_MANAGER.set_thumbnail_data(db_string, size, data)
+
+    with _THUMBNAILS_LOCK:
+        _THUMBNAILS[key] = pixbuf
+    return pixbuf
+
+
+def _on_cover_set(type, manager, track):
+    """Drops the thumbnails of a cover set again from memory, as its
+    db_string may be the same while its image is not.
+    """
+    db_string = manager.get_db_string(track)
+    with _THUMBNAILS_LOCK:
+        for key in _THUMBNAILS.keys():
+            if key[0] == db_string:
+                del _THUMBNAILS[key]
+
+
+def _on_cover_removed(type, manager, track):
+    """Drops all thumbnails from memory, as the db_string of the removed
+    cover is not known anymore.
+    """
+    with _THUMBNAILS_LOCK:
+        for key in _THUMBNAILS.keys():
+            del _THUMBNAILS[key]
+
+
+event.add_callback(_on_cover_set, 'cover_set')
+event.add_callback(_on_cover_removed, 'cover_removed')
+
 
 def save_pixbuf(pixbuf, path, type_):
     """Save a pixbuf to a local file.
@@ -170,7 +238,7 @@ class CoverManager(GObject.GObject):
 
         outstanding = []
         # Speed up the following loop
-        get_cover = COVER_MANAGER.get_cover
+        get_db_string = COVER_MANAGER.get_db_string
         default_cover_pixbuf = self.default_cover_pixbuf
         cover_size = self.cover_size
 
@@ -180,8 +248,12 @@ class CoverManager(GObject.GObject):
             if self.stopper.is_set():
                 return
 
-            cover_data = get_cover(self.album_tracks[album][0], set_only=True)
-            cover_pixbuf = pixbuf_from_data(cover_data) if cover_data else None
+            # Reading stored thumbnails is much faster than decoding and
+            # scaling all the covers every time the window is opened
+            db_string = get_db_string(self.album_tracks[album][0])
+            cover_pixbuf = (
+                get_cover_thumbnail(db_string, max(cover_size)) if db_string else None
+            )
 
             try:
                 thumbnail_pixbuf = cover_pixbuf.scale_simple(
@@ -206,16 +278,13 @@ class CoverManager(GObject.GObject):
         """
         self.emit('fetch-started', len(self.outstanding))
 
-        # Speed up the following loop
-        get_cover = COVER_MANAGER.get_cover
-        save = COVER_MANAGER.save
-
-        for i, album in enumerate(self.outstanding[:]):
-            if self.stopper.is_set():
-                # Allow for "fetch-completed" signal to be emitted
-                break
+        # Albums are fetched concurrently, and the covers are saved in
+        # batches. Stopping still allows for "fetch-completed" signal to
+        # be emitted.
+        items = [(album, self.album_tracks[album][0]) for album in self.outstanding]
+        results = COVER_MANAGER.fetch_covers(items, self.stopper)
 
-            cover_data = get_cover(self.album_tracks[album][0], save_cover=True)
+        for i, (album, cover_data) in enumerate(results):
             cover_pixbuf = pixbuf_from_data(cover_data) if cover_data else None
 
             self.emit('fetch-progress', i + 1)
@@ -226,13 +295,6 @@ class CoverManager(GObject.GObject):
             self.outstanding.remove(album)
             self.emit('cover-fetched', album, cover_pixbuf)
 
-            if i % 50 == 0:
-                logger.debug('Saving cover database')
-                save()
-
-        logger.debug('Saving cover database')
-        save()
-
         self.emit('fetch-completed', len(self.outstanding))
 
     def show_cover(self):
@@ -574,7 +636,14 @@ class CoverWidget(Gtk.EventBox):
             if not cover_data:
                 return
 
-            GLib.idle_add(self.on_cover_chosen, None, track, cover_data)
+            # the cover is set now, unless it was the default cover
+            db_string = COVER_MANAGER.get_db_string(track)
+            pixbuf = None
+            if db_string:
+                width = settings.get_option('gui/cover_width', 100)
+                pixbuf = get_cover_thumbnail(db_string, width, cover_data)
+
+            GLib.idle_add(self.on_cover_chosen, None, track, cover_data, pixbuf)
 
         if track is not None:
             __get_cover()
@@ -729,7 +798,7 @@ class CoverWidget(Gtk.EventBox):
                 self.image.set_from_pixbuf(pixbuf)
                 COVER_MANAGER.set_cover(self.__track, db_string, self.cover_data)
 
-    def on_cover_chosen(self, object, track, cover_data):
+    def on_cover_chosen(self, object, track, cover_data, pixbuf=None):
         """
             Called when a cover is selected
             from the coverchooser
@@ -738,8 +807,9 @@ class CoverWidget(Gtk.EventBox):
         if self.__track != track:
             return
 
-        width = settings.get_option('gui/cover_width', 100)
-        pixbuf = pixbuf_from_data(cover_data, (width, width))
+        if pixbuf is None:
+            width = settings.get_option('gui/cover_width', 100)
+            pixbuf = pixbuf_from_data(cover_data, (width, width))
         self.image.set_from_pixbuf(pixbuf)
         self.set_drag_source_enabled(True)
         self.cover_data = cover_data
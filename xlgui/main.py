@@ -377,7 +377,7 @@ class MainWindow(GObject.GObject):
         event.add_ui_callback(
             self.on_toggle_pause, 'playback_toggle_pause', player.PLAYER
         )
-        event.add_ui_callback(self.on_track_tags_changed, 'track_tags_changed')
+        event.add_ui_callback(self.on_track_tags_changed, 'track_tags_changed_batch')
         event.add_ui_callback(self.on_buffering, 'playback_buffering', player.PLAYER)
         event.add_ui_callback(self.on_playback_error, 'playback_error', player.PLAYER)
 
@@ -706,11 +706,11 @@ class MainWindow(GObject.GObject):
         percent = min(percent, 100)
         self.statusbar.set_status(_("Buffering: %d%%...") % percent, 1)
 
-    def on_track_tags_changed(self, type, track, tags):
+    def on_track_tags_changed(self, type, obj, changes):
         """
             Called when tags are changed
         """
-        if track is player.PLAYER.current:
+        if player.PLAYER.current in changes:
             self._update_track_information()
 
     def on_collection_tree_loaded(self, tree):
@@ -252,7 +252,7 @@ class CollectionPanel(panel.Panel):
             }
         )
         self.tree.connect('key-release-event', self.on_key_released)
-        event.add_ui_callback(self.refresh_tags_in_tree, 'track_tags_changed')
+        event.add_ui_callback(self.refresh_tags_in_tree, 'track_tags_changed_batch')
         event.add_ui_callback(
             self.refresh_tracks_in_tree, 'tracks_added', self.collection
         )
@@ -321,9 +321,12 @@ class CollectionPanel(panel.Panel):
         """
             Searches tracks and reloads the tree
         """
+        old_keyword = self.keyword.strip()
         self.keyword = unicode(entry.get_text(), 'utf-8')
         self.start_count += 1
         self.load_tree()
+        if old_keyword and not self.keyword.strip():
+            trax.clear_search_cache()
 
     def on_add_music_button_clicked(self, button):
         xlgui.get_controller().collection_manager()
@@ -467,13 +470,16 @@ class CollectionPanel(panel.Panel):
 
         return " ".join(queries)
 
-    def refresh_tags_in_tree(self, type, track, tags):
-        if (
-            settings.get_option('gui/sync_on_tag_change', True)
-            and bool(tags & self.order.all_sort_tags())
-            and self.collection.loc_is_member(track.get_loc_for_io())
-        ):
-            self._refresh_tags_in_tree()
+    def refresh_tags_in_tree(self, type, obj, changes):
+        if not settings.get_option('gui/sync_on_tag_change', True):
+            return
+        sort_tags = self.order.all_sort_tags()
+        for track, tags in changes.iteritems():
+            if tags & sort_tags and self.collection.loc_is_member(
+                track.get_loc_for_io()
+            ):
+                self._refresh_tags_in_tree()
+                return
 
     def refresh_tracks_in_tree(self, type, obj, loc):
         self._refresh_tags_in_tree()
@@ -496,7 +502,9 @@ class CollectionPanel(panel.Panel):
         # import time
         # print("sorting...", time.clock())
         self.sorted_tracks = trax.sort_tracks(
-            self.order.get_sort_tags(0), self.collection.get_tracks()
+            self.order.get_sort_tags(0),
+            self.collection.get_tracks(),
+            cache=self.collection.sort_keys,
         )
         # print("sorted.", time.clock())
 
@@ -529,7 +537,11 @@ class CollectionPanel(panel.Panel):
 
         self.tracks = list(
             trax.search_tracks_from_string(
-                self.sorted_tracks, keyword, case_sensitive=False, keyword_tags=tags
+                self.sorted_tracks,
+                keyword,
+                case_sensitive=False,
+                keyword_tags=tags,
+                index=self.collection.tag_index,
             )
         )
 
@@ -597,11 +609,15 @@ class CollectionPanel(panel.Panel):
         try:
             tags = self.order.get_sort_tags(depth)
             matchers = [trax.TracksMatcher(search)]
-            srtrs = trax.search_tracks(self.tracks, matchers)
+            srtrs = trax.search_tracks(
+                self.tracks, matchers, index=self.collection.tag_index
+            )
             # sort only if we are not on top level, because tracks are
             # already sorted by fist order
             if depth > 0:
-                srtrs = trax.sort_result_tracks(tags, srtrs)
+                srtrs = trax.sort_result_tracks(
+                    tags, srtrs, cache=self.collection.sort_keys
+                )
         except IndexError:
             return  # at the bottom of the tree
         try:
@@ -624,9 +640,11 @@ class CollectionPanel(panel.Panel):
         expanded = False
         to_expand = []
 
+        sort_keys = self.collection.sort_keys
+
         for srtr in srtrs:
-            stagvals = [unicode(srtr.track.get_tag_sort(x)) for x in tags]
-            stagval = " ".join(stagvals)
+            stagkeys = sort_keys.get_keys(srtr.track, tags)
+            stagval = " ".join([unicode(x) for x in stagkeys])
             if last_val != stagval or bottom:
                 tagval = self.order.format_track(depth, srtr.track)
                 match_query = " ".join(
@@ -651,8 +669,7 @@ class CollectionPanel(panel.Panel):
                     last_val = stagval
                     last_dval = tagval
                     if depth == 0 and draw_seps:
-                        val = srtr.track.get_tag_sort(tags[0])
-                        char = first_meaningful_char(val)
+                        char = first_meaningful_char(stagkeys[0])
                         if first:
                             last_char = char
                         else:
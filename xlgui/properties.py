@@ -41,7 +41,7 @@ from gi.repository import Pango
 
 from xl.nls import gettext as _
 from xl.metadata import CoverImage
-from xl import common, settings, trax, xdg
+from xl import common, event, settings, trax, xdg
 
 from xlgui.widgets import dialogs
 from xlgui.guiutil import GtkTemplate
@@ -405,7 +405,9 @@ class TrackPropertiesDialog(GObject.GObject):
                 if response != Gtk.ResponseType.YES:
                     return
 
-            self._tags_write(modified)
+            # listeners of tag changes are notified once, at the end
+            with event.batch():
+                self._tags_write(modified)
 
             del self.trackdata
             del self.trackdata_original
@@ -119,7 +119,7 @@ class TrackInfoPane(Gtk.Bin):
                 'playback_toggle_pause',
                 'playback_error',
             ]
-            events = ['track_tags_changed', 'cover_set', 'cover_removed']
+            events = ['track_tags_changed_batch', 'cover_set', 'cover_removed']
 
             if auto_update:
                 for e in p_evts:
@@ -302,16 +302,16 @@ class TrackInfoPane(Gtk.Bin):
         """
         self.clear()
 
-    def on_track_tags_changed(self, event, track, tags):
+    def on_track_tags_changed_batch(self, event, obj, changes):
         """
             Updates the info pane on tag changes
         """
         if (
             self.__player is not None
             and not self.__player.is_stopped()
-            and track is self.__track
+            and self.__track in changes
         ):
-            self.set_track(track)
+            self.set_track(self.__track)
 
     def on_cover_set(self, event, covers, track):
         """
@@ -324,8 +324,9 @@ class TrackInfoPane(Gtk.Bin):
         """
             Updates the info pane on cover removal
         """
-        if track is self.__track:
-            self.set_track(track)
+        # track is None when the covers of some albums were collected
+        if track is None or track is self.__track:
+            self.set_track(self.__track)
 
 
 class ToolTip(object):
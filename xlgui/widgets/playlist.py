@@ -919,8 +919,11 @@ class PlaylistView(AutoScrollTreeView, providers.ProviderHandler):
         '''
 
         if filter_string is None:
+            filtered = self._filter_matcher is not None
             self._filter_matcher = None
             self._refilter()
+            if filtered:
+                trax.clear_search_cache()
         else:
             # Merge default columns and currently enabled columns
             keyword_tags = set(
@@ -1160,7 +1163,11 @@ class PlaylistView(AutoScrollTreeView, providers.ProviderHandler):
                 selection.select_path(path)
 
     def _setup_models(self):
-        self.model = PlaylistModel(self.playlist, [], self.player, self)
+        if settings.get_option('gui/virtual_playlist_model', False):
+            model_class = VirtualPlaylistModel
+        else:
+            model_class = PlaylistModel
+        self.model = model_class(self.playlist, [], self.player, self)
         self.model.connect('row-inserted', self.on_row_inserted)
 
         self.modelfilter = self.model.filter_new()
@@ -1698,10 +1705,11 @@ class PlaylistView(AutoScrollTreeView, providers.ProviderHandler):
             settings.set_option('gui/columns', columns)
 
 
-class PlaylistModel(Gtk.ListStore):
+class _PlaylistModelBase(object):
     '''
-        This ListStore contains all the information needed to render a playlist
-        via a PlaylistView. There are five columns:
+        Behavior shared by the playlist models, which keep a model for a
+        PlaylistView in sync with an xl.playlist.Playlist. There are five
+        columns:
         
         * xl.trax.Track
         * dictionary (tag cache)
@@ -1718,11 +1726,6 @@ class PlaylistModel(Gtk.ListStore):
         columns are changed.
     '''
 
-    __gsignals__ = {
-        # Called with true indicates starting operation, False ends op
-        'data-loading': (GObject.SignalFlags.RUN_LAST, None, (GObject.TYPE_BOOLEAN,))
-    }
-
     COL_TRACK = 0
     COL_CACHE = 1
     COL_PIXBUF = 2
@@ -1731,11 +1734,7 @@ class PlaylistModel(Gtk.ListStore):
 
     PARAM_COLS = (COL_PIXBUF, COL_SENSITIVE, COL_WEIGHT)
 
-    def __init__(self, playlist, column_names, player, parent):
-        # columns: Track, Pixbuf, dict (cache)
-        Gtk.ListStore.__init__(
-            self, object, object, GdkPixbuf.Pixbuf, bool, Pango.Weight
-        )
+    def _init_model(self, playlist, column_names, player, parent):
         self.playlist = playlist
         self.player = player
 
@@ -1745,7 +1744,7 @@ class PlaylistModel(Gtk.ListStore):
         self.data_load_queue = []
 
         self._redraw_timer = None
-        self._redraw_queue = []
+        self._redraw_queue = set()
 
         event.add_ui_callback(
             self.on_tracks_added, "playlist_tracks_added", playlist, destroy_with=parent
@@ -1793,15 +1792,12 @@ class PlaylistModel(Gtk.ListStore):
             destroy_with=parent,
         )
         event.add_ui_callback(
-            self.on_track_tags_changed, "track_tags_changed", destroy_with=parent
+            self.on_track_tags_changed, "track_tags_changed_batch", destroy_with=parent
         )
 
         event.add_ui_callback(self.on_option_set, "gui_option_set", destroy_with=parent)
 
         self._setup_icons()
-        self.on_tracks_added(
-            None, self.playlist, list(enumerate(self.playlist))
-        )  # populate the list
 
     def _set_columns(self, column_names):
         self.column_names = set(column_names)
@@ -1848,19 +1844,13 @@ class PlaylistModel(Gtk.ListStore):
             self.pause_stop_pixbuf = self.pause_stop_pixbuf.scale_simple(s, s, t)
             self.clear_pixbuf = self.clear_pixbuf.scale_simple(s, s, t)
 
-    def _refresh_icons(self):
-        self._setup_icons()
-        itr = self.get_iter_first()
-        position = 0
-        while itr:
-            self.set(itr, self.PARAM_COLS, self._compute_row_params(position))
-            itr = self.iter_next(itr)
-            position += 1
-
     def on_option_set(self, typ, obj, data):
         if data == "gui/playlist_font":
             self._refresh_icons()
 
+    def _get_row_track(self, rowidx):
+        return self.playlist[rowidx]
+
     def _compute_row_params(self, rowidx):
         '''
             :returns: pixbuf, sensitive, weight
@@ -1882,7 +1872,7 @@ class PlaylistModel(Gtk.ListStore):
 
             if (
                 playlist.current_position == rowidx
-                and playlist[rowidx] == self.player.current
+                and self._get_row_track(rowidx) == self.player.current
             ):
 
                 # this row is the current track, set a special icon
@@ -1908,6 +1898,69 @@ class PlaylistModel(Gtk.ListStore):
 
         return pixbuf, sensitive, weight
 
+    ### Event callbacks to keep the model in sync with the playlist ###
+
+    def on_current_position_changed(self, event_type, playlist, positions):
+        for position in positions:
+            if position < 0:
+                continue
+            self.update_row_params(position)
+
+    def on_playback_state_change(self, event_type, player_obj, track):
+        position = self.playlist.current_position
+        if position < 0 or position >= len(self):
+            return
+        self.update_row_params(position)
+
+    def on_track_tags_changed(self, type, obj, changes):
+        if not settings.get_option('gui/sync_on_tag_change', True):
+            return
+        tracks = [
+            track for track, tags in changes.iteritems() if tags & self.column_names
+        ]
+        if not tracks:
+            return
+
+        # batches of tag changes that follow each other are redrawn at once
+        if self._redraw_timer:
+            GLib.source_remove(self._redraw_timer)
+        self._redraw_queue.update(tracks)
+        self._redraw_timer = GLib.timeout_add(100, self._on_track_tags_changed)
+
+
+class PlaylistModel(_PlaylistModelBase, Gtk.ListStore):
+    '''
+        This ListStore contains all the information needed to render a playlist
+        via a PlaylistView. See _PlaylistModelBase for the columns.
+    '''
+
+    __gsignals__ = {
+        # Called with true indicates starting operation, False ends op
+        'data-loading': (GObject.SignalFlags.RUN_LAST, None, (GObject.TYPE_BOOLEAN,))
+    }
+
+    def __init__(self, playlist, column_names, player, parent):
+        # columns: Track, Pixbuf, dict (cache)
+        Gtk.ListStore.__init__(
+            self, object, object, GdkPixbuf.Pixbuf, bool, Pango.Weight
+        )
+        # the iters of the rows of each track, which stay valid while the
+        # row exists
+        self._track_iters = {}
+        self._init_model(playlist, column_names, player, parent)
+        self.on_tracks_added(
+            None, self.playlist, list(enumerate(self.playlist))
+        )  # populate the list
+
+    def _refresh_icons(self):
+        self._setup_icons()
+        itr = self.get_iter_first()
+        position = 0
+        while itr:
+            self.set(itr, self.PARAM_COLS, self._compute_row_params(position))
+            itr = self.iter_next(itr)
+            position += 1
+
     def update_row_params(self, position):
         itr = self.iter_nth_child(None, position)
         if itr is not None:
@@ -1920,13 +1973,18 @@ class PlaylistModel(Gtk.ListStore):
 
     def on_tracks_removed(self, event_type, playlist, tracks):
         for position, track in reversed(tracks):
-            self.remove(self.iter_nth_child(None, position))
-
-    def on_current_position_changed(self, event_type, playlist, positions):
-        for position in positions:
-            if position < 0:
-                continue
-            self.update_row_params(position)
+            itr = self.iter_nth_child(None, position)
+            self._forget_iter(self.get_value(itr, self.COL_TRACK), position)
+            self.remove(itr)
+
+    def _forget_iter(self, track, position):
+        iters = self._track_iters.get(track, [])
+        for i, itr in enumerate(iters):
+            if self.get_path(itr)[0] == position:
+                del iters[i]
+                break
+        if not iters:
+            self._track_iters.pop(track, None)
 
     def on_spat_position_changed(self, event_type, playlist, positions):
         pos = min(positions)
@@ -1942,37 +2000,14 @@ class PlaylistModel(Gtk.ListStore):
             itr = self.iter_next(itr)
             pos += 1
 
-    def on_playback_state_change(self, event_type, player_obj, track):
-        position = self.playlist.current_position
-        if position < 0 or position >= len(self):
-            return
-        self.update_row_params(position)
-
-    def on_track_tags_changed(self, type, track, tags):
-        if (
-            not track
-            or not settings.get_option('gui/sync_on_tag_change', True)
-            or not (tags & self.column_names)
-        ):
-            return
-
-        if self._redraw_timer:
-            GLib.source_remove(self._redraw_timer)
-        self._redraw_queue.append(track)
-        self._redraw_timer = GLib.timeout_add(100, self._on_track_tags_changed)
-
     def _on_track_tags_changed(self):
         self._redraw_timer = None
-        redraw_queue = set(self._redraw_queue)
-        self._redraw_queue = []
+        redraw_queue, self._redraw_queue = self._redraw_queue, set()
 
-        COL_TRACK = self.COL_TRACK
-        COL_CACHE = self.COL_CACHE
-
-        for row in self:
-            if row[COL_TRACK] in redraw_queue:
-                row[COL_CACHE].clear()
-                self.row_changed(row.path, row.iter)
+        for track in redraw_queue:
+            for itr in self._track_iters.get(track, ()):
+                self.get_value(itr, self.COL_CACHE).clear()
+                self.row_changed(self.get_path(itr), itr)
 
     #
     # Loading data into the playlist:
@@ -2017,8 +2052,10 @@ class PlaylistModel(Gtk.ListStore):
         ]
 
     def _load_data_done(self, render_data):
+        track_iters = self._track_iters
         for args in render_data:
-            self.insert_with_valuesv(*args)
+            itr = self.insert_with_valuesv(*args)
+            track_iters.setdefault(args[2][0], []).append(itr)
 
         self.data_loading = False
         self.emit('data-loading', False)
@@ -2028,3 +2065,170 @@ class PlaylistModel(Gtk.ListStore):
             self.data_load_queue = []
 
             self._load_data(tracks)
+
+
+class VirtualPlaylistModel(_PlaylistModelBase, GObject.GObject, Gtk.TreeModel):
+    '''
+        A model with the same columns as PlaylistModel, which computes
+        its rows when the view asks for them instead of storing them.
+        This makes large playlists load at once.
+
+        The rows are read from a copy of the list of tracks, which is
+        updated along with the view, as the playlist itself may already
+        have changed when the view asks for rows.
+
+        The tag caches of the rows are kept for a bounded number of tracks,
+        and the other columns are computed on each access.
+    '''
+
+    __gsignals__ = {
+        # never emitted, as there is no data to load
+        'data-loading': (GObject.SignalFlags.RUN_LAST, None, (GObject.TYPE_BOOLEAN,))
+    }
+
+    COLUMN_TYPES = (object, object, GdkPixbuf.Pixbuf, bool, Pango.Weight)
+
+    def __init__(self, playlist, column_names, player, parent, cache_size=2000):
+        '''
+            :param cache_size: The number of tracks to keep the formatted
+                tags of
+        '''
+        GObject.GObject.__init__(self)
+        # the tracks of the rows the view was told about, which differ
+        # from the tracks of the playlist while its events are processed
+        self._tracks = list(playlist)
+        self._row_caches = common.LimitedCache(cache_size)
+        # the positions of the rows of each track, built when needed as
+        # they all change when rows are inserted or removed
+        self._track_positions = None
+        self._init_model(playlist, column_names, player, parent)
+
+    def _get_position(self, iter):
+        # positions are stored off by one, as 0 would be a NULL pointer
+        return iter.user_data - 1
+
+    def _create_iter(self, position):
+        if 0 <= position < len(self._tracks):
+            iter = Gtk.TreeIter()
+            iter.user_data = position + 1
+            return True, iter
+        return False, None
+
+    def _changed(self, position):
+        path = Gtk.TreePath((position,))
+        self.row_changed(path, self.get_iter(path))
+
+    ### Gtk.TreeModel interface ###
+
+    def do_get_flags(self):
+        return Gtk.TreeModelFlags.LIST_ONLY
+
+    def do_get_n_columns(self):
+        return len(self.COLUMN_TYPES)
+
+    def do_get_column_type(self, column):
+        return self.COLUMN_TYPES[column]
+
+    def do_get_iter(self, path):
+        indices = path.get_indices()
+        if len(indices) != 1:
+            return False, None
+        return self._create_iter(indices[0])
+
+    def do_get_path(self, iter):
+        return Gtk.TreePath((self._get_position(iter),))
+
+    def _get_row_track(self, rowidx):
+        return self._tracks[rowidx]
+
+    def do_get_value(self, iter, column):
+        position = self._get_position(iter)
+        track = self._tracks[position]
+
+        if column == self.COL_TRACK:
+            return track
+        elif column == self.COL_CACHE:
+            cache = self._row_caches.get(track)
+            if cache is None:
+                cache = self._row_caches[track] = {}
+            return cache
+        return self._compute_row_params(position)[column - self.COL_PIXBUF]
+
+    def do_iter_next(self, iter):
+        position = self._get_position(iter) + 1
+        if position < len(self._tracks):
+            iter.user_data = position + 1
+            return True
+        return False
+
+    def do_iter_previous(self, iter):
+        position = self._get_position(iter) - 1
+        if position >= 0:
+            iter.user_data = position + 1
+            return True
+        return False
+
+    def do_iter_children(self, parent):
+        if parent is not None:
+            return False, None
+        return self._create_iter(0)
+
+    def do_iter_has_child(self, iter):
+        return False
+
+    def do_iter_n_children(self, iter):
+        if iter is None:
+            return len(self._tracks)
+        return 0
+
+    def do_iter_nth_child(self, parent, n):
+        if parent is not None:
+            return False, None
+        return self._create_iter(n)
+
+    def do_iter_parent(self, child):
+        return False, None
+
+    ### Updates of the rows ###
+
+    def _refresh_icons(self):
+        self._setup_icons()
+        for position in xrange(len(self._tracks)):
+            self._changed(position)
+
+    def update_row_params(self, position):
+        if 0 <= position < len(self._tracks):
+            self._changed(position)
+
+    ### Event callbacks to keep the model in sync with the playlist ###
+
+    def on_tracks_added(self, event_type, playlist, tracks):
+        self._track_positions = None
+        for position, track in tracks:
+            self._tracks.insert(position, track)
+            path = Gtk.TreePath((position,))
+            self.row_inserted(path, self.get_iter(path))
+
+    def on_tracks_removed(self, event_type, playlist, tracks):
+        self._track_positions = None
+        for position, track in reversed(tracks):
+            del self._tracks[position]
+            self.row_deleted(Gtk.TreePath((position,)))
+
+    def on_spat_position_changed(self, event_type, playlist, positions):
+        for position in xrange(max(min(positions), 0), len(self._tracks)):
+            self._changed(position)
+
+    def _on_track_tags_changed(self):
+        self._redraw_timer = None
+        redraw_queue, self._redraw_queue = self._redraw_queue, set()
+
+        if self._track_positions is None:
+            self._track_positions = {}
+            for position, track in enumerate(self._tracks):
+                self._track_positions.setdefault(track, []).append(position)
+
+        for track in redraw_queue:
+            self._row_caches.pop(track, None)
+            for position in self._track_positions.get(track, ()):
+                self._changed(position)
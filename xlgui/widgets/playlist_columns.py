@@ -62,6 +62,9 @@ class Column(Gtk.TreeViewColumn):
                 "Can't instantiate " "abstract class %s" % repr(self.__class__)
             )
 
+        # The class property creates a new formatter on every access,
+        # keep one so that its compiled format string is reused
+        self.formatter = self.formatter
         self._size_ratio = size_ratio
         self.container = container
         self.player = player